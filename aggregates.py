@@ -0,0 +1,132 @@
+"""
+Инкрементальные агрегаты по заказам для вкладки «Аналитика».
+
+Счётчики обновляются при добавлении заказа и удалении клиента, поэтому
+при открытии вкладки не нужно заново обходить всю историю заказов.
+"""
+
+import heapq
+from collections import Counter, defaultdict
+from itertools import count
+from timeseries import bucket_start, check_bucket
+
+class OrderAggregates:
+    """Число заказов по клиентам и датам, вес товаров и топ-K клиентов.
+
+    Работает с заказами из ``gui.py`` (``order.products_qty``). Клиенты
+    используются как ключи словарей, поэтому правка ФИО или номера клиента
+    сразу видна в результатах без пересчёта. Заказы без товаров, как и
+    в ``orders_to_df``, не учитываются.
+    """
+
+    def __init__(self, top=5):
+        self.top = top
+        # Растёт при каждом изменении; по нему графики понимают, что пора перерисоваться
+        self.version = 0
+        self.client_orders = Counter()  # клиент -> число заказов
+        self.daily_orders = Counter()   # день заказа (полночь) -> число заказов
+        self.product_qty = Counter()    # название товара -> суммарный вес, кг
+        self._orders_by_client = defaultdict(list)
+        # Куча из top элементов [число заказов, порядковый номер, клиент]
+        self._heap = []
+        self._heap_entries = {}
+        self._heap_dirty = False
+        self._seq = count()
+
+    def add_order(self, order):
+        """Учитывает новый заказ."""
+        if not order.products_qty:
+            return
+        client = order.client
+        self.version += 1
+        self._orders_by_client[client].append(order)
+        self.client_orders[client] += 1
+        self.daily_orders[bucket_start(order.date)] += 1
+        for product, qty in order.products_qty.items():
+            self.product_qty[product.name] += qty
+        self._push_top(client)
+
+    def remove_client(self, client):
+        """Вычитает все заказы удалённого клиента."""
+        self.version += 1
+        for order in self._orders_by_client.pop(client, []):
+            self._decrement(self.daily_orders, bucket_start(order.date), 1)
+            for product, qty in order.products_qty.items():
+                self._decrement(self.product_qty, product.name, qty)
+        self.client_orders.pop(client, None)
+        if client in self._heap_entries:
+            self._heap_dirty = True
+
+    def client_changed(self, client):
+        """Отмечает правку данных клиента: счётчики те же, но изменились подписи."""
+        self.version += 1
+
+    def snapshot(self):
+        """Копия счётчиков для ``top_clients``, ``daily_series`` и
+        ``product_totals`` в фоновом потоке; дальнейшие изменения её не трогают.
+
+        Копируются только словари (быстро, на уровне C); сортировки и
+        перегруппировка остаются на долю копии.
+        """
+        copy = OrderAggregates(self.top)
+        copy.version = self.version
+        copy.client_orders = self.client_orders.copy()
+        copy.daily_orders = self.daily_orders.copy()
+        copy.product_qty = self.product_qty.copy()
+        copy._heap = [list(entry) for entry in self._heap]
+        copy._heap_entries = {entry[2]: entry for entry in copy._heap}
+        copy._heap_dirty = self._heap_dirty
+        return copy
+
+    def top_clients(self):
+        """Список ``(клиент, число заказов)`` по убыванию, не длиннее ``top``."""
+        if self._heap_dirty:
+            self._rebuild_top()
+        entries = sorted(self._heap, key=lambda entry: (-entry[0], entry[1]))
+        return [(client, orders) for orders, _, client in entries]
+
+    def daily_series(self, bucket='day'):
+        """Пары ``(начало дня, недели или месяца, число заказов)`` в порядке дат."""
+        if check_bucket(bucket) == 'day':
+            return sorted(self.daily_orders.items())
+        # Дней в истории немного, поэтому недели и месяцы собираются из дневных счётчиков
+        totals = Counter()
+        for day, orders in self.daily_orders.items():
+            totals[bucket_start(day, bucket)] += orders
+        return sorted(totals.items())
+
+    def product_totals(self):
+        """Пары ``(товар, вес в кг)`` по убыванию веса."""
+        return self.product_qty.most_common()
+
+    def _push_top(self, client):
+        if self._heap_dirty:
+            return
+        orders = self.client_orders[client]
+        entry = self._heap_entries.get(client)
+        if entry is not None:
+            # Счётчик только вырос: элемент может лишь «утонуть» в min-куче
+            entry[0] = orders
+            heapq.heapify(self._heap)
+        elif len(self._heap) < self.top:
+            entry = [orders, next(self._seq), client]
+            self._heap_entries[client] = entry
+            heapq.heappush(self._heap, entry)
+        elif orders > self._heap[0][0]:
+            entry = [orders, next(self._seq), client]
+            self._heap_entries[client] = entry
+            removed = heapq.heapreplace(self._heap, entry)
+            del self._heap_entries[removed[2]]
+
+    def _rebuild_top(self):
+        best = heapq.nlargest(self.top, self.client_orders.items(), key=lambda item: item[1])
+        self._heap = [[orders, next(self._seq), client] for client, orders in best]
+        heapq.heapify(self._heap)
+        self._heap_entries = {entry[2]: entry for entry in self._heap}
+        self._heap_dirty = False
+
+    @staticmethod
+    def _decrement(counter, key, value):
+        counter[key] -= value
+        if counter[key] <= 1e-9:
+            del counter[key]
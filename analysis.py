@@ -6,72 +6,197 @@ import pandas as pd
 from datetime import datetime
 import matplotlib.pyplot as plt
 import seaborn as sns
+from metrics import timed
+from timeseries import check_bucket, lttb
 
 class Product:
+    __slots__ = ('name', 'price')
+
     def __init__(self, name, price):
         self.name = name
         self.price = price
 
 class Client:
+    __slots__ = ('number', 'fio')
+
     def __init__(self, number, fio):
         self.number = number
         self.fio = fio
 
 class Order:
+    __slots__ = ('number', 'client', 'products', 'date')
+
     def __init__(self, number, client, products, date):
         self.number = number
         self.client = client
         self.products = products
         self.date = date
 
+@timed('analysis.orders_to_df')
 def orders_to_df(orders):
-    data = []
+    """Таблица «строка на товар» по списку заказов.
+
+    Значения складываются сразу в списки по столбцам, без словаря на каждую
+    строку; типы столбцов задаёт ``typed_orders_frame``.
+    """
+    order_numbers, client_numbers, client_fios = [], [], []
+    product_names, product_prices, order_dates = [], [], []
     for order in orders:
+        count = len(order.products)
+        if not count:
+            continue
+        order_numbers.extend([order.number] * count)
+        client_numbers.extend([order.client.number] * count)
+        client_fios.extend([order.client.fio] * count)
+        order_dates.extend([order.date] * count)
         for product in order.products:
-            data.append({
-                'OrderNumber': order.number,
-                'ClientNumber': order.client.number,
-                'ClientFIO': order.client.fio,
-                'ProductName': product.name,
-                'ProductPrice': product.price,
-                'OrderDate': order.date
-            })
-    return pd.DataFrame(data)
+            product_names.append(product.name)
+            product_prices.append(product.price)
+    return typed_orders_frame({
+        'OrderNumber': order_numbers,
+        'ClientNumber': client_numbers,
+        'ClientFIO': client_fios,
+        'ProductName': product_names,
+        'ProductPrice': product_prices,
+        'OrderDate': order_dates,
+    })
+
+@timed('analysis.orders_df_from_db')
+def orders_df_from_db(db):
+    """То же, что ``orders_to_df(db.get_orders())``, но без создания объектов заказов."""
+    rows = db.get_order_lines()
+    columns = list(zip(*rows)) if rows else [()] * len(ORDER_LINE_COLUMNS)
+    return typed_orders_frame({name: list(values) for name, values in zip(ORDER_LINE_COLUMNS, columns)})
+
+ORDER_LINE_COLUMNS = ['OrderNumber', 'ClientNumber', 'ClientFIO', 'ProductName', 'ProductPrice', 'OrderDate']
+
+ORDER_COLUMN_DTYPES = {
+    'ClientFIO': 'category',
+    'ProductName': 'category',
+    'ProductPrice': 'float32',
+    'Quantity': 'float32',
+}
 
+def typed_orders_frame(columns):
+    """DataFrame с компактными типами: категории для ФИО и названий товаров,
+    float32 для цен и количеств, datetime64 для дат."""
+    df = pd.DataFrame({
+        name: pd.Series(values, dtype=ORDER_COLUMN_DTYPES.get(name))
+        for name, values in columns.items()
+    })
+    if 'OrderDate' in df:
+        df['OrderDate'] = pd.to_datetime(df['OrderDate'], format='ISO8601')
+    return df
+
+@timed('analysis.top_clients_by_orders')
 def top_clients_by_orders(orders, top=5):
     df = orders_to_df(orders)
-    top_clients = df.groupby(['ClientNumber', 'ClientFIO'])['OrderNumber'].nunique().sort_values(ascending=False).head(top)
+    if df.empty:
+        return pd.Series(dtype='int64', name='OrderNumber')
+    top_clients = df.groupby(['ClientNumber', 'ClientFIO'], observed=True)['OrderNumber'].nunique().sort_values(ascending=False).head(top)
     print("Топ клиентов по количеству заказов:")
     print(top_clients)
     return top_clients
 
-def order_dynamics(orders):
-    df = orders_to_df(orders)
-    df_daily = df.groupby('OrderDate')['OrderNumber'].nunique()
-    df_daily.plot(kind='line', marker='o')
-    plt.title('Динамика заказов по датам')
-    plt.xlabel('Дата')
-    plt.ylabel('Количество заказов')
-    plt.grid(True)
+@timed('analysis.top_clients_by_orders_db')
+def top_clients_by_orders_db(db, top=5):
+    """То же, что ``top_clients_by_orders``, но группировка выполняется в SQLite."""
+    return _top_clients_series(db.count_orders_by_client(top))
+
+# Периоды pandas для интервалов группировки; неделя — с понедельника по воскресенье
+PANDAS_PERIODS = {'week': 'W-SUN', 'month': 'M'}
+
+def bucket_dates(dates, bucket='day'):
+    """Начала интервалов ``bucket`` для столбца дат."""
+    if check_bucket(bucket) == 'day':
+        return dates.dt.normalize()
+    return dates.dt.to_period(PANDAS_PERIODS[bucket]).dt.start_time
+
+@timed('analysis.top_clients_by_orders_parallel')
+def top_clients_by_orders_parallel(aggregator, top=5):
+    """То же, что ``top_clients_by_orders_db``, но по частям в нескольких процессах
+    (``aggregator`` — ``parallel.PartitionedAggregator``)."""
+    return _top_clients_series(aggregator.top_clients_by_orders(top))
+
+def _top_clients_series(rows):
+    index = pd.MultiIndex.from_tuples([(number, fio) for number, fio, _ in rows],
+                                      names=['ClientNumber', 'ClientFIO'])
+    top_clients = pd.Series([count for _, _, count in rows], index=index, name='OrderNumber', dtype='int64')
+    print("Топ клиентов по количеству заказов:")
+    print(top_clients)
+    return top_clients
+
+def plot_order_dynamics(df_daily):
+    fig, ax = plt.subplots()
+    # Не больше точки на пиксель ширины осей, сколько бы ни было интервалов
+    points = lttb(list(df_daily.items()), int(ax.bbox.width))
+    ax.plot([d for d, _ in points], [v for _, v in points], marker='o')
+    ax.set_title('Динамика заказов по датам')
+    ax.set_xlabel('Дата')
+    ax.set_ylabel('Количество заказов')
+    ax.grid(True)
+    fig.autofmt_xdate()
     plt.show()
+
+@timed('analysis.order_dynamics')
+def order_dynamics(orders, plot=True, bucket='day'):
+    """Число заказов по дням, неделям или месяцам (``bucket``)."""
+    df = orders_to_df(orders)
+    df_daily = df.groupby(bucket_dates(df['OrderDate'], bucket).rename('OrderDate'))['OrderNumber'].nunique()
+    if plot:
+        plot_order_dynamics(df_daily)
     return df_daily
 
-# Создаем тестовые данные
-client1 = Client(1, "Иванов Иван")
-client2 = Client(2, "Петров Петр")
+@timed('analysis.order_dynamics_db')
+def order_dynamics_db(db, plot=True, bucket='day'):
+    """То же, что ``order_dynamics``, но по итогам ``order_rollups`` из SQLite."""
+    return _dynamics_series(db.count_orders_by_date(bucket), plot)
 
-product1 = Product("Товар1", 100)
-product2 = Product("Товар2", 200)
+@timed('analysis.order_dynamics_parallel')
+def order_dynamics_parallel(aggregator, plot=True, bucket='day'):
+    """То же, что ``order_dynamics``, но по частям в нескольких процессах."""
+    return _dynamics_series(aggregator.order_dynamics(bucket), plot)
 
-orders = [
-    Order(101, client1, [product1, product2], datetime(2024, 5, 1)),
-    Order(102, client1, [product1], datetime(2024, 5, 2)),
-    Order(103, client2, [product2], datetime(2024, 5, 1)),
-]
+def _dynamics_series(rows, plot):
+    index = pd.DatetimeIndex([datetime.fromisoformat(date) for date, _ in rows], name='OrderDate')
+    df_daily = pd.Series([count for _, count in rows], index=index, name='OrderNumber', dtype='int64')
+    if plot:
+        plot_order_dynamics(df_daily)
+    return df_daily
 
-# Вызов функций
-df = orders_to_df(orders)
-print(df)
+@timed('analysis.plot_client_graph')
+def plot_client_graph(purchase_graph, top=30, min_weight=1):
+    """Граф связей клиентов: ``top`` самых активных клиентов, ребро — общие
+    товары (``graph.PurchaseGraph``). В networkx попадает только этот подграф."""
+    import networkx as nx
+    graph = purchase_graph.client_graph(top, min_weight)
+    weights = [w for _, _, w in graph.edges(data='weight')]
+    heaviest = max(weights, default=1)
+    pos = nx.spring_layout(graph, weight='weight', seed=0)
+    nx.draw_networkx(graph, pos, labels=dict(graph.nodes(data='label')), node_size=300, font_size=8,
+                     width=[0.5 + 2.5 * w / heaviest for w in weights], edge_color='grey')
+    plt.title('Граф связей клиентов (общие товары)')
+    plt.axis('off')
+    plt.show()
+    return graph
+
+if __name__ == "__main__":
+    # Создаем тестовые данные
+    client1 = Client(1, "Иванов Иван")
+    client2 = Client(2, "Петров Петр")
+
+    product1 = Product("Товар1", 100)
+    product2 = Product("Товар2", 200)
+
+    orders = [
+        Order(101, client1, [product1, product2], datetime(2024, 5, 1)),
+        Order(102, client1, [product1], datetime(2024, 5, 2)),
+        Order(103, client2, [product2], datetime(2024, 5, 1)),
+    ]
+
+    # Вызов функций
+    df = orders_to_df(orders)
+    print(df)
 
-top_clients_by_orders(orders)
-order_dynamics(orders)
\ No newline at end of file
+    top_clients_by_orders(orders)
+    order_dynamics(orders)
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Фоновое выполнение долгих задач для tkinter-интерфейса.
+
+Tk нельзя трогать из других потоков, поэтому задачи выполняются в пуле,
+а результат забирается в главном потоке опросом через ``widget.after()``.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+class BackgroundRunner:
+    """Пул фоновых задач с отменой устаревших запусков.
+
+    У каждой задачи есть ключ: новый запуск с тем же ключом отменяет
+    предыдущий, и результат старого запуска уже не передаётся в интерфейс.
+    Колбэки ``on_done``/``on_error`` вызываются в главном потоке.
+    """
+
+    def __init__(self, widget, max_workers=1, poll_ms=50):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs = {}  # ключ -> (future, on_done, on_error)
+        self._polling = False
+
+    def submit(self, key, func, *args, on_done=None, on_error=None):
+        """Запускает ``func(*args)`` в фоне, отменяя прежнюю задачу с тем же ключом."""
+        self.cancel(key)
+        future = self.executor.submit(func, *args)
+        self._jobs[key] = (future, on_done, on_error)
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+        return future
+
+    def cancel(self, key):
+        """Отменяет задачу: если она уже выполняется, её результат будет отброшен."""
+        job = self._jobs.pop(key, None)
+        if job is not None:
+            job[0].cancel()
+
+    def is_running(self, key):
+        return key in self._jobs
+
+    def shutdown(self):
+        for key in list(self._jobs):
+            self.cancel(key)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self):
+        for key, (future, on_done, on_error) in list(self._jobs.items()):
+            if not future.done():
+                continue
+            del self._jobs[key]
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+            elif on_done:
+                on_done(future.result())
+        if self._jobs:
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+class Debouncer:
+    """Откладывает вызов ``func`` до паузы в ``delay_ms`` после последнего запроса.
+
+    Используется для поиска по мере ввода: пока пользователь печатает,
+    каждый новый символ переносит вызов, и поиск выполняется один раз.
+    """
+
+    def __init__(self, widget, delay_ms, func):
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self.func = func
+        self._after_id = None
+
+    def __call__(self, *args):
+        self.cancel()
+        self._after_id = self.widget.after(self.delay_ms, self._fire, *args)
+
+    def cancel(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _fire(self, *args):
+        self._after_id = None
+        self.func(*args)
@@ -0,0 +1,149 @@
+"""
+Замеры основных путей хранения и аналитики на синтетических данных (``datagen.py``).
+
+Запуск::
+
+    python bench.py                                   # масштаб 10k
+    python bench.py --scale 10k 100k 1m --output baseline.json
+    python bench.py --scale 10k --baseline baseline.json --threshold 0.25
+
+Масштаб — число заказов, клиентов в десять раз меньше. Результат выводится
+в JSON; код возврата 1, если какой-то замер медленнее базового больше чем
+на порог.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+DEFAULT_THRESHOLD = 0.25
+# Разница меньше этой (в секундах) не считается регрессией: это шум таймера
+MIN_DELTA = 0.005
+
+def benchmarks(n_orders, workdir, seed=0):
+    """Замеры в порядке выполнения: ``(имя, подготовка, замеряемая функция)``.
+
+    Подготовка не входит во время; её результат передаётся замеряемой функции.
+    """
+    import analysis
+    import certification
+    import datagen
+    from db import Database
+    from repository import Repository
+
+    clients, orders = datagen.generate(max(1, n_orders // 10), n_orders, seed=seed)
+    cert_clients, cert_orders = datagen.to_certification(clients, orders)
+    db_path = os.path.join(workdir, 'bench.db')
+
+    def fresh_db(**kwargs):
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        db = Database(db_path, journal_mode='WAL', synchronous='NORMAL', **kwargs)
+        db.insert_clients(clients)
+        return db
+
+    def insert_orders_one_by_one(db):
+        for order in orders:
+            db.insert_order(order)
+        db.close()
+
+    def get_orders(_):
+        db = Database(db_path)
+        db.get_orders()
+        db.close()
+
+    def cert_file(ext):
+        return os.path.join(workdir, f'bench.{ext}')
+
+    def cert_import(ext):
+        def run(_):
+            certification.load_file(cert_file(ext), Repository.of_dicts("id", unique=("email", "phone")),
+                                    Repository.of_dicts("id"))
+        return run
+
+    # get_orders читает базу, заполненную замером insert_order
+    return [
+        ('insert_order', fresh_db, insert_orders_one_by_one),
+        ('get_orders', None, get_orders),
+        ('insert_order_group_commit', lambda: fresh_db(group_size=500), insert_orders_one_by_one),
+        ('orders_to_df', None, lambda _: analysis.orders_to_df(orders)),
+        ('top_clients_by_orders', None, lambda _: analysis.top_clients_by_orders(orders)),
+        ('order_dynamics', None, lambda _: analysis.order_dynamics(orders, plot=False)),
+        ('export_json', None, lambda _: certification.save_file(cert_file('json'), cert_clients, cert_orders)),
+        ('import_json', None, cert_import('json')),
+        ('export_csv', None, lambda _: certification.save_file(cert_file('csv'), cert_clients, cert_orders)),
+        ('import_csv', None, cert_import('csv')),
+    ]
+
+def run_suite(n_orders, repeat=1, seed=0):
+    """Выполняет все замеры; возвращает ``{имя: секунды}`` (лучшее из ``repeat``)."""
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, setup, run in benchmarks(n_orders, workdir, seed):
+            best = None
+            for _ in range(repeat):
+                arg = setup() if setup else None
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run(arg)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = best
+    return results
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Регрессии относительно базовых результатов.
+
+    ``results`` и ``baseline`` — ``{масштаб: {имя: секунды}}``. Возвращает
+    список ``(масштаб, имя, было, стало)`` для замеров, ставших медленнее
+    больше чем на ``threshold`` (доля) и на ``MIN_DELTA`` секунд.
+    """
+    regressions = []
+    for scale, timings in results.items():
+        for name, seconds in timings.items():
+            base = baseline.get(scale, {}).get(name)
+            if base is not None and seconds > base * (1 + threshold) and seconds - base > MIN_DELTA:
+                regressions.append((scale, name, base, seconds))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', nargs='+', default=['10k'], choices=sorted(SCALES))
+    parser.add_argument('--repeat', type=int, default=1, help='повторов каждого замера (берётся лучший)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='куда записать результаты в JSON')
+    parser.add_argument('--baseline', help='JSON с базовыми результатами для сравнения')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='допустимое замедление, доля (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for scale in args.scale:
+        results[scale] = run_suite(SCALES[scale], args.repeat, args.seed)
+        for name, seconds in results[scale].items():
+            print(f"{scale:>5} {name:<24} {seconds * 1000:10.1f} мс", file=sys.stderr)
+    report = {'python': platform.python_version(), 'seed': args.seed, 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for scale, name, base, seconds in regressions:
+            print(f"Регрессия {scale} {name}: {base * 1000:.1f} -> {seconds * 1000:.1f} мс", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
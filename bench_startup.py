@@ -0,0 +1,67 @@
+"""
+Замер времени холодного импорта приложения (аналог ``python -X importtime``).
+
+Запуск::
+
+    python bench_startup.py                 # модуль gui, бюджет 300 мс
+    python bench_startup.py main --budget 200 --top 15
+
+Код возврата 1, если суммарное время импорта превышает бюджет.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 300
+
+def measure_import(module, python=sys.executable):
+    """Импортирует ``module`` в чистом процессе с ``-X importtime``.
+
+    Возвращает список ``(модуль, собственное время мкс, накопленное мкс, глубина)``
+    в порядке из отчёта интерпретатора.
+    """
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr}")
+    return parse_importtime(result.stderr)
+
+def parse_importtime(report):
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def total_ms(rows):
+    """Суммарное время импорта: сумма накопленного времени модулей верхнего уровня."""
+    top_level = min((depth for *_, depth in rows), default=0)
+    return sum(cumulative for _, _, cumulative, depth in rows if depth == top_level) / 1000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('module', nargs='?', default='gui')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS, help='бюджет, мс')
+    parser.add_argument('--top', type=int, default=10, help='сколько самых долгих модулей показать')
+    args = parser.parse_args(argv)
+
+    rows = measure_import(args.module)
+    total = total_ms(rows)
+    print(f"Импорт {args.module}: {total:.1f} мс (бюджет {args.budget:.0f} мс)")
+    for name, _, cumulative, depth in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} мс  {'  ' * depth}{name}")
+    heavy = [name for name, *_ in rows if name.split('.')[0] in ('pandas', 'matplotlib', 'seaborn')]
+    if heavy:
+        print(f"Внимание: при запуске загружаются тяжёлые модули: {', '.join(sorted(set(n.split('.')[0] for n in heavy)))}")
+    return 0 if total <= args.budget else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,50 +3,104 @@ from tkinter import ttk, messagebox, filedialog
 import json
 import csv
 from collections import defaultdict
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-clients = []
-orders = []
+from datetime import date
+from views import ListViewModel, VirtualTreeview
+from repository import Repository
+from background import Debouncer
+from order_index import OrderIndex
+
+# Хранилища с индексами: поиск клиента по id/email/телефону и заказов клиента за O(1)
+CLIENT_SEARCH = ("name", "email", "phone")  # поля для поиска по мере ввода
+clients = Repository.of_dicts("id", unique=("email", "phone"), search=CLIENT_SEARCH)
+orders = Repository.of_dicts("id")
+# Ключи сортировки и фильтров списка заказов; перестановки по ним кэшируются в OrderIndex
+ORDER_KEYS = {
+    "id": lambda o: o["id"],
+    "client_id": lambda o: o["client_id"],
+    "date": lambda o: o.get("date") or "",
+    "total": lambda o: sum(p["qty"] * p["price"] for p in o["products"]),
+}
+order_index = OrderIndex(ORDER_KEYS, group=("client_id",))
+orders_query = ((), {})  # текущие сортировка и фильтры списка заказов
+
+# Наибольшие id хранилищ: после импорта в id бывают пропуски, поэтому новый
+# id на единицу больше наибольшего, а не числа записей
+last_ids = {"clients": 0, "orders": 0}
+
+def max_id(items):
+    return max((item["id"] for item in items), default=0)
 
 # Функции работы с клиентами
 def add_client(name, email, phone):
-    clients.append({"id": len(clients) + 1, "name": name, "email": email, "phone": phone})
-    refresh_clients()
+    client = {"id": last_ids["clients"] + 1, "name": name, "email": email, "phone": phone}
+    clients.add(client)
+    last_ids["clients"] = client["id"]
+    if e_search.get().strip():
+        refresh_clients()
+    else:
+        clients_view.append(id(client), client)
 
 def refresh_clients():
-    for row in tree_clients.get_children():
-        tree_clients.delete(row)
-    for c in clients:
-        tree_clients.insert("", "end", values=(c["id"], c["name"], c["email"], c["phone"]))
+    query = e_search.get()
+    shown = clients.search(query, 500) if query.strip() else clients
+    clients_view.reset((id(c), c) for c in shown)
+
+def format_client_row(c):
+    return (c["id"], c["name"], c["email"], c["phone"])
 
 # Функции работы с заказами
 def add_order(client_id, products_str):
     products = []
     for p in products_str.split(";"):
         if p.strip():
-            name, qty, price = p.strip().split(",")
+            name, qty, price = p.strip().rsplit(",", 2)
             products.append({"name": name.strip(), "qty": int(qty), "price": float(price)})
-    orders.append({
-        "id": len(orders) + 1,
+    order = {
+        "id": last_ids["orders"] + 1,
         "client_id": int(client_id),
-        "products": products
-    })
-    refresh_orders()
-
-def refresh_orders(filter_client=None, sort_by=None):
-    for row in tree_orders.get_children():
-        tree_orders.delete(row)
-    filtered = orders
+        "products": products,
+        "date": date.today().isoformat()
+    }
+    orders.add(order)
+    last_ids["orders"] = order["id"]
+    order_index.add(order)
+    # Новая строка вставляется на своё место в текущем представлении, если проходит фильтр
+    index = order_index.place(*orders_query)
+    if index is not None:
+        orders_view.insert(index, id(order), order)
+
+def parse_sort(sort_by):
+    # "client_id, -date" -> ("client_id", "-date")
+    if not sort_by or sort_by == "без сортировки":
+        return ()
+    return tuple(key.strip() for key in sort_by.split(",") if key.strip())
+
+def parse_date(value):
+    # Пустая строка — без границы; даты заказов хранятся в ISO-формате
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"Неверная дата: {value} (ожидается ГГГГ-ММ-ДД)") from None
+
+def refresh_orders(filter_client=None, sort_by=None, date_from=None, date_to=None):
+    # Сортировка и фильтры берутся из OrderIndex: исходный порядок заказов не меняется
+    global orders_query
+    filters = {}
     if filter_client:
-        filtered = [o for o in orders if str(o["client_id"]) == str(filter_client)]
-    if sort_by == "id":
-        filtered.sort(key=lambda x: x["id"])
-    elif sort_by == "client_id":
-        filtered.sort(key=lambda x: x["client_id"])
-    for o in filtered:
-        products_str = ", ".join([f'{p["name"]}×{p["qty"]}' for p in o["products"]])
-        tree_orders.insert("", "end", values=(o["id"], o["client_id"], products_str))
+        filters["client_id"] = int(filter_client)
+    date_from, date_to = parse_date(date_from), parse_date(date_to)
+    if date_from or date_to:
+        filters["date"] = (date_from, date_to)
+    sort = parse_sort(sort_by)
+    shown = order_index.query(sort, filters)
+    orders_query = (sort, filters)
+    orders_view.reset((id(o), o) for o in shown)
+
+def format_order_row(o):
+    products_str = ", ".join([f'{p["name"]}×{p["qty"]}' for p in o["products"]])
+    return (o["id"], o["client_id"], o.get("date", ""), f'{ORDER_KEYS["total"](o):.2f}', products_str)
 
 # Импорт/Экспорт данных
 def export_data():
@@ -54,9 +108,14 @@ def export_data():
                                         filetypes=[("JSON Files", "*.json"), ("CSV Files", "*.csv")])
     if not file:
         return
+    save_file(file, clients, orders)
+    messagebox.showinfo("Экспорт", "Данные успешно экспортированы")
+
+def save_file(file, clients, orders):
+    # Записывает клиентов и заказы в JSON или CSV (по расширению файла)
     if file.endswith(".json"):
         with open(file, "w", encoding="utf-8") as f:
-            json.dump({"clients": clients, "orders": orders}, f, ensure_ascii=False, indent=4)
+            json.dump({"clients": list(clients), "orders": list(orders)}, f, ensure_ascii=False, indent=4)
     elif file.endswith(".csv"):
         with open(file, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
@@ -66,28 +125,42 @@ def export_data():
                 writer.writerow([c["id"], c["name"], c["email"], c["phone"]])
             writer.writerow([])
             writer.writerow(["Orders"])
-            writer.writerow(["id", "client_id", "products"])
+            writer.writerow(["id", "client_id", "products", "date"])
             for o in orders:
                 products_str = "; ".join([f'{p["name"]},{p["qty"]},{p["price"]}' for p in o["products"]])
-                writer.writerow([o["id"], o["client_id"], products_str])
-    messagebox.showinfo("Экспорт", "Данные успешно экспортированы")
+                writer.writerow([o["id"], o["client_id"], products_str, o.get("date", "")])
 
 def import_data():
     file = filedialog.askopenfilename(filetypes=[("JSON Files", "*.json"), ("CSV Files", "*.csv")])
     if not file:
         return
-    global clients, orders
+    global clients, orders, order_index
+    new_clients = Repository.of_dicts("id", unique=("email", "phone"), search=CLIENT_SEARCH)
+    new_orders = Repository.of_dicts("id")
+    try:
+        load_file(file, new_clients, new_orders)
+    except ValueError as e:
+        messagebox.showerror("Импорт", f"Данные не импортированы: {e}")
+        return
+    clients, orders = new_clients, new_orders
+    last_ids.update(clients=max_id(clients), orders=max_id(orders))
+    order_index = OrderIndex(ORDER_KEYS, group=("client_id",))
+    order_index.extend(orders)
+    refresh_clients()
+    refresh_orders()
+    messagebox.showinfo("Импорт", "Данные успешно импортированы")
+
+def load_file(file, clients, orders):
+    # Заполняет хранилища данными из JSON/CSV; при повторе id, email или телефона — ValueError
     if file.endswith(".json"):
         with open(file, "r", encoding="utf-8") as f:
             data = json.load(f)
-            clients = data.get("clients", [])
-            orders = data.get("orders", [])
+            clients.extend(data.get("clients", []))
+            orders.extend(data.get("orders", []))
     elif file.endswith(".csv"):
         with open(file, "r", encoding="utf-8") as f:
             reader = csv.reader(f)
             rows = list(reader)
-            clients = []
-            orders = []
             mode = None
             for row in rows:
                 if not row:
@@ -99,7 +172,7 @@ def import_data():
                     mode = "orders"
                     continue
                 if mode == "clients" and row[0].isdigit():
-                    clients.append({
+                    clients.add({
                         "id": int(row[0]),
                         "name": row[1],
                         "email": row[2],
@@ -110,19 +183,22 @@ def import_data():
                     prods = row[2].split(";")
                     for p in prods:
                         if p.strip():
-                            name, qty, price = p.strip().split(",")
+                            name, qty, price = p.strip().rsplit(",", 2)
                             products.append({"name": name, "qty": int(qty), "price": float(price)})
-                    orders.append({
+                    order = {
                         "id": int(row[0]),
                         "client_id": int(row[1]),
                         "products": products
-                    })
-    refresh_clients()
-    refresh_orders()
-    messagebox.showinfo("Импорт", "Данные успешно импортированы")
+                    }
+                    # Файлы старого формата без столбца даты
+                    if len(row) > 3 and row[3]:
+                        order["date"] = row[3]
+                    orders.add(order)
 
 # Визуализация
 def show_sales_dynamics():
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
     sales_per_client = defaultdict(float)
     for o in orders:
         total = sum(p["qty"] * p["price"] for p in o["products"])
@@ -143,131 +219,164 @@ def show_sales_dynamics():
     canvas.get_tk_widget().pack()
     canvas.draw()
 
-# GUI
-root = tk.Tk()
-root.title("Менеджер интернет-магазина")
-
-notebook = ttk.Notebook(root)
-frame_clients = ttk.Frame(notebook)
-frame_orders = ttk.Frame(notebook)
-frame_analysis = ttk.Frame(notebook)
-
-notebook.add(frame_clients, text="Клиенты")
-notebook.add(frame_orders, text="Заказы")
-notebook.add(frame_analysis, text="Аналитика")
-notebook.pack(expand=True, fill="both")
-
-# Клиенты
-tree_clients = ttk.Treeview(frame_clients, columns=("id", "name", "email", "phone"), show="headings")
-for col in ("id", "name&quot", "email", "phone"):
-    tree_clients.heading(col, text=col)
-tree_clients.pack(fill="both", expand=True)
-
-clients_frame = ttk.Frame(frame_clients)
-clients_frame.pack(pady=10)
-
-ttk.Label(clients_frame, text="Имя").grid(row=0, column=0)
-e_name = ttk.Entry(clients_frame)
-e_name.grid(row=0, column=1)
-
-ttk.Label(clients_frame, text="Email").grid(row=1, column=0)
-e_email = ttk.Entry(clients_frame)
-e_email.grid(row=1, column=1)
-
-ttk.Label(clients_frame, text="Телефон").grid(row=2, column=0)
-e_phone = ttk.Entry(clients_frame)
-e_phone.grid(row=2, column=1)
-
-def on_add_client():
-    name = e_name.get().strip()
-    email = e_email.get().strip()
-    phone = e_phone.get().strip()
-    if not name or not email:
-        messagebox.showerror("Ошибка", "Имя и Email обязательны")
-        return
-    add_client(name, email, phone)
-    e_name.delete(0, tk.END)
-    e_email.delete(0, tk.END)
-    e_phone.delete(0, tk.END)
-
-ttk.Button(clients_frame, text="Добавить клиента", command=on_add_client).grid(row=3, column=0, columnspan=2, pady=5)
-
-# Заказы
-tree_orders = ttk.Treeview(frame_orders, columns=("id", "client_id", "products"), show="headings")
-tree_orders.heading("id", text="ID")
-tree_orders.heading("client_id", text="ID Клиента")
-tree_orders.heading("products", text="Товары (название × количество)")
-tree_orders.pack(fill="both", expand=True)
-
-orders_frame = ttk.Frame(frame_orders)
-orders_frame.pack(pady=10)
-
-ttk.Label(orders_frame, text="ID Клиента").grid(row=0, column=0)
-e_client_id = ttk.Entry(orders_frame)
-e_client_id.grid(row=0, column=1)
-
-ttk.Label(orders_frame, text="Товары (название,кол-во,цена; ...)").grid(row=1, column=0)
-e_products = ttk.Entry(orders_frame, width=50)
-e_products.grid(row=1, column=1)
-
-def on_add_order():
-    client_id = e_client_id.get().strip()
-    products = e_products.get().strip()
-    if not client_id.isdigit() or not products:
-        messagebox.showerror("Ошибка", "Неверные данные")
-        return
-    if int(client_id) not in [c["id"] for c in clients]:
-        messagebox.showerror("Ошибка", "Клиент с таким ID не найден")
-        return
-    try:
-        add_order(client_id, products)
-    except Exception as e:
-        messagebox.showerror("Ошибка", "Ошибка при добавлении заказа: " + str(e))
-    e_client_id.delete(0, tk.END)
-    e_products.delete(0, tk.END)
-
-ttk.Button(orders_frame, text="Добавить заказ", command=on_add_order).grid(row=2, column=0, columnspan=2, pady=5)
-
-# Фильтрация
-filter_frame = ttk.Frame(frame_orders)
-filter_frame.pack(pady=5)
-
-ttk.Label(filter_frame, text="Фильтр по ID клиента").grid(row=0, column=0)
-e_filter_client = ttk.Entry(filter_frame, width=10)
-e_filter_client.grid(row=0, column=1)
-
-ttk.Label(filter_frame, text="Сортировка").grid(row=0, column=2)
-sort_combo = ttk.Combobox(filter_frame, values=["без сортировки", "id", "client_id"])
-sort_combo.current(0)
-sort_combo.grid(row=0, column=3)
-
-def on_filter_sort():
-    client_filter = e_filter_client.get()
-    if client_filter != "" and not client_filter.isdigit():
-        messagebox.showerror("Ошибка", "ID клиента должен быть числом")
-        return
-    filt = client_filter if client_filter else None
-    sort = sort_combo.get()
-    if sort == "бз сортировки":
-        sort = None
-    refresh_orders(filter_client=filt, sort_by=sort)
-
-ttk.Button(filter_frame, text="Применить", command=on_filter_sort).grid(row=0, column=4, padx=5)
-
-ttk.Button(frame_analysis, text="Показать динамику продаж", command=show_sales_dynamics).pack(pady=20)
-
-# Меню
-menu = tk.Menu(root)
-root.config(menu=menu)
+# GUI: строится только при запуске файла как программы, чтобы функции
+# импорта/экспорта можно было импортировать (например, в bench.py)
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("Менеджер интернет-магазина")
+
+    notebook = ttk.Notebook(root)
+    frame_clients = ttk.Frame(notebook)
+    frame_orders = ttk.Frame(notebook)
+    frame_analysis = ttk.Frame(notebook)
+
+    notebook.add(frame_clients, text="Клиенты")
+    notebook.add(frame_orders, text="Заказы")
+    notebook.add(frame_analysis, text="Аналитика")
+    notebook.pack(expand=True, fill="both")
+
+    # Клиенты
+    search_frame = ttk.Frame(frame_clients)
+    search_frame.pack(fill="x", padx=5, pady=5)
+    ttk.Label(search_frame, text="Поиск (имя, email, телефон)").pack(side="left")
+    search_var = tk.StringVar()
+    e_search = ttk.Entry(search_frame, textvariable=search_var)
+    e_search.pack(side="left", fill="x", expand=True, padx=5)
+    # Список пересобирается через 250 мс после последнего нажатия клавиши
+    search_var.trace_add("write", lambda *args: search_clients())
+    search_clients = Debouncer(root, 250, refresh_clients)
+
+    # Виртуальные таблицы: в Treeview создаются только видимые строки
+    tree_clients = VirtualTreeview(frame_clients, columns=("id", "name", "email", "phone"), show="headings")
+    for col in ("id", "name&quot", "email", "phone"):
+        tree_clients.heading(col, text=col)
+    tree_clients.pack(fill="both", expand=True)
+    clients_view = ListViewModel(format_client_row, tree_clients)
+    tree_clients.set_source(clients_view)
+
+    clients_frame = ttk.Frame(frame_clients)
+    clients_frame.pack(pady=10)
+
+    ttk.Label(clients_frame, text="Имя").grid(row=0, column=0)
+    e_name = ttk.Entry(clients_frame)
+    e_name.grid(row=0, column=1)
+
+    ttk.Label(clients_frame, text="Email").grid(row=1, column=0)
+    e_email = ttk.Entry(clients_frame)
+    e_email.grid(row=1, column=1)
+
+    ttk.Label(clients_frame, text="Телефон").grid(row=2, column=0)
+    e_phone = ttk.Entry(clients_frame)
+    e_phone.grid(row=2, column=1)
+
+    def on_add_client():
+        name = e_name.get().strip()
+        email = e_email.get().strip()
+        phone = e_phone.get().strip()
+        if not name or not email:
+            messagebox.showerror("Ошибка", "Имя и Email обязательны")
+            return
+        try:
+            add_client(name, email, phone)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+        e_name.delete(0, tk.END)
+        e_email.delete(0, tk.END)
+        e_phone.delete(0, tk.END)
+
+    ttk.Button(clients_frame, text="Добавить клиента", command=on_add_client).grid(row=3, column=0, columnspan=2, pady=5)
+
+    # Заказы
+    tree_orders = VirtualTreeview(frame_orders, columns=("id", "client_id", "date", "total", "products"), show="headings")
+    tree_orders.heading("id", text="ID")
+    tree_orders.heading("client_id", text="ID Клиента")
+    tree_orders.heading("date", text="Дата")
+    tree_orders.heading("total", text="Сумма")
+    tree_orders.heading("products", text="Товары (название × количество)")
+    tree_orders.pack(fill="both", expand=True)
+    orders_view = ListViewModel(format_order_row, tree_orders)
+    tree_orders.set_source(orders_view)
+
+    orders_frame = ttk.Frame(frame_orders)
+    orders_frame.pack(pady=10)
+
+    ttk.Label(orders_frame, text="ID Клиента").grid(row=0, column=0)
+    e_client_id = ttk.Entry(orders_frame)
+    e_client_id.grid(row=0, column=1)
+
+    ttk.Label(orders_frame, text="Товары (название,кол-во,цена; ...)").grid(row=1, column=0)
+    e_products = ttk.Entry(orders_frame, width=50)
+    e_products.grid(row=1, column=1)
+
+    def on_add_order():
+        client_id = e_client_id.get().strip()
+        products = e_products.get().strip()
+        if not client_id.isdigit() or not products:
+            messagebox.showerror("Ошибка", "Неверные данные")
+            return
+        if int(client_id) not in clients:
+            messagebox.showerror("Ошибка", "Клиент с таким ID не найден")
+            return
+        try:
+            add_order(client_id, products)
+        except Exception as e:
+            messagebox.showerror("Ошибка", "Ошибка при добавлении заказа: " + str(e))
+        e_client_id.delete(0, tk.END)
+        e_products.delete(0, tk.END)
+
+    ttk.Button(orders_frame, text="Добавить заказ", command=on_add_order).grid(row=2, column=0, columnspan=2, pady=5)
+
+    # Фильтрация
+    filter_frame = ttk.Frame(frame_orders)
+    filter_frame.pack(pady=5)
+
+    ttk.Label(filter_frame, text="Фильтр по ID клиента").grid(row=0, column=0)
+    e_filter_client = ttk.Entry(filter_frame, width=10)
+    e_filter_client.grid(row=0, column=1)
+
+    ttk.Label(filter_frame, text="Дата с").grid(row=0, column=2)
+    e_date_from = ttk.Entry(filter_frame, width=11)
+    e_date_from.grid(row=0, column=3)
+    ttk.Label(filter_frame, text="до").grid(row=0, column=4)
+    e_date_to = ttk.Entry(filter_frame, width=11)
+    e_date_to.grid(row=0, column=5)
+
+    # Можно ввести несколько ключей через запятую; "-" перед ключом — по убыванию
+    ttk.Label(filter_frame, text="Сортировка").grid(row=0, column=6)
+    sort_combo = ttk.Combobox(filter_frame, values=["без сортировки", "id", "client_id", "date", "-date", "-total",
+                                                    "client_id, -date", "client_id, -total"])
+    sort_combo.current(0)
+    sort_combo.grid(row=0, column=7)
+
+    def on_filter_sort():
+        client_filter = e_filter_client.get()
+        if client_filter != "" and not client_filter.isdigit():
+            messagebox.showerror("Ошибка", "ID клиента должен быть числом")
+            return
+        filt = client_filter if client_filter else None
+        try:
+            refresh_orders(filter_client=filt, sort_by=sort_combo.get(),
+                           date_from=e_date_from.get().strip(), date_to=e_date_to.get().strip())
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+
+    ttk.Button(filter_frame, text="Применить", command=on_filter_sort).grid(row=0, column=8, padx=5)
+
+    ttk.Button(frame_analysis, text="Показать динамику продаж", command=show_sales_dynamics).pack(pady=20)
+
+    # Меню
+    menu = tk.Menu(root)
+    root.config(menu=menu)
+
+    file_menu = tk.Menu(menu, tearoff=0)
+    menu.add_cascade(label="Файл", menu=file_menu)
+    file_menu.add_command(label="Импорт данных", command=import_data)
+    file_menu.add_command(label="Экспорт данных", command=export_data)
+    file_menu.add_separator()
+    file_menu.add_command(label="Выход", command=root.quit)
 
-file_menu = tk.Menu(menu, tearoff=0)
-menu.add_cascade(label="Файл", menu=file_menu)
-file_menu.add_command(label="Импорт данных", command=import_data)
-file_menu.add_command(label="Экспорт данных", command=export_data)
-file_menu.add_separator()
-file_menu.add_command(label="Выход", command=root.quit)
-
-refresh_clients()
-refresh_orders()
+    refresh_clients()
+    refresh_orders()
 
-root.mainloop()
+    root.mainloop()
@@ -0,0 +1,138 @@
+"""
+Графики tkinter, которые создаются один раз и обновляются на месте.
+
+Вместо пересоздания ``Figure`` и ``FigureCanvasTkAgg`` при каждом показе
+вкладки у линий и столбцов меняются данные, а перерисовка откладывается
+через ``draw_idle``. Если версия данных не изменилась, график не трогается.
+matplotlib импортируется при создании первого графика.
+"""
+
+from abc import ABC, abstractmethod
+from timeseries import lttb
+
+class Chart(ABC):
+    """Базовый график: фигура, оси и холст, созданные один раз.
+    Подклассы задают ``set_data``."""
+
+    def __init__(self, parent, title, xlabel, ylabel, empty_text="Нет данных", figsize=(6, 4)):
+        from matplotlib.figure import Figure
+        self.figure = Figure(figsize=figsize)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_title(title)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self.empty_label = self.ax.text(0.5, 0.5, empty_text, transform=self.ax.transAxes,
+                                        ha='center', va='center')
+        self.canvas, self.widget = self.create_canvas(parent)
+        self.version = None
+        self.draw_count = 0
+
+    def create_canvas(self, parent):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        canvas = FigureCanvasTkAgg(self.figure, master=parent)
+        return canvas, canvas.get_tk_widget()
+
+    def update(self, data, version=None):
+        """Показывает новые данные; при неизменной версии ничего не делает.
+
+        Возвращает True, если график был обновлён.
+        """
+        if version is not None and version == self.version:
+            return False
+        self.version = version
+        self.empty_label.set_visible(not data)
+        self.set_data(data)
+        self.redraw()
+        return True
+
+    @abstractmethod
+    def set_data(self, data):
+        """Переносит данные в линии или столбцы графика (без перерисовки)."""
+
+    def redraw(self):
+        self.draw_count += 1
+        self.canvas.draw_idle()
+
+class LineChart(Chart):
+    """Линейный график по парам ``(дата, значение)``.
+
+    Длинный ряд прореживается (``timeseries.lttb``) до числа точек не больше
+    ширины осей в пикселях, поэтому отрисовка не зависит от длины истории.
+
+    При ``blit=True`` линия рисуется отдельно от фона: если масштаб осей не
+    изменился, обновляется только область осей без полной перерисовки.
+    """
+
+    def __init__(self, parent, title, xlabel, ylabel, blit=False, **kwargs):
+        super().__init__(parent, title, xlabel, ylabel, **kwargs)
+        self.ax.xaxis_date()
+        self.ax.tick_params(axis='x', labelrotation=30)
+        self.ax.grid(True)
+        (self.line,) = self.ax.plot([], [], marker='o', animated=blit)
+        self.blit = blit
+        self._background = None
+        self._limits_changed = True
+        if blit:
+            self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def set_data(self, data):
+        from matplotlib.dates import date2num
+        limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        data = lttb(data, int(self.ax.bbox.width))
+        self.line.set_data(date2num([d for d, _ in data]), [v for _, v in data])
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self._limits_changed = limits != (self.ax.get_xlim(), self.ax.get_ylim())
+
+    def redraw(self):
+        if self.blit and self._background is not None and not self._limits_changed:
+            self.canvas.restore_region(self._background)
+            self.ax.draw_artist(self.line)
+            self.canvas.blit(self.ax.bbox)
+        else:
+            super().redraw()
+
+    def _on_draw(self, event):
+        # Запоминаем фон без линии и дорисовываем её поверх
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+class BarChart(Chart):
+    """Горизонтальная столбчатая диаграмма по парам ``(название, значение)``.
+
+    Пары передаются по убыванию значения; первая пара выводится сверху.
+    """
+
+    def __init__(self, parent, title, xlabel, ylabel, **kwargs):
+        super().__init__(parent, title, xlabel, ylabel, **kwargs)
+        self.bars = None
+
+    def set_data(self, data):
+        names = [name for name, _ in data][::-1]
+        values = [value for _, value in data][::-1]
+        if self.bars is not None and len(self.bars) == len(values):
+            for bar, value in zip(self.bars, values):
+                bar.set_width(value)
+        else:
+            if self.bars is not None:
+                self.bars.remove()
+            self.bars = self.ax.barh(range(len(values)), values)
+        self.ax.set_yticks(range(len(names)), labels=names)
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+class ChartManager:
+    """Хранит графики по ключу и создаёт каждый только при первом обращении."""
+
+    def __init__(self):
+        self.charts = {}
+
+    def get(self, key, factory):
+        chart = self.charts.get(key)
+        if chart is None:
+            chart = self.charts[key] = factory()
+            chart.widget.pack(fill='both', expand=True)
+        return chart
+
+    def update(self, key, factory, data, version=None):
+        return self.get(key, factory).update(data, version)
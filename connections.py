@@ -0,0 +1,111 @@
+"""
+Доступ к одной базе SQLite из нескольких потоков.
+
+Соединение ``sqlite3`` привязано к создавшему его потоку, а одновременная
+запись из разных соединений приводит к ``database is locked``. Поэтому
+``ConnectionManager`` переводит базу в режим WAL, выдаёт каждому потоку
+своё соединение только для чтения (читатели не ждут писателя) и выполняет
+все записи по очереди в одном потоке-писателе. Результат записи
+возвращается через ``concurrent.futures.Future``.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+from db import Database
+
+_STOP = object()
+
+class ConnectionManager:
+    """Потоковые соединения для чтения и очередь записей к файлу ``db_path``.
+
+    ``reader()`` возвращает ``Database`` текущего потока (создаётся при первом
+    обращении и затем переиспользуется). ``submit(func, *args)`` ставит
+    ``func(db, *args)`` в очередь писателя и возвращает ``Future``; ``db`` —
+    ``Database`` потока-писателя, транзакции внутри ``func`` те же, что и при
+    обычной работе с ``Database``.
+    """
+
+    def __init__(self, db_path, synchronous='NORMAL', busy_timeout_ms=5000):
+        if db_path == ':memory:':
+            raise ValueError("Для нескольких соединений нужна база в файле, а не :memory:")
+        self.db_path = db_path
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._closed_lock = threading.Lock()  # submit() не ставит задачу после _STOP
+        ready = Future()
+        self._writer = threading.Thread(target=self._write_loop, args=(ready,), name='db-writer', daemon=True)
+        self._writer.start()
+        # Схема приводится к актуальной версии писателем; ошибку открытия отдаём сразу
+        ready.result()
+
+    def reader(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # Закрывается из close() в другом потоке, отсюда check_same_thread=False
+            db = Database(self.db_path, check_same_thread=False)
+            db.conn.execute(f'PRAGMA busy_timeout={self.busy_timeout_ms}')
+            db.conn.execute('PRAGMA query_only=ON')
+            self._local.db = db
+            with self._readers_lock:
+                self._readers.append(db)
+        return db
+
+    def submit(self, func, *args):
+        """Выполняет ``func(db, *args)`` в потоке-писателе; возвращает ``Future``.
+        После ``close()`` — RuntimeError."""
+        future = Future()
+        with self._closed_lock:
+            if self._closed:
+                raise RuntimeError("ConnectionManager закрыт")
+            self._queue.put((func, args, future))
+        return future
+
+    def insert_client(self, client):
+        return self.submit(Database.insert_client, client)
+
+    def insert_order(self, order):
+        return self.submit(Database.insert_order, order)
+
+    def close(self):
+        """Дожидается выполнения поставленных записей и закрывает все соединения."""
+        with self._closed_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._writer.join()
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for db in readers:
+            db.close()
+
+    def _write_loop(self, ready):
+        try:
+            db = Database(self.db_path, journal_mode='WAL', synchronous=self.synchronous)
+            db.conn.execute(f'PRAGMA busy_timeout={self.busy_timeout_ms}')
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            func, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(db, *args)
+            except Exception as e:
+                if db.conn.in_transaction:
+                    db.conn.rollback()
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+        db.close()
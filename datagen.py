@@ -0,0 +1,74 @@
+"""
+Генератор синтетических клиентов и заказов для замеров производительности.
+
+Данные воспроизводимы (задаётся ``seed``) и похожи на настоящие: немногие
+клиенты делают большую часть заказов, популярность товаров убывает по
+закону Ципфа, в заказе чаще всего один-три товара, по выходным заказов
+больше.
+"""
+
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import accumulate
+from models import Client, Product, Order
+
+SURNAMES = ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Васильев", "Соколов", "Михайлов", "Новиков"]
+NAMES = ["Иван", "Петр", "Алексей", "Сергей", "Андрей", "Дмитрий", "Николай", "Михаил"]
+PATRONYMICS = ["Иванович", "Петрович", "Сергеевич", "Андреевич", "Николаевич"]
+# Каталог gui.DEFAULT_CATALOG; остальные товары генерируются
+BASE_CATALOG = [("Сахар", 50), ("Соль", 20), ("Перец черный, молотый", 30), ("Перец красный, молотый", 35), ("Куркума", 50)]
+
+def generate_clients(count, rnd):
+    return [
+        Client(str(i), f"{rnd.choice(SURNAMES)} {rnd.choice(NAMES)} {rnd.choice(PATRONYMICS)}",
+               f"+79{i:09d}", f"client{i}@example.com")
+        for i in range(1, count + 1)
+    ]
+
+def generate_catalog(count, rnd):
+    catalog = [Product(name, price) for name, price in BASE_CATALOG[:count]]
+    for i in range(len(catalog) + 1, count + 1):
+        catalog.append(Product(f"Товар {i}", round(rnd.lognormvariate(4, 0.6), 2)))
+    return catalog
+
+def generate(n_clients, n_orders, seed=0, n_products=50, start=datetime(2024, 1, 1), days=365):
+    """Возвращает ``(clients, orders)`` — объекты ``models.Client`` и ``models.Order``.
+
+    Номера заказов идут подряд с 1, даты — в пределах ``days`` дней от
+    ``start``. Одинаковые товары в заказе означают несколько единиц товара;
+    объекты ``Product`` общие для всех заказов.
+    """
+    rnd = random.Random(seed)
+    clients = generate_clients(n_clients, rnd)
+    catalog = generate_catalog(n_products, rnd)
+    # Активность клиентов по Парето, популярность товаров по Ципфу
+    client_weights = list(accumulate(rnd.paretovariate(1.2) for _ in clients))
+    product_weights = list(accumulate(1 / rank for rank in range(1, len(catalog) + 1)))
+    dates = [start + timedelta(days=d) for d in range(days)]
+    date_weights = list(accumulate(1.4 if date.weekday() >= 5 else 1.0 for date in dates))
+
+    buyers = rnd.choices(clients, cum_weights=client_weights, k=n_orders)
+    order_dates = rnd.choices(dates, cum_weights=date_weights, k=n_orders)
+    orders = []
+    for number, (client, date) in enumerate(zip(buyers, order_dates), start=1):
+        lines = 1
+        while lines < 10 and rnd.random() < 0.45:
+            lines += 1
+        products = rnd.choices(catalog, cum_weights=product_weights, k=lines)
+        orders.append(Order(str(number), client, products, date))
+    return clients, orders
+
+def to_certification(clients, orders):
+    """Те же данные в словарях формата ``certification.py`` (id — целые числа)."""
+    client_dicts = [{"id": int(c.number), "name": c.fio, "email": c.email, "phone": c.phone} for c in clients]
+    order_dicts = []
+    for o in orders:
+        counts = Counter(o.products)
+        order_dicts.append({
+            "id": int(o.number),
+            "client_id": int(o.client.number),
+            "products": [{"name": p.name, "qty": qty, "price": p.price} for p, qty in counts.items()],
+            "date": o.date.date().isoformat(),
+        })
+    return client_dicts, order_dicts
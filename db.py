@@ -3,88 +3,980 @@
 функции добавления и поиска.
 """
 
-import sqlite3
+import json
+import threading
+import time
+from collections import Counter
+from itertools import groupby, islice
 from models import Client, Product, Order
-from datetime import datetime
+from metrics import connect_sqlite, timed, timer
+from timeseries import BUCKETS, bucket_start, check_bucket
+from datetime import date, datetime
 
-class Database:
-    def __init__(self, db_path):
-        self.conn = sqlite3.connect(db_path)
-        self.create_tables()
+def _columns(cursor, table):
+    """Имена столбцов таблицы (пустой список, если таблицы нет)."""
+    return [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
 
-    def create_tables(self):
-        cursor = self.conn.cursor()
+def _migrate_base_tables(cursor):
+    """Версия 1: каноническая схема clients/orders/order_products/products.
+
+    Понимает обе исторические раскладки: схему прежнего ``create_tables``
+    (таблицы уже канонические, не хватает ``clients.address``) и раскладку
+    поставляемого ``shop.db`` (``client_id``, ``order_id``, связь товаров
+    через ``product_id``), которая переносится в канонические таблицы.
+    """
+    legacy = 'client_id' in _columns(cursor, 'clients')
+    if legacy:
+        for table in ('clients', 'orders', 'order_products'):
+            cursor.execute(f'ALTER TABLE {table} RENAME TO legacy_{table}')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS clients (
+            number TEXT PRIMARY KEY,
+            fio TEXT,
+            phone TEXT,
+            email TEXT,
+            address TEXT
+        )
+    ''')
+    if 'address' not in _columns(cursor, 'clients'):
+        cursor.execute('ALTER TABLE clients ADD COLUMN address TEXT')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS orders (
+            number TEXT PRIMARY KEY,
+            client_number TEXT,
+            date TEXT,
+            FOREIGN KEY(client_number) REFERENCES clients(number)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_products (
+            order_number TEXT,
+            product_name TEXT,
+            product_price REAL,
+            FOREIGN KEY(order_number) REFERENCES orders(number)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS products (
+            product_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            price REAL NOT NULL
+        )
+    ''')
+    if legacy:
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS clients (
-                number TEXT PRIMARY KEY,
-                fio TEXT,
-                phone TEXT,
-                email TEXT
-            )
+            INSERT INTO clients (number, fio, phone, email, address)
+            SELECT CAST(client_id AS TEXT), name, phone, email, address
+            FROM legacy_clients
         ''')
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS orders (
-                number TEXT PRIMARY KEY,
-                client_number TEXT,
-                date TEXT,
-                FOREIGN KEY(client_number) REFERENCES clients(number)
-            )
+            INSERT INTO orders (number, client_number, date)
+            SELECT CAST(order_id AS TEXT), CAST(client_id AS TEXT), date_order
+            FROM legacy_orders ORDER BY order_id
         ''')
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS order_products (
-                order_number TEXT,
-                product_name TEXT,
-                product_price REAL,
-                FOREIGN KEY(order_number) REFERENCES orders(number)
-            )
+            INSERT INTO order_products (order_number, product_name, product_price)
+            SELECT CAST(op.order_id AS TEXT), p.name, p.price
+            FROM legacy_order_products op
+            JOIN products p ON p.product_id = op.product_id
+            ORDER BY op.order_id, op.product_id
         ''')
-        self.conn.commit()
+        for table in ('order_products', 'orders', 'clients'):
+            cursor.execute(f'DROP TABLE legacy_{table}')
+
+def _migrate_indexes(cursor):
+    """Версия 2: индексы под соединения и фильтры по заказам."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_products_order ON order_products(order_number)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_client ON orders(client_number)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(date)')
+
+def _migrate_keyset_indexes(cursor):
+    """Версия 3: составные индексы под постраничный вывод заказов по ключу.
+
+    Они начинаются с тех же столбцов, что и индексы версии 2, поэтому
+    одностолбцовые индексы по клиенту и дате удаляются.
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_client_number ON orders(client_number, number)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_date_number ON orders(date, number)')
+    cursor.execute('DROP INDEX IF EXISTS idx_orders_client')
+    cursor.execute('DROP INDEX IF EXISTS idx_orders_date')
+
+def _migrate_client_search(cursor):
+    """Версия 4: полнотекстовый индекс клиентов (FTS5, триграммы).
+
+    Таблица ``clients_fts`` хранит только индекс, текст берётся из
+    ``clients`` по rowid; триггеры поддерживают её в актуальном состоянии.
+    С версии 7 индекс ссылается на ``clients.id``.
+    """
+    _create_client_search(cursor, 'rowid')
+    # Запросы короче триграммы ищутся по началу ФИО
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clients_fio ON clients(fio)')
+
+def _create_client_search(cursor, key):
+    """Индекс ``clients_fts`` поверх столбца ``key`` таблицы ``clients`` и
+    поддерживающие его триггеры."""
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(
+            fio, email, phone,
+            content='clients', content_rowid='{key}', tokenize='trigram'
+        )
+    ''')
+    # executescript() сам завершает транзакцию, поэтому триггеры создаются по одному
+    for trigger in (f'''
+        CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN
+            INSERT INTO clients_fts(rowid, fio, email, phone)
+            VALUES (new.{key}, new.fio, new.email, new.phone);
+        END
+    ''', f'''
+        CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN
+            INSERT INTO clients_fts(clients_fts, rowid, fio, email, phone)
+            VALUES ('delete', old.{key}, old.fio, old.email, old.phone);
+        END
+    ''', f'''
+        CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE ON clients BEGIN
+            INSERT INTO clients_fts(clients_fts, rowid, fio, email, phone)
+            VALUES ('delete', old.{key}, old.fio, old.email, old.phone);
+            INSERT INTO clients_fts(rowid, fio, email, phone)
+            VALUES (new.{key}, new.fio, new.email, new.phone);
+        END
+    '''):
+        cursor.execute(trigger)
+    cursor.execute("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')")
+
+def _migrate_order_rollups(cursor):
+    """Версия 5: число заказов по дням, неделям и месяцам (``order_rollups``).
+
+    ``period`` — первый день интервала (``YYYY-MM-DD``, неделя начинается с
+    понедельника). Как и в ``orders_to_df``, заказы без товаров не считаются.
+    Уже имеющиеся заказы подсчитываются здесь, новые — ``Database`` в той же
+    транзакции, что и вставка заказа (см. ``_write_rollups``).
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_rollups (
+            bucket TEXT NOT NULL,
+            period TEXT NOT NULL,
+            orders INTEGER NOT NULL,
+            PRIMARY KEY (bucket, period)
+        ) WITHOUT ROWID
+    ''')
+    periods = {
+        'day': "substr(date, 1, 10)",
+        'week': "date(substr(date, 1, 10), 'weekday 0', '-6 days')",
+        'month': "substr(date, 1, 7) || '-01'",
+    }
+    for bucket, period in periods.items():
+        cursor.execute(f'''
+            INSERT INTO order_rollups (bucket, period, orders)
+            SELECT '{bucket}', {period}, COUNT(*) FROM orders o
+            WHERE date IS NOT NULL
+              AND EXISTS (SELECT 1 FROM order_products op WHERE op.order_number = o.number)
+            GROUP BY 2
+        ''')
+
+def _migrate_product_catalog(cursor):
+    """Версия 6: справочник товаров с историей цен; строки заказов ссылаются на товар.
+
+    ``order_products`` вместо названия и цены хранит ``product_id``, цену
+    на момент заказа (``unit_price``) и количество: одинаковые товары по
+    одной цене, идущие в заказе подряд, сворачиваются в одну строку, так что
+    порядок товаров сохраняется. Товары, известные только по
+    строкам заказов, добавляются в ``products`` с последней ценой. История цен
+    ``product_prices`` начинается с первого заказа товара; ``valid_to`` у
+    действующей цены — NULL.
+    """
+    cursor.execute('''
+        DELETE FROM products
+        WHERE product_id NOT IN (SELECT MIN(product_id) FROM products GROUP BY name)
+    ''')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_products_name ON products(name)')
+    cursor.execute('''
+        INSERT INTO products (name, price)
+        SELECT product_name, product_price FROM order_products
+        WHERE rowid IN (SELECT MAX(rowid) FROM order_products GROUP BY product_name)
+          AND product_name NOT IN (SELECT name FROM products)
+        ORDER BY rowid
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS product_prices (
+            product_id INTEGER NOT NULL REFERENCES products(product_id),
+            valid_from TEXT NOT NULL,
+            valid_to TEXT,
+            price REAL NOT NULL,
+            PRIMARY KEY (product_id, valid_from)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        INSERT INTO product_prices (product_id, valid_from, price)
+        SELECT p.product_id,
+               COALESCE((SELECT MIN(o.date) FROM order_products op
+                         JOIN orders o ON o.number = op.order_number
+                         WHERE op.product_name = p.name), ?),
+               p.price
+        FROM products p
+    ''', (PRICE_HISTORY_START,))
+    cursor.execute('''
+        CREATE TABLE order_lines (
+            order_number TEXT,
+            product_id INTEGER NOT NULL REFERENCES products(product_id),
+            unit_price REAL NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 1,
+            FOREIGN KEY(order_number) REFERENCES orders(number)
+        )
+    ''')
+    # run — номер серии одинаковых строк подряд внутри заказа
+    cursor.execute('''
+        WITH lines AS (
+            SELECT op.rowid AS line, op.order_number, p.product_id, op.product_price,
+                   ROW_NUMBER() OVER (PARTITION BY op.order_number ORDER BY op.rowid)
+                   - ROW_NUMBER() OVER (PARTITION BY op.order_number, p.product_id, op.product_price
+                                        ORDER BY op.rowid) AS run
+            FROM order_products op
+            JOIN products p ON p.name = op.product_name
+        )
+        INSERT INTO order_lines (order_number, product_id, unit_price, quantity)
+        SELECT order_number, product_id, product_price, COUNT(*)
+        FROM lines
+        GROUP BY order_number, product_id, product_price, run
+        ORDER BY MIN(line)
+    ''')
+    cursor.execute('DROP TABLE order_products')
+    cursor.execute('ALTER TABLE order_lines RENAME TO order_products')
+    cursor.execute('CREATE INDEX idx_order_products_order ON order_products(order_number)')
+
+def _migrate_client_ids(cursor):
+    """Версия 7: явный ключ ``clients.id INTEGER PRIMARY KEY`` для индекса поиска.
+
+    У таблицы с текстовым первичным ключом неявный rowid может смениться при
+    VACUUM, и ``clients_fts`` разошёлся бы с таблицей. Таблица пересоздаётся
+    с ``id`` (равным прежнему rowid) и уникальным ``number``, индекс поиска
+    строится заново поверх ``id``.
+    """
+    for name in ('insert', 'delete', 'update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS clients_fts_{name}')
+    cursor.execute('DROP TABLE IF EXISTS clients_fts')
+    cursor.execute('''
+        CREATE TABLE clients_new (
+            id INTEGER PRIMARY KEY,
+            number TEXT NOT NULL UNIQUE,
+            fio TEXT,
+            phone TEXT,
+            email TEXT,
+            address TEXT
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO clients_new (id, number, fio, phone, email, address)
+        SELECT rowid, number, fio, phone, email, address FROM clients
+    ''')
+    cursor.execute('DROP TABLE clients')
+    cursor.execute('ALTER TABLE clients_new RENAME TO clients')
+    cursor.execute('CREATE INDEX idx_clients_fio ON clients(fio)')
+    _create_client_search(cursor, 'id')
+
+# Начало истории цен товаров, для которых нет ни одного заказа
+PRICE_HISTORY_START = '0001-01-01T00:00:00'
+
+# Миграции схемы по порядку; номер версии = позиция в списке + 1.
+# Текущая версия хранится в PRAGMA user_version.
+MIGRATIONS = [
+    _migrate_base_tables,
+    _migrate_indexes,
+    _migrate_keyset_indexes,
+    _migrate_client_search,
+    _migrate_order_rollups,
+    _migrate_product_catalog,
+    _migrate_client_ids,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate(conn):
+    """Применяет недостающие миграции, каждую в отдельной транзакции."""
+    cursor = conn.cursor()
+    version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Версия схемы базы ({version}) новее поддерживаемой ({SCHEMA_VERSION})")
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        cursor.execute('BEGIN')
+        try:
+            MIGRATIONS[target - 1](cursor)
+            cursor.execute(f'PRAGMA user_version = {target}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return SCHEMA_VERSION
+
+# Допустимые ключи сортировки для постраничного вывода заказов.
+# Номер заказа всегда замыкает ключ, чтобы он был уникальным.
+ORDER_SORT_KEYS = {
+    'number': ('o.number',),
+    'date': ('o.date', 'o.number'),
+    'client_number': ('o.client_number', 'o.number'),
+}
+
+# Допустимые значения PRAGMA journal_mode и synchronous (они подставляются в текст запроса)
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
 
+# Сколько совпадений полнотекстового поиска ранжируется в search_clients
+SEARCH_CANDIDATES = 1000
+
+class Database:
+    """Работа с базой SQLite.
+
+    Режим отложенной записи (``group_size``): ``insert_client`` и
+    ``insert_order`` только ставят запись в очередь, а очередь фиксируется
+    одной транзакцией, как только в ней ``group_size`` записей или первая из
+    них ждёт ``group_delay_ms`` миллисекунд (это делает фоновый поток).
+    Гарантии при сбое процесса или питания:
+
+    * запись сохранена, только когда зафиксирована её группа: после
+      ``flush()``, ``close()`` или срабатывания порога; при аварийном
+      завершении теряется не больше одной незафиксированной группы;
+    * группа фиксируется целиком или не фиксируется вовсе, частично
+      записанных заказов (заказ без части товаров) не бывает;
+    * с ``synchronous='FULL'`` зафиксированная группа переживает и отключение
+      питания; с ``'NORMAL'`` в режиме WAL — сбой процесса, но при отключении
+      питания могут пропасть последние группы.
+
+    Запись, нарушившая ограничения базы (например, повтор номера), не мешает
+    остальным записям группы; ошибки накапливаются и сообщаются только
+    ``flush()`` или ``close()`` — ``insert_*`` лишь ставит запись в очередь и
+    не отвечает за чужие записи. Незафиксированные записи не видны запросам
+    на чтение, пока не вызван ``flush()``. Фоновый поток пишет через то же
+    соединение, поэтому чтение тоже идёт под ``self._lock``.
+    """
+
+    def __init__(self, db_path, journal_mode=None, synchronous=None, check_same_thread=True,
+                 group_size=None, group_delay_ms=50):
+        """Открывает базу; ``journal_mode`` (например ``'WAL'``) и ``synchronous``
+        (``'FULL'``, ``'NORMAL'``, ``'OFF'``) передаются в одноимённые PRAGMA;
+        значения не из ``JOURNAL_MODES``/``SYNCHRONOUS_MODES`` — ValueError.
+        ``group_size`` включает отложенную запись (см. описание класса).
+        Для работы из нескольких потоков см. ``connections.ConnectionManager``."""
+        if journal_mode and journal_mode.upper() not in JOURNAL_MODES:
+            raise ValueError(f"Неизвестный journal_mode: {journal_mode}")
+        if synchronous and synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Неизвестный режим synchronous: {synchronous}")
+        # В режиме отложенной записи соединением пользуется и фоновый поток (под self._lock)
+        # Если сбор метрик включён, соединение замеряет каждый запрос (см. metrics.py)
+        self.conn = connect_sqlite(db_path, check_same_thread=check_same_thread and not group_size)
+        if journal_mode:
+            self.conn.execute(f'PRAGMA journal_mode={journal_mode}')
+        if synchronous:
+            self.conn.execute(f'PRAGMA synchronous={synchronous}')
+        self.create_tables()
+        self.group_size = group_size
+        self.group_delay = group_delay_ms / 1000
+        self._lock = threading.RLock()
+        self._pending = []         # очередь отложенной записи: ('client' | 'order', объект)
+        self._pending_since = 0.0  # когда в пустую очередь попала первая запись
+        self._write_errors = []
+        self._flusher = None
+        if group_size:
+            self._wakeup = threading.Condition(self._lock)
+            self._closing = False
+            self._flusher = threading.Thread(target=self._flush_loop, name='db-group-commit', daemon=True)
+            self._flusher.start()
+
+    def create_tables(self):
+        """Приводит схему к актуальной версии (см. ``MIGRATIONS``)."""
+        migrate(self.conn)
+
+    @timed('db.insert_client')
     def insert_client(self, client):
-        cursor = self.conn.cursor()
-        cursor.execute('''
+        if self.group_size:
+            return self._enqueue('client', client)
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                INSERT INTO clients (number, fio, phone, email)
+                VALUES (?, ?, ?, ?)
+            ''', (client.number, client.fio, client.phone, client.email))
+            self.conn.commit()
+
+    @timed('db.insert_order')
+    def insert_order(self, order):
+        if self.group_size:
+            return self._enqueue('order', order)
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                INSERT INTO orders (number, client_number, date)
+                VALUES (?, ?, ?)
+            ''', (order.number, order.client.number, order.date.isoformat()))
+            self._write_lines([order])
+            self._write_rollups([order])
+            self.conn.commit()
+
+    @timed('db.insert_clients')
+    def insert_clients(self, clients, chunk_size=10000):
+        """Пакетная вставка клиентов: executemany и одна транзакция на порцию.
+
+        Возвращает статистику загрузки (см. ``_bulk_stats``).
+        """
+        return self._insert_chunks(clients, chunk_size, self._write_clients)
+
+    @timed('db.insert_orders')
+    def insert_orders(self, orders, chunk_size=10000):
+        """Пакетная вставка заказов вместе с товарами.
+
+        Каждые ``chunk_size`` заказов записываются в одной транзакции двумя
+        вызовами executemany. Возвращает статистику загрузки по заказам.
+        """
+        return self._insert_chunks(orders, chunk_size, self._write_orders)
+
+    def _insert_chunks(self, items, chunk_size, write):
+        start = time.perf_counter()
+        count = 0
+        items = iter(items)
+        with self._lock:
+            # Отложенные записи фиксируются раньше пакета, чтобы сохранить порядок;
+            # их ошибки по-прежнему сообщает flush()
+            self._commit_pending()
+            while True:
+                chunk = list(islice(items, chunk_size))
+                if not chunk:
+                    break
+                with self.conn:
+                    write(chunk)
+                count += len(chunk)
+        return _bulk_stats(count, time.perf_counter() - start)
+
+    def _write_clients(self, clients):
+        self.conn.executemany('''
             INSERT INTO clients (number, fio, phone, email)
             VALUES (?, ?, ?, ?)
-        ''', (client.number, client.fio, client.phone, client.email))
-        self.conn.commit()
+        ''', [(c.number, c.fio, c.phone, c.email) for c in clients])
 
-    def insert_order(self, order):
-        cursor = self.conn.cursor()
-        cursor.execute('''
+    def _write_orders(self, orders):
+        self.conn.executemany('''
             INSERT INTO orders (number, client_number, date)
             VALUES (?, ?, ?)
-        ''', (order.number, order.client.number, order.date.isoformat()))
-        for product in order.products:
-            cursor.execute('''
-                INSERT INTO order_products (order_number, product_name, product_price)
-                VALUES (?, ?, ?)
-            ''', (order.number, product.name, product.price))
-        self.conn.commit()
+        ''', [(o.number, o.client.number, o.date.isoformat()) for o in orders])
+        self._write_lines(orders)
+        self._write_rollups(orders)
+
+    def _write_lines(self, orders):
+        # Одинаковые товары по одной цене подряд — одна строка с количеством;
+        # порядок товаров заказа сохраняется
+        ids = self._product_ids(orders)
+        lines = []
+        for o in orders:
+            products = o.products
+            if len(products) == 1:
+                product = products[0]
+                lines.append((o.number, ids[product.name], product.price, 1))
+                continue
+            for (name, price), run in groupby(products, key=lambda p: (p.name, p.price)):
+                lines.append((o.number, ids[name], price, sum(1 for _ in run)))
+        self.conn.executemany('''
+            INSERT INTO order_products (order_number, product_id, unit_price, quantity)
+            VALUES (?, ?, ?, ?)
+        ''', lines)
+
+    def _product_ids(self, orders):
+        """Коды товаров заказов по названиям; неизвестные товары добавляются в
+        справочник с ценой и датой первого из этих заказов."""
+        first = {}
+        for o in orders:
+            for p in o.products:
+                seen = first.get(p.name)
+                if seen is None or o.date < seen[1]:
+                    first[p.name] = (p.price, o.date)
+        if not first:
+            return {}
+        ids = dict(self.conn.execute(
+            'SELECT name, product_id FROM products WHERE name IN (SELECT value FROM json_each(?))',
+            (json.dumps(list(first), ensure_ascii=False),)))
+        for name, (price, date) in first.items():
+            if name not in ids:
+                ids[name] = self._add_product(name, price, date.isoformat())
+        return ids
+
+    def _add_product(self, name, price, valid_from):
+        product_id = self.conn.execute('INSERT INTO products (name, price) VALUES (?, ?)', (name, price)).lastrowid
+        self.conn.execute('INSERT INTO product_prices (product_id, valid_from, price) VALUES (?, ?, ?)',
+                          (product_id, valid_from, price))
+        return product_id
+
+    def _write_rollups(self, orders):
+        # Итоги по периодам обновляются одним запросом на порцию заказов, а не
+        # триггером на каждую строку товара: так вставка почти не замедляется
+        days = Counter(o.date.date() for o in orders if o.products)
+        totals = Counter()
+        for day, count in days.items():
+            for bucket in BUCKETS:
+                totals[bucket, bucket_start(day, bucket).date().isoformat()] += count
+        self.conn.executemany('''
+            INSERT INTO order_rollups (bucket, period, orders) VALUES (?, ?, ?)
+            ON CONFLICT (bucket, period) DO UPDATE SET orders = orders + excluded.orders
+        ''', [(bucket, period, count) for (bucket, period), count in totals.items()])
+
+    def _enqueue(self, kind, item):
+        with self._lock:
+            self._pending.append((kind, item))
+            if len(self._pending) >= self.group_size:
+                self._commit_pending()
+            elif len(self._pending) == 1:
+                self._pending_since = time.monotonic()
+                self._wakeup.notify()
+
+    def flush(self):
+        """Фиксирует очередь отложенной записи; возвращает число записей в группе."""
+        with self._lock:
+            count = self._commit_pending()
+        self._raise_write_errors()
+        return count
+
+    def _commit_pending(self):
+        if not self._pending:
+            return 0
+        # Замеряется каждая зафиксированная группа: по размеру, по времени или flush()
+        with timer('db.flush'):
+            pending, self._pending = self._pending, []
+            self._write_errors.extend(self.write_batch(pending))
+        return len(pending)
+
+    def write_batch(self, records):
+        """Записывает ``[('client' | 'order', объект), ...]`` одной транзакцией.
+
+        Если транзакция не удалась, записи повторяются по одной и ошибочные
+        пропускаются. Возвращает список ``(объект, исключение)`` для
+        незаписанных записей.
+        """
+        if not records:
+            return []
+        writers = {'client': self._write_clients, 'order': self._write_orders}
+        errors = []
+        with self._lock:
+            try:
+                with self.conn:
+                    # Подряд идущие записи одного вида — одним executemany
+                    for kind, items in groupby(records, key=lambda entry: entry[0]):
+                        writers[kind]([item for _, item in items])
+            except Exception:
+                # Группа откатилась; записываем по одной, пропуская ошибочные
+                for kind, item in records:
+                    try:
+                        with self.conn:
+                            writers[kind]([item])
+                    except Exception as e:
+                        errors.append((item, e))
+        return errors
 
+    def _raise_write_errors(self):
+        with self._lock:
+            errors, self._write_errors = self._write_errors, []
+        if errors:
+            details = '; '.join(f"{item!r}: {error}" for item, error in errors)
+            raise ValueError(f"Не записано отложенных записей: {len(errors)} ({details})")
+
+    def _flush_loop(self):
+        with self._lock:
+            while not self._closing:
+                if not self._pending:
+                    self._wakeup.wait()
+                    continue
+                remaining = self._pending_since + self.group_delay - time.monotonic()
+                if remaining > 0:
+                    self._wakeup.wait(remaining)
+                    continue
+                self._commit_pending()
+
+    @timed('db.get_clients')
     def get_clients(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT number, fio, phone, email FROM clients')
-        rows = cursor.fetchall()
+        with self._lock:
+            rows = self.conn.execute('SELECT number, fio, phone, email FROM clients').fetchall()
+        return [Client(*row) for row in rows]
+
+    def get_client_numbers(self):
+        """Множество номеров всех клиентов (без создания объектов ``Client``)."""
+        with self._lock:
+            return {row[0] for row in self.conn.execute('SELECT number FROM clients')}
+
+    @timed('db.search_clients')
+    def search_clients(self, query, limit=20):
+        """Клиенты, у которых ФИО, email или телефон содержат все слова запроса.
+
+        Слова от трёх символов ищутся по триграммному индексу ``clients_fts``,
+        более короткие слова того же запроса — проверкой вхождения в найденных
+        строках. Первые ``SEARCH_CANDIDATES`` совпадений ранжируются в Python
+        (см. ``_search_rank``): bm25 в SQLite пересчитывает частоту слова по
+        всей таблице и на частых словах работает на порядок дольше. Запрос
+        только из коротких слов ищется как начало ФИО (с заглавной буквы или
+        как введён) по индексу ``idx_clients_fio``.
+        """
+        words = query.split()
+        if not words:
+            return []
+        long_words = [word for word in words if len(word) >= 3]
+        short_words = [word.casefold() for word in words if len(word) < 3]
+        with self._lock:
+            cursor = self.conn.cursor()
+            if long_words:
+                match = ' '.join('"{}"'.format(word.replace('"', '""')) for word in long_words)
+                cursor.execute('''
+                    SELECT c.number, c.fio, c.phone, c.email
+                    FROM clients_fts
+                    JOIN clients c ON c.id = clients_fts.rowid
+                    WHERE clients_fts MATCH ?
+                ''', (match,))
+                # LIKE в SQLite не различает регистр только для латиницы, поэтому
+                # короткие слова проверяются здесь
+                candidates = (row for row in cursor
+                              if all(word in _search_text(row) for word in short_words))
+                rows = list(islice(candidates, SEARCH_CANDIDATES))
+                cursor.close()
+                words = [word.casefold() for word in words]
+                rows = sorted(rows, key=lambda row: _search_rank(row, words))[:limit]
+            else:
+                prefix = query.strip()
+                variants = sorted({prefix, prefix[:1].upper() + prefix[1:]})
+                cursor.execute(
+                    ' UNION '.join(['SELECT number, fio, phone, email FROM clients WHERE fio >= ? AND fio < ?'] * len(variants))
+                    + ' ORDER BY fio LIMIT ?',
+                    [bound for v in variants for bound in (v, v + '\U0010ffff')] + [limit],
+                )
+                rows = cursor.fetchall()
         return [Client(*row) for row in rows]
 
+    @timed('db.get_products')
+    def get_products(self, at=None):
+        """Справочник товаров по кодам; при ``at`` — с ценами, действовавшими
+        на эту дату (товары, появившиеся позже, не входят)."""
+        with self._lock:
+            if at is None:
+                rows = self.conn.execute('SELECT product_id, name, price FROM products ORDER BY product_id').fetchall()
+            else:
+                at = _iso(at)
+                rows = self.conn.execute('''
+                    SELECT p.product_id, p.name, h.price
+                    FROM products p
+                    JOIN product_prices h ON h.product_id = p.product_id
+                    WHERE h.valid_from <= ? AND (h.valid_to IS NULL OR h.valid_to > ?)
+                    ORDER BY p.product_id
+                ''', (at, at)).fetchall()
+        return [Product(name, price, product_id) for product_id, name, price in rows]
+
+    def get_price_history(self, product_id):
+        """История цен товара: ``[(valid_from, valid_to, price), ...]`` по порядку дат."""
+        with self._lock:
+            return self.conn.execute('''
+                SELECT valid_from, valid_to, price FROM product_prices
+                WHERE product_id = ? ORDER BY valid_from
+            ''', (product_id,)).fetchall()
+
+    def set_product_price(self, name, price, valid_from=None):
+        """Новая цена товара ``name`` с даты ``valid_from`` (по умолчанию — сейчас).
+
+        Действующая цена закрывается этой датой; нового товара в справочнике
+        ещё нет — он добавляется. Цены в уже записанных заказах не меняются.
+        Возвращает код товара.
+        """
+        valid_from = _iso(valid_from or datetime.now())
+        with self._lock, self.conn:
+            row = self.conn.execute('SELECT product_id FROM products WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                return self._add_product(name, price, valid_from)
+            product_id = row[0]
+            current = self.conn.execute(
+                'SELECT MAX(valid_from) FROM product_prices WHERE product_id = ?', (product_id,)).fetchone()[0]
+            if current is not None and valid_from <= current:
+                raise ValueError(f"Цена товара «{name}» уже задана с {current}, новая дата должна быть позже")
+            self.conn.execute('UPDATE product_prices SET valid_to = ? WHERE product_id = ? AND valid_to IS NULL',
+                              (valid_from, product_id))
+            self.conn.execute('INSERT INTO product_prices (product_id, valid_from, price) VALUES (?, ?, ?)',
+                              (product_id, valid_from, price))
+            self.conn.execute('UPDATE products SET price = ? WHERE product_id = ?', (price, product_id))
+        return product_id
+
+    @timed('db.get_orders')
     def get_orders(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT number, client_number, date FROM orders')
-        orders_data = cursor.fetchall()
+        return list(self.iter_orders())
 
+    def iter_orders(self, batch_size=1000):
+        """Потоковая загрузка заказов вместе с клиентами и товарами.
+
+        Заказы читаются порциями по ``batch_size``: порция со своими товарами
+        выбирается одним JOIN-запросом, поэтому вся история не держится в
+        памяти. Каждая порция читается целиком под ``self._lock``, и курсор
+        не остаётся открытым, пока вызывающий код обрабатывает заказы.
+        """
         clients = {c.number: c for c in self.get_clients()}
-        orders = []
-        for number, client_number, date_str in orders_data:
+        with self._lock:
+            products = _ProductCache(self.conn)
+        last_rowid = 0
+        while True:
+            with self._lock:
+                # Граница порции по rowid: запрос идёт по первичному ключу и индексу товаров без сортировки
+                bound = self.conn.execute('SELECT MAX(rowid) FROM (SELECT rowid FROM orders WHERE rowid > ? '
+                                          'ORDER BY rowid LIMIT ?)', (last_rowid, batch_size)).fetchone()[0]
+                if bound is None:
+                    return
+                rows = self.conn.execute('''
+                    SELECT o.number, o.client_number, o.date, op.product_id, op.unit_price, op.quantity
+                    FROM orders o
+                    LEFT JOIN order_products op ON op.order_number = o.number
+                    WHERE o.rowid > ? AND o.rowid <= ?
+                    ORDER BY o.rowid, op.rowid
+                ''', (last_rowid, bound)).fetchall()
+                # Товары заказа собираются в список и присваиваются один раз
+                orders = []
+                order = None
+                for number, client_number, date_str, product_id, price, quantity in rows:
+                    if order is None or order.number != number:
+                        order = Order(number, clients.get(client_number), (), datetime.fromisoformat(date_str))
+                        order_products = []
+                        orders.append((order, order_products))
+                    if product_id is not None:
+                        order_products.extend([products.get(product_id, price)] * quantity)
+                for order, order_products in orders:
+                    order.products = order_products
+                orders = [order for order, _ in orders]
+                last_rowid = bound
+            yield from orders
+
+    @timed('db.get_orders_page')
+    def get_orders_page(self, after_key=None, limit=50, filters=None, order_by='number'):
+        """Страница заказов по ключу (keyset), без OFFSET.
+
+        ``order_by`` — ключ из ``ORDER_SORT_KEYS``, с префиксом ``-`` для
+        обратного порядка. ``after_key`` — ключ последней строки предыдущей
+        страницы (``None`` для первой). ``filters`` — словарь с необязательными
+        ``client_number``, ``date_from`` и ``date_to``.
+
+        Возвращает ``(orders, last_key)``; ``last_key`` передаётся в следующий вызов.
+        """
+        columns, descending = _sort_columns(order_by)
+        where, params = _orders_filter_sql(filters)
+        if after_key is not None:
+            where.append(f"({', '.join(columns)}) {'<' if descending else '>'} ({', '.join('?' * len(columns))})")
+            params.extend(after_key)
+        direction = ' DESC' if descending else ''
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute(f'''
+                SELECT o.number, o.client_number, o.date, {', '.join(columns)}
+                FROM orders o
+                {'WHERE ' + ' AND '.join(where) if where else ''}
+                ORDER BY {', '.join(c + direction for c in columns)}
+                LIMIT ?
+            ''', params + [limit])
+            rows = cursor.fetchall()
+            if not rows:
+                return [], None
+            return self._build_orders([row[:3] for row in rows]), tuple(rows[-1][3:])
+
+    @timed('db.seek_orders_key')
+    def seek_orders_key(self, position, filters=None, order_by='number'):
+        """Ключ строки, стоящей перед позицией ``position`` (для перехода к
+        произвольной странице); для позиции 0 — ``None``.
+
+        Стоит O(position): SQLite не умеет переходить к строке по номеру и
+        пропускает предшествующие строки по одной (``OFFSET``), хотя обычно
+        только по индексу, не читая таблицу. Поэтому ``PagedSource`` берёт
+        этот путь лишь для прыжков, а соседние страницы читает по ключу
+        последней строки.
+        """
+        if position <= 0:
+            return None
+        columns, descending = _sort_columns(order_by)
+        where, params = _orders_filter_sql(filters)
+        direction = ' DESC' if descending else ''
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute(f'''
+                SELECT {', '.join(columns)}
+                FROM orders o
+                {'WHERE ' + ' AND '.join(where) if where else ''}
+                ORDER BY {', '.join(c + direction for c in columns)}
+                LIMIT 1 OFFSET ?
+            ''', params + [position - 1])
+            row = cursor.fetchone()
+        return tuple(row) if row else None
+
+    @timed('db.count_orders')
+    def count_orders(self, filters=None):
+        where, params = _orders_filter_sql(filters)
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute(f'''
+                SELECT COUNT(*) FROM orders o {'WHERE ' + ' AND '.join(where) if where else ''}
+            ''', params)
+            return cursor.fetchone()[0]
+
+    def _build_orders(self, order_rows):
+        """Собирает заказы по строкам ``(number, client_number, date)``
+        двумя запросами: товары и клиенты только для этих заказов."""
+        numbers = [number for number, _, _ in order_rows]
+        client_numbers = sorted({client_number for _, client_number, _ in order_rows})
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+            SELECT number, fio, phone, email FROM clients
+            WHERE number IN ({', '.join('?' * len(client_numbers))})
+        ''', client_numbers)
+        clients = {row[0]: Client(*row) for row in cursor.fetchall()}
+        orders = {number: Order(number, clients.get(client_number), [], datetime.fromisoformat(date_str))
+                  for number, client_number, date_str in order_rows}
+        cursor.execute(f'''
+            SELECT order_number, product_id, unit_price, quantity FROM order_products
+            WHERE order_number IN ({', '.join('?' * len(numbers))})
+            ORDER BY rowid
+        ''', numbers)
+        products = _ProductCache(self.conn)
+        lines = {number: [] for number in numbers}
+        for number, product_id, price, quantity in cursor.fetchall():
+            lines[number].extend([products.get(product_id, price)] * quantity)
+        for number, order_products in lines.items():
+            orders[number].products = order_products
+        return [orders[number] for number in numbers]
+
+    @timed('db.get_order_lines')
+    def get_order_lines(self):
+        """Плоский список строк заказов для аналитики:
+        ``(order_number, client_number, fio, product_name, product_price, date)``,
+        строка на каждую единицу товара, как в ``Order.products``."""
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                SELECT o.number, o.client_number, c.fio, p.name, op.unit_price, o.date, op.quantity
+                FROM orders o
+                JOIN order_products op ON op.order_number = o.number
+                JOIN products p ON p.product_id = op.product_id
+                LEFT JOIN clients c ON c.number = o.client_number
+                ORDER BY o.rowid, op.rowid
+            ''')
+            lines = []
+            for row in cursor:
+                if row[6] == 1:
+                    lines.append(row[:6])
+                else:
+                    lines.extend([row[:6]] * row[6])
+        return lines
+
+    @timed('db.count_orders_by_client')
+    def count_orders_by_client(self, top=None):
+        """Число заказов (с хотя бы одним товаром) по клиентам, по убыванию
+        (при равенстве — по номеру клиента).
+
+        Возвращает список кортежей ``(number, fio, orders)``; агрегация
+        выполняется в SQLite, в Python приходит только итог.
+        """
+        with self._lock:
+            cursor = self.conn.cursor()
             cursor.execute('''
-                SELECT product_name, product_price FROM order_products WHERE order_number=?
-            ''', (number,))
-            products_data = cursor.fetchall()
-            products = [Product(name, price) for name, price in products_data]
-            date = datetime.fromisoformat(date_str)
-            client = clients.get(client_number)
-            order = Order(number, client, products, date)
-            orders.append(order)
-        return orders
+                SELECT o.client_number, c.fio, COUNT(*) AS orders_count
+                FROM orders o
+                LEFT JOIN clients c ON c.number = o.client_number
+                WHERE EXISTS (SELECT 1 FROM order_products op WHERE op.order_number = o.number)
+                GROUP BY o.client_number
+                ORDER BY orders_count DESC, o.client_number
+                LIMIT ?
+            ''', (-1 if top is None else top,))
+            return cursor.fetchall()
+
+    @timed('db.client_product_lines')
+    def client_product_lines(self):
+        """Строки заказов как ``(client_number, product_id, quantity)`` — без
+        группировки: повторяющиеся пары клиент/товар складывает получатель."""
+        with self._lock:
+            return self.conn.execute('''
+                SELECT o.client_number, op.product_id, op.quantity
+                FROM order_products op
+                JOIN orders o ON o.number = op.order_number
+            ''').fetchall()
+
+    @timed('db.count_orders_by_date')
+    def count_orders_by_date(self, bucket='day', date_from=None, date_to=None):
+        """Число заказов (с хотя бы одним товаром) по дням, неделям или месяцам:
+        ``[(начало интервала 'YYYY-MM-DD', orders), ...]``.
+
+        Читает готовые итоги ``order_rollups``, а не таблицу заказов;
+        ``date_from``/``date_to`` ограничивают начало интервала (``date_to`` не включается).
+        """
+        sql = 'SELECT period, orders FROM order_rollups WHERE bucket = ?'
+        params = [check_bucket(bucket)]
+        if date_from is not None:
+            sql += ' AND period >= ?'
+            params.append(_iso(date_from)[:10])
+        if date_to is not None:
+            sql += ' AND period < ?'
+            params.append(_iso(date_to)[:10])
+        with self._lock:
+            return self.conn.execute(sql + ' ORDER BY period', params).fetchall()
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        """Закрывает базу, предварительно зафиксировав очередь отложенной записи."""
+        if self._flusher is not None:
+            with self._lock:
+                self._closing = True
+                self._wakeup.notify()
+            self._flusher.join()
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+def _sort_columns(order_by):
+    descending = order_by.startswith('-')
+    key = order_by.lstrip('-')
+    if key not in ORDER_SORT_KEYS:
+        raise ValueError(f"Неизвестный ключ сортировки: {order_by}")
+    return ORDER_SORT_KEYS[key], descending
+
+def _orders_filter_sql(filters):
+    """Условия WHERE и параметры для фильтров списка заказов."""
+    filters = filters or {}
+    where, params = [], []
+    if filters.get('client_number') is not None:
+        where.append('o.client_number = ?')
+        params.append(filters['client_number'])
+    if filters.get('date_from') is not None:
+        where.append('o.date >= ?')
+        params.append(_iso(filters['date_from']))
+    if filters.get('date_to') is not None:
+        where.append('o.date < ?')
+        params.append(_iso(filters['date_to']))
+    return where, params
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+class _ProductCache:
+    """Общие объекты ``Product`` для строк заказов: по одному на код товара и цену."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.names = dict(conn.execute('SELECT product_id, name FROM products'))
+        self.products = {}
+
+    def get(self, product_id, price):
+        product = self.products.get((product_id, price))
+        if product is None:
+            if product_id not in self.names:
+                # Товар добавлен после создания кэша (например, фоновой записью)
+                self.names.update(self.conn.execute('SELECT product_id, name FROM products'))
+            product = self.products[product_id, price] = Product(self.names[product_id], price, product_id)
+        return product
+
+def _search_text(row):
+    """ФИО, телефон и email строки поиска одной строкой без учёта регистра."""
+    return ' '.join(value for value in row[1:] if value).casefold()
+
+def _search_rank(row, words):
+    """Ключ сортировки результатов поиска: сначала совпадения с началом
+    поля, затем совпадения в ФИО, затем более короткие ФИО."""
+    _, fio, phone, email = (value.casefold() if value else '' for value in row)
+    starts = any(field.startswith(words[0]) for field in (fio, phone, email))
+    in_fio = all(word in fio for word in words)
+    return (not starts, not in_fio, len(fio), fio)
+
+def _bulk_stats(rows, seconds):
+    """Словарь со статистикой пакетной загрузки: строк, секунд и строк в секунду."""
+    return {
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_sec': rows / seconds if seconds > 0 else float('inf'),
+    }
\ No newline at end of file
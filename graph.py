@@ -0,0 +1,168 @@
+"""
+Граф связей клиентов и товаров на разреженных матрицах.
+
+Покупки хранятся матрицей инцидентности «клиент × товар» (SciPy CSR, в
+ячейке — число купленных единиц). Связи строятся произведениями матриц:
+``B·Bᵀ`` — сколько разных товаров покупали оба клиента, ``Bᵀ·B`` — сколько
+клиентов покупали оба товара. Для клиентов произведение считается только
+по выбранным строкам, поэтому даже при сотнях тысяч клиентов не возникает
+структур размера n². В networkx выгружается лишь подграф из top-N вершин,
+который рисуется. scipy и networkx импортируются при первом обращении.
+"""
+
+from array import array
+
+class PurchaseGraph:
+    """Матрица покупок, пополняемая по мере поступления заказов.
+
+    Строки — клиенты (``clients[row]`` — номер клиента), столбцы — товары
+    (``products[col]`` — название). Новые заказы копятся в списках троек и
+    добавляются в матрицу при следующем обращении к ``incidence``.
+    """
+
+    def __init__(self):
+        self.clients = []
+        self.products = []
+        self.fio = {}  # номер клиента -> ФИО для подписей
+        self._client_rows = {}
+        self._product_cols = {}
+        self._matrix = None
+        self._reset_pending()
+
+    @classmethod
+    def from_db(cls, db):
+        """Граф по строкам заказов базы (``Database.client_product_lines``)."""
+        graph = cls()
+        graph.fio.update((c.number, c.fio) for c in db.get_clients())
+        # Столбцы заводятся сразу для всего справочника, строки заказов ссылаются на них по коду
+        columns = {p.id: graph._column(p.name) for p in db.get_products()}
+        graph._extend((number, columns[product_id], quantity)
+                      for number, product_id, quantity in db.client_product_lines())
+        return graph
+
+    def add_order(self, order):
+        """Учитывает заказ ``models.Order``."""
+        client = order.client
+        self.fio[client.number] = client.fio
+        self._extend((client.number, self._column(product.name), 1) for product in order.products)
+
+    def add_orders(self, orders):
+        for order in orders:
+            self.add_order(order)
+
+    @property
+    def incidence(self):
+        """Матрица «клиент × товар» (``scipy.sparse.csr_matrix``)."""
+        import numpy as np
+        from scipy import sparse
+        shape = (len(self.clients), len(self.products))
+        if self._matrix is None:
+            self._matrix = sparse.csr_matrix(shape)
+        if len(self._quantities):
+            # Повторяющиеся пары (клиент, товар) при преобразовании складываются
+            new = sparse.coo_matrix((np.frombuffer(self._quantities, dtype=np.float64).copy(),
+                                     (np.frombuffer(self._rows, dtype=np.int64).copy(),
+                                      np.frombuffer(self._cols, dtype=np.int64).copy())), shape=shape).tocsr()
+            matrix = self._matrix
+            if matrix.shape != shape:
+                matrix = matrix.copy()
+                matrix.resize(shape)
+            self._matrix = matrix + new
+            self._reset_pending()
+        return self._matrix
+
+    def client_cooccurrence(self, clients=None):
+        """Число общих товаров у пар клиентов ``clients``: разреженная матрица в
+        порядке ``clients``, диагональ нулевая. Без ``clients`` — по всем
+        клиентам; при популярных товарах такая матрица близка к плотной."""
+        matrix = self.incidence
+        if clients is not None:
+            matrix = matrix[[self._client_rows[number] for number in clients]]
+        matrix = _binary(matrix)
+        return _without_diagonal(matrix @ matrix.T)
+
+    def product_cooccurrence(self, products=None):
+        """Число клиентов, купивших оба товара, для пар ``products`` (по умолчанию — всех)."""
+        matrix = self.incidence
+        if products is not None:
+            matrix = matrix[:, [self._product_cols[name] for name in products]]
+        matrix = _binary(matrix).T.tocsr()
+        return _without_diagonal(matrix @ matrix.T)
+
+    def top_clients(self, top=50):
+        """Номера ``top`` клиентов с наибольшим числом купленных единиц, по убыванию."""
+        return [self.clients[i] for i in _top_indices(self.incidence.sum(axis=1), top)]
+
+    def top_products(self, top=30):
+        """Названия ``top`` самых покупаемых товаров, по убыванию."""
+        return [self.products[i] for i in _top_indices(self.incidence.sum(axis=0), top)]
+
+    def client_graph(self, top=50, min_weight=1):
+        """``networkx.Graph`` из ``top`` самых активных клиентов; вес ребра — число
+        общих товаров, рёбра легче ``min_weight`` отбрасываются."""
+        clients = self.top_clients(top)
+        nodes = [(number, {'label': self.fio.get(number) or number}) for number in clients]
+        return _to_networkx(nodes, clients, self.client_cooccurrence(clients), min_weight)
+
+    def product_graph(self, top=30, min_weight=1):
+        """``networkx.Graph`` из ``top`` самых покупаемых товаров; вес ребра — число
+        клиентов, купивших оба товара."""
+        products = self.top_products(top)
+        nodes = [(name, {'label': name}) for name in products]
+        return _to_networkx(nodes, products, self.product_cooccurrence(products), min_weight)
+
+    def _column(self, name):
+        col = self._product_cols.get(name)
+        if col is None:
+            col = self._product_cols[name] = len(self.products)
+            self.products.append(name)
+        return col
+
+    def _extend(self, entries):
+        # Тройки (номер клиента, столбец, количество); локальные имена ускоряют цикл
+        client_rows, clients = self._client_rows, self.clients
+        rows, cols, quantities = [], [], []
+        for number, col, quantity in entries:
+            row = client_rows.get(number)
+            if row is None:
+                row = client_rows[number] = len(clients)
+                clients.append(number)
+            rows.append(row)
+            cols.append(col)
+            quantities.append(quantity)
+        self._rows.extend(rows)
+        self._cols.extend(cols)
+        self._quantities.extend(quantities)
+
+    def _reset_pending(self):
+        self._rows = array('q')
+        self._cols = array('q')
+        self._quantities = array('d')
+
+def _binary(matrix):
+    # Для связей важен сам факт покупки, а не количество
+    matrix = matrix.copy()
+    matrix.data[:] = 1
+    return matrix
+
+def _without_diagonal(matrix):
+    from scipy import sparse
+    matrix = (matrix - sparse.diags(matrix.diagonal())).tocsr()
+    matrix.eliminate_zeros()
+    return matrix
+
+def _top_indices(sums, top):
+    import numpy as np
+    # Устойчивая сортировка: при равенстве раньше идёт тот, кто появился раньше
+    return np.argsort(-np.asarray(sums).ravel(), kind='stable')[:top].tolist()
+
+def _to_networkx(nodes, keys, matrix, min_weight):
+    import networkx as nx
+    graph = nx.Graph()
+    graph.add_nodes_from(nodes)
+    matrix = matrix.tocoo()
+    graph.add_weighted_edges_from(
+        (keys[i], keys[j], int(w)) for i, j, w in zip(matrix.row, matrix.col, matrix.data)
+        if i < j and w >= min_weight
+    )
+    return graph
@@ -1,23 +1,50 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from collections import Counter
+from itertools import islice
+import metrics
+from metrics import timed
+from aggregates import OrderAggregates
+from background import BackgroundRunner, Debouncer
+from charts import ChartManager, LineChart, BarChart
+from views import ListViewModel, VirtualListbox
+from repository import Repository
+from timeseries import lttb
+
+# Поиск клиентов по мере ввода: пауза перед поиском и сколько совпадений показывать
+SEARCH_DELAY_MS = 250
+SEARCH_LIMIT = 500
+# Как часто обновляется строка метрик (если сбор метрик включён)
+METRICS_REFRESH_MS = 1000
+# Каталог товаров, если приложение запущено без базы
+DEFAULT_CATALOG = [("Сахар", 50), ("Соль", 20), ("Перец черный, молотый", 30),
+                   ("Перец красный, молотый", 35), ("Куркума", 50)]
+# Интервалы группировки графика динамики заказов (см. timeseries.BUCKETS)
+DYNAMICS_BUCKETS = {'По дням': 'day', 'По неделям': 'week', 'По месяцам': 'month'}
+
+# matplotlib импортируется только при подготовке аналитики: он нужен лишь
+# на вкладке «Аналитика», а его загрузка заметно замедляет запуск приложения.
 
 # Модели данных
 class Product:
+    __slots__ = ('name', 'price')
+
     def __init__(self, name, price):
         self.name = name
         self.price = price
 
 class Client:
-    def __init__(self, number, fio):
+    __slots__ = ('number', 'fio', 'phone', 'email')
+
+    def __init__(self, number, fio, phone=None, email=None):
         self.number = number
         self.fio = fio
+        self.phone = phone
+        self.email = email
 
 class Order:
+    __slots__ = ('number', 'client', 'products_qty', 'date')
+
     def __init__(self, number, client, products_qty_dict, date):
         # products_qty_dict: dict {Product: quantity_in_kg}
         self.number = number
@@ -25,99 +52,74 @@ class Order:
         self.products_qty = products_qty_dict
         self.date = date
 
-# Аналитические функции
-def orders_to_df(orders):
-    data = []
-    for order in orders:
-        for product, qty in order.products_qty.items():
-            data.append({
-                'OrderNumber': order.number,
-                'ClientNumber': order.client.number,
-                'ClientFIO': order.client.fio,
-                'ProductName': product.name,
-                'ProductPrice': product.price,
-                'Quantity': qty,
-                'OrderDate': order.date
-            })
-    return pd.DataFrame(data)
-
-def top_clients_by_orders(orders, top=5):
-    df = orders_to_df(orders)
-    if df.empty:
-        return pd.DataFrame()
-    df['OrderDate'] = pd.to_datetime(df['OrderDate'])
-    result = df.groupby(['ClientNumber', 'ClientFIO'])['OrderNumber'].nunique().sort_values(ascending=False).head(top)
-    return result
-
-def order_dynamics(orders, parent_frame):
-    df = orders_to_df(orders)
-    if df.empty:
-        ttk.Label(parent_frame, text="Нет данных для анализа.").pack()
-        return
-    df['OrderDate'] = pd.to_datetime(df['OrderDate'])
-    df_daily = df.groupby('OrderDate')['OrderNumber'].nunique()
-    fig = plt.Figure(figsize=(6, 4))
-    ax = fig.add_subplot(111)
-    df_daily.plot(kind='line', marker='o', ax=ax)
-    ax.set_title('Динамика заказов по датам')
-    ax.set_xlabel('Дата')
-    ax.set_ylabel('Количество заказов')
-    ax.grid(True)
-    canvas = FigureCanvasTkAgg(fig, master=parent_frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill='both', expand=True)
-    return canvas
-
-def products_chart(orders, parent_frame):
-    # Аналитика по товарам
-    product_counter = Counter()
-    for order in orders:
-        for p, qty in order.products_qty.items():
-            product_counter[p.name] += qty
-    if not product_counter:
-        ttk.Label(parent_frame, text="Нет данных по товарам.").pack()
-        return
-    top_products = product_counter.most_common()
-    names = [tp[0] for tp in top_products]
-    counts = [tp[1] for tp in top_products]
-    fig = plt.Figure(figsize=(6,4))
-    ax = fig.add_subplot(111)
-    ax.barh(names[::-1], counts[::-1])
-    ax.set_title('Популярные товары (по весу кг)')
-    ax.set_xlabel('Общее количество в кг')
-    ax.set_ylabel('Товары')
-    canvas = FigureCanvasTkAgg(fig, master=parent_frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill='both', expand=True)
-    return canvas
+# Аналитика
+@timed('gui.prepare_analysis')
+def prepare_analysis(snapshot, bucket, width):
+    # Выполняется в фоновом потоке по копии агрегатов, к Tk не обращается;
+    # главному потоку остаётся только отрисовка уже прореженного ряда
+    # Прогреваем импорт matplotlib здесь, чтобы создание графиков не подвешивало окно
+    import matplotlib.backends.backend_tkagg
+    daily = lttb(snapshot.daily_series(bucket), width)
+    top_clients = [(client.fio, count) for client, count in snapshot.top_clients()]
+    if not top_clients:
+        text = "Нет данных по клиентам."
+    else:
+        text = "Топ клиентов по заказам:\n" + "\n".join(
+            [f"{fio}: {count} заказов" for fio, count in top_clients]
+        )
+    return {
+        'dynamics': daily,
+        'top_clients': text,
+        'products': snapshot.product_totals(),
+    }
+
+def load_catalog(db=None):
+    """Справочник товаров с текущими ценами: из базы (``models.Product`` вместе
+    с кодом ``id``) или ``DEFAULT_CATALOG``, если базы нет или справочник в ней пуст."""
+    catalog = db.get_products() if db is not None else []
+    return catalog or [Product(name, price) for name, price in DEFAULT_CATALOG]
+
+def format_client_row(c):
+    return f"{c.number}: {c.fio}"
+
+def format_order_row(o):
+    total = sum(p.price * qty for p, qty in o.products_qty.items())
+    products_str = ", ".join([f"{p.name} ({qty} кг)" for p, qty in o.products_qty.items()])
+    return f"Заказ #{o.number} для {o.client.fio}, Товары: {products_str}, Сумма: {total:.2f} руб."
 
 # Основное приложение
 class App(tk.Tk):
-    def __init__(self):
+    """Главное окно. ``db`` — необязательная ``db.Database``, из которой
+    загружается справочник товаров (иначе — ``DEFAULT_CATALOG`` и тестовые заказы)."""
+
+    def __init__(self, db=None):
         super().__init__()
         self.title("Менеджер интернет-магазина")
         self.geometry("950x850")
-        # Изначальный списки
-        self.clients = []
-        self.orders = []
-        self.products_catalog = [
-            Product("Сахар", 50),
-            Product("Соль", 20),
-            Product("Перец черный, молотый", 30),
-            Product("Перец красный, молотый", 35),
-            Product("Куркума", 50)
-        ]
+        # Клиенты и заказы приложения (см. repository.Repository)
+        self.clients = Repository('number', unique=('email', 'phone'), search=('fio', 'phone', 'email'))
+        self.orders = Repository('number', index=('client',))
+        # Агрегаты для вкладки «Аналитика», обновляются при каждом изменении
+        self.aggregates = OrderAggregates()
+        self.runner = BackgroundRunner(self)
+        self.db = db
+        self.products_catalog = load_catalog(db)
         self.create_widgets()
-        self.create_test_orders()
+        if db is None:
+            self.create_test_orders()
 
     def create_test_orders(self):
         c1 = Client(1, "Иванов Иван")
         c2 = Client(2, "Петров Петр")
         self.clients.extend([c1, c2])
         # Тестовые заказы с указанием веса
-        self.orders.append(Order(101, c1, {self.products_catalog[0]: 2.5, self.products_catalog[1]: 1.0}, datetime(2024,5,1)))
-        self.orders.append(Order(102, c1, {self.products_catalog[2]: 0.75}, datetime(2024,5,2)))
-        self.orders.append(Order(103, c2, {self.products_catalog[1]: 1.2}, datetime(2024,5,1)))
+        self.orders.add(Order(101, c1, {self.products_catalog[0]: 2.5, self.products_catalog[1]: 1.0}, datetime(2024,5,1)))
+        self.orders.add(Order(102, c1, {self.products_catalog[2]: 0.75}, datetime(2024,5,2)))
+        self.orders.add(Order(103, c2, {self.products_catalog[1]: 1.2}, datetime(2024,5,1)))
+        for order in self.orders:
+            self.aggregates.add_order(order)
+        self.refresh_clients_list()
+        self.refresh_orders_list()
 
     def create_widgets(self):
         tabControl = ttk.Notebook(self)
@@ -128,6 +130,8 @@ class App(tk.Tk):
         tabControl.add(self.clients_tab, text='Клиенты')
         tabControl.add(self.orders_tab, text='Заказы')
         tabControl.add(self.analysis_tab, text='Аналитика')
+        if metrics.registry.enabled:
+            self.setup_metrics_bar()
         tabControl.pack(expand=1, fill="both")
 
         self.setup_clients_tab()
@@ -137,9 +141,35 @@ class App(tk.Tk):
         def on_tab_changed(event):
             if event.widget.tab(event.widget.index("current"), "text") == 'Аналитика':
                 self.load_analysis()
+            elif self.runner.is_running('analysis'):
+                # Отменённая задача не вызовет ни on_done, ни on_error
+                self.runner.cancel('analysis')
+                self.stop_analysis_progress()
+                self.analysis_status.config(text="")
 
         tabControl.bind("<<NotebookTabChanged>>", on_tab_changed)
 
+    def setup_metrics_bar(self):
+        # Строка состояния с самыми затратными операциями и сохранение метрик в файл
+        bar = ttk.Frame(self)
+        bar.pack(side='bottom', fill='x')
+        self.metrics_label = ttk.Label(bar, anchor='w')
+        self.metrics_label.pack(side='left', fill='x', expand=True, padx=5)
+        ttk.Button(bar, text="Сохранить метрики…", command=self.save_metrics).pack(side='right', padx=5)
+        self.update_metrics_bar()
+
+    def update_metrics_bar(self):
+        top = islice(metrics.registry.summary().items(), 3)
+        text = " | ".join(f"{name}: {s['count']}×, p95 {s['p95'] * 1000:.1f} мс" for name, s in top)
+        self.metrics_label.config(text=text or "Метрик пока нет")
+        self.after(METRICS_REFRESH_MS, self.update_metrics_bar)
+
+    def save_metrics(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("JSON Files", "*.json"), ("CSV Files", "*.csv")])
+        if path:
+            metrics.registry.dump(path)
+
     def setup_clients_tab(self):
         frm = ttk.Frame(self.clients_tab)
         frm.pack(padx=10, pady=10, fill='x')
@@ -168,8 +198,21 @@ class App(tk.Tk):
         ttk.Button(btn_frame, text="Удалить выбранного клиента", command=self.delete_selected_client).pack(side='left', padx=5)
         ttk.Button(btn_frame, text="Редактировать выбранного клиента", command=self.edit_selected_client).pack(side='left', padx=5)
 
-        self.clients_list = tk.Listbox(self.clients_tab)
+        # Поиск по части ФИО, телефона или email; выполняется после паузы в наборе
+        search_frame = ttk.Frame(self.clients_tab)
+        search_frame.pack(padx=10, fill='x')
+        ttk.Label(search_frame, text="Поиск:").pack(side='left')
+        self.client_search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.client_search_var).pack(side='left', fill='x', expand=True, padx=5)
+        self.client_search = Debouncer(self, SEARCH_DELAY_MS, self.refresh_clients_list)
+        self.client_search_var.trace_add('write', lambda *args: self.client_search())
+
+        # Виртуальный список: в виджете существуют только видимые строки
+        self.clients_list = VirtualListbox(self.clients_tab)
         self.clients_list.pack(padx=10, pady=10, fill='both', expand=True)
+        # Модель списка: после добавления/удаления меняется одна строка, а не весь список
+        self.clients_view = ListViewModel(format_client_row, self.clients_list)
+        self.clients_list.set_source(self.clients_view)
         self.refresh_clients_list()
 
     def add_client(self):
@@ -178,17 +221,22 @@ class App(tk.Tk):
             fio = self.client_fio_var.get().strip()
             phone = self.client_phone_var.get().strip()
             email = self.client_email_var.get().strip()
-            client = Client(number, fio)
-            self.clients.append(client)
-            self.refresh_clients_list()
+            client = Client(number, fio, phone or None, email or None)
+            self.clients.add(client)
+            if self.client_search_var.get().strip():
+                self.refresh_clients_list()
+            else:
+                self.clients_view.append(client, client)
             messagebox.showinfo("Успех", "Клиент добавлен")
         except Exception as e:
             messagebox.showerror("Ошибка", str(e))
 
+    @timed('gui.refresh_clients_list')
     def refresh_clients_list(self):
-        self.clients_list.delete(0, tk.END)
-        for c in self.clients:
-            self.clients_list.insert(tk.END, f"{c.number}: {c.fio}")
+        # Полная перестройка; для единичных изменений используется self.clients_view
+        query = self.client_search_var.get()
+        clients = self.clients.search(query, SEARCH_LIMIT) if query.strip() else self.clients
+        self.clients_view.reset((c, c) for c in clients)
 
     def delete_selected_client(self):
         sel = self.clients_list.curselection()
@@ -197,8 +245,15 @@ class App(tk.Tk):
             return
         index = sel[0]
         try:
-            del self.clients[index]
-            self.refresh_clients_list()
+            client = self.clients_view.keys[index]
+            self.clients.remove(client)
+            # Заказы удалённого клиента удаляются вместе с ним
+            orders = list(self.orders.filter('client', client))
+            for order in orders:
+                self.orders.remove(order)
+            self.orders_view.remove_many(orders)
+            self.aggregates.remove_client(client)
+            self.clients_view.remove(client)
             messagebox.showinfo("Успех", "Клиент удален")
         except Exception as e:
             messagebox.showerror("Ошибка", str(e))
@@ -209,7 +264,7 @@ class App(tk.Tk):
             messagebox.showerror("Ошибка", "Выберите клиента для редактирования")
             return
         index = sel[0]
-        client = self.clients[index]
+        client = self.clients_view.keys[index]
         self.open_edit_client_window(client, index)
 
     def open_edit_client_window(self, client, index):
@@ -224,9 +279,14 @@ class App(tk.Tk):
         ttk.Entry(edit_win, textvariable=fio_var).grid(row=1, column=1, padx=5, pady=5)
         def save():
             try:
-                client.number = number_var.get()
-                client.fio = fio_var.get()
-                self.refresh_clients_list()
+                self.clients.update(client, number=number_var.get(), fio=fio_var.get())
+                self.aggregates.client_changed(client)
+                if self.client_search_var.get().strip():
+                    self.refresh_clients_list()
+                else:
+                    self.clients_view.update(client, client)
+                for order in self.orders.filter('client', client):
+                    self.orders_view.update(order, order)
                 edit_win.destroy()
             except Exception as e:
                 messagebox.showerror("Ошибка", str(e))
@@ -257,17 +317,20 @@ class App(tk.Tk):
             ttk.Label(frm, text="кг:").grid(row=3+i, column=1, sticky='e')
             ttk.Entry(frm, width=5, textvariable=qty_var).grid(row=3+i, column=2, sticky='w')
 
-        ttk.Button(frm, text="Добавить заказ", command=self.add_order).grid(row=3+i+1, column=0, columnspan=3, pady=10)
+        ttk.Button(frm, text="Добавить заказ", command=self.add_order).grid(
+            row=3+len(self.products_catalog), column=0, columnspan=3, pady=10)
 
-        self.orders_list = tk.Listbox(self, height=10)
+        self.orders_list = VirtualListbox(self, height=10)
         self.orders_list.pack(padx=10, pady=10, fill='both', expand=True)
+        self.orders_view = ListViewModel(format_order_row, self.orders_list)
+        self.orders_list.set_source(self.orders_view)
         self.refresh_orders_list()
 
     def add_order(self):
         try:
             number = self.order_number_var.get()
             client_number = self.order_client_number_var.get()
-            client = next((c for c in self.clients if c.number == client_number), None)
+            client = self.clients.get(client_number)
             if not client:
                 raise ValueError("Клиент с таким номером не найден")
             products_qty = {}
@@ -283,49 +346,80 @@ class App(tk.Tk):
                         messagebox.showerror("Ошибка", f"Введите правильное кол-во (в кг) для {p.name}")
                         return
             order = Order(number, client, products_qty, datetime.now())
-            self.orders.append(order)
-            self.refresh_orders_list()
+            self.orders.add(order)
+            self.aggregates.add_order(order)
+            self.orders_view.append(order, order)
             messagebox.showinfo("Успех", "Заказ добавлен")
         except Exception as e:
             messagebox.showerror("Ошибка", str(e))
 
+    @timed('gui.refresh_orders_list')
     def refresh_orders_list(self):
-        self.orders_list.delete(0, tk.END)
-        for o in self.orders:
-            total = sum(p.price * qty for p, qty in o.products_qty.items())
-            products_str = ", ".join([f"{p.name} ({qty} кг)" for p, qty in o.products_qty.items()])
-            self.orders_list.insert(tk.END,
-                f"Заказ #{o.number} для {o.client.fio}, Товары: {products_str}, Сумма: {total:.2f} руб.")
+        # Полная перестройка; для единичных изменений используется self.orders_view
+        self.orders_view.reset((o, o) for o in self.orders)
 
     def setup_analysis_tab(self):
         self.analysis_frame = ttk.Frame(self.analysis_tab)
         self.analysis_frame.pack(fill='both', expand=True)
-
+        self.analysis_status = ttk.Label(self.analysis_frame)
+        self.analysis_status.pack(pady=5)
+        self.analysis_progress = ttk.Progressbar(self.analysis_frame, mode='indeterminate')
+        self.dynamics_bucket_var = tk.StringVar(value=next(iter(DYNAMICS_BUCKETS)))
+        bucket_box = ttk.Combobox(self.analysis_frame, textvariable=self.dynamics_bucket_var,
+                                  values=list(DYNAMICS_BUCKETS), state='readonly', width=15)
+        bucket_box.pack(anchor='e', padx=10)
+        bucket_box.bind('<<ComboboxSelected>>', lambda event: self.load_analysis())
+        self.dynamics_frame = ttk.Frame(self.analysis_frame)
+        self.dynamics_frame.pack(fill='both', expand=True)
+        self.top_clients_label = ttk.Label(self.analysis_frame)
+        self.top_clients_label.pack(pady=10)
+        self.products_frame = ttk.Frame(self.analysis_frame)
+        self.products_frame.pack(fill='both', expand=True)
+        # Графики создаются при первом показе и дальше только обновляются
+        self.charts = ChartManager()
+        self.analysis_version = None
+
+    @timed('gui.load_analysis')
     def load_analysis(self):
-        for widget in self.analysis_frame.winfo_children():
-            widget.destroy()
-        try:
-            order_dynamics(self.orders, self.analysis_frame)
-        except Exception as e:
-            ttk.Label(self.analysis_frame, text=f"Ошибка графика: {e}").pack()
-
-        try:
-            top_clients = top_clients_by_orders(self.orders)
-            if top_clients.empty:
-                text = "Нет данных по клиентам."
-            else:
-                text = "Топ клиентов по заказам:\n" + "\n".join(
-                    [f"{row['ClientFIO']}: {row['OrderNumber']} заказов" for index, row in top_clients.reset_index().iterrows()]
-                )
-            ttk.Label(self.analysis_frame, text=text).pack(pady=10)
-        except Exception as e:
-            ttk.Label(self.analysis_frame, text=f"Ошибка анализа клиентов: {e}").pack()
-
+        bucket = DYNAMICS_BUCKETS[self.dynamics_bucket_var.get()]
+        version = (self.aggregates.version, bucket)
+        if version == self.analysis_version:
+            return
+        self.analysis_status.config(text="Загрузка аналитики...")
+        self.analysis_progress.pack(fill='x', padx=50, after=self.analysis_status)
+        self.analysis_progress.start(10)
+        # В главном потоке только копируются счётчики, расчёт идёт в фоне
+        self.runner.submit('analysis', prepare_analysis,
+                           self.aggregates.snapshot(), bucket, self.dynamics_frame.winfo_width(),
+                           on_done=lambda result: self.show_analysis(result, version),
+                           on_error=self.show_analysis_error)
+
+    def stop_analysis_progress(self):
+        self.analysis_progress.stop()
+        self.analysis_progress.pack_forget()
+
+    @timed('gui.show_analysis')
+    def show_analysis(self, result, version):
+        self.stop_analysis_progress()
+        self.analysis_status.config(text="")
+        self.charts.update('dynamics', lambda: LineChart(
+            self.dynamics_frame, 'Динамика заказов по датам', 'Дата', 'Количество заказов',
+            empty_text="Нет данных для анализа."), result['dynamics'], version)
+        self.top_clients_label.config(text=result['top_clients'])
         # Диаграмма по товарам
-        try:
-            products_chart(self.orders, self.analysis_frame)
-        except Exception as e:
-            ttk.Label(self.analysis_frame, text=f"Ошибка по товарам: {e}").pack()
+        self.charts.update('products', lambda: BarChart(
+            self.products_frame, 'Популярные товары (по весу кг)', 'Общее количество в кг', 'Товары',
+            empty_text="Нет данных по товарам."), result['products'], version)
+        self.analysis_version = version
+
+    def show_analysis_error(self, error):
+        self.stop_analysis_progress()
+        self.analysis_status.config(text=f"Ошибка аналитики: {error}")
+
+    def destroy(self):
+        self.client_search.cancel()
+        self.runner.shutdown()
+        super().destroy()
 
 # Запуск
 if __name__ == "__main__":
@@ -1,11 +1,31 @@
 """
 Вход в приложение.
 """
+import argparse
+import metrics
 from gui import App
 
-def main():
-    app = App()
-    app.mainloop()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--metrics', action='store_true',
+                        help='строка метрик внизу окна (см. metrics.py)')
+    parser.add_argument('--db', metavar='PATH',
+                        help='база SQLite, из которой берётся только справочник товаров: '
+                             'клиенты и заказы из неё не загружаются и в неё не сохраняются, '
+                             'тестовые заказы не создаются')
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    db = None
+    if args.db:
+        from db import Database
+        db = Database(args.db)
+    app = App(db)
+    try:
+        app.mainloop()
+    finally:
+        if db is not None:
+            db.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,242 @@
+"""
+Необязательный сбор метрик: время выполнения функций и SQL-запросов.
+
+По умолчанию выключен; включается ``metrics.enable()`` или переменной
+окружения ``SHOP_METRICS=1``. В выключенном состоянии обёртка ``timed``
+только проверяет флаг и вызывает функцию, а соединения SQLite открываются
+обычные, без замеров. Итоги — число вызовов, суммарное время и процентили —
+выводятся ``summary()`` и сохраняются ``dump()`` в JSON или CSV.
+"""
+
+import functools
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Сколько последних замеров на метрику хранится для процентилей
+MAX_SAMPLES = 10000
+
+class Metrics:
+    """Реестр замеров: по имени метрики — счётчик, сумма и последние значения."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {}  # имя -> [число вызовов, суммарное время, deque замеров]
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = [0, 0.0, deque(maxlen=MAX_SAMPLES)]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def summary(self):
+        """``{имя: {'count', 'total', 'mean', 'p50', 'p95', 'p99', 'max'}}``, время в секундах,
+        по убыванию суммарного времени."""
+        with self._lock:
+            items = [(name, count, total, sorted(samples)) for name, (count, total, samples) in self._stats.items()]
+        result = {}
+        for name, count, total, samples in sorted(items, key=lambda item: -item[2]):
+            result[name] = {
+                'count': count,
+                'total': total,
+                'mean': total / count,
+                'p50': _percentile(samples, 50),
+                'p95': _percentile(samples, 95),
+                'p99': _percentile(samples, 99),
+                'max': samples[-1],
+            }
+        return result
+
+    def dump(self, path):
+        """Сохраняет ``summary()`` в JSON или CSV (по расширению файла)."""
+        summary = self.summary()
+        if path.endswith('.csv'):
+            import csv
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['name', 'count', 'total', 'mean', 'p50', 'p95', 'p99', 'max'])
+                for name, stats in summary.items():
+                    writer.writerow([name, *stats.values()])
+        else:
+            import json
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+
+registry = Metrics(enabled=os.environ.get('SHOP_METRICS') == '1')
+
+def enable():
+    registry.enabled = True
+
+def disable():
+    registry.enabled = False
+
+def timed(name):
+    """Декоратор: время каждого вызова функции записывается в метрику ``name``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+class timer:
+    """Контекстный менеджер для замера участка кода: ``with timer('gui.refresh'): ...``."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if registry.enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            registry.record(self.name, time.perf_counter() - self.start)
+
+class TracedConnection(sqlite3.Connection):
+    """Соединение SQLite, замеряющее время запросов и фиксации транзакций.
+
+    Время запроса — его выполнение и выборка строк курсором (простой между
+    выборками не учитывается); замер записывается, когда строки кончились,
+    курсор закрыт или выполняет следующий запрос. ``commit``/``rollback``,
+    в том числе в ``with conn``, замеряются целиком — вместе с записью
+    журнала на диск. Значения литералов в тексте запроса заменяются на
+    ``?``, чтобы одинаковые запросы попадали в одну метрику ``sql: ...``.
+    Время вложенных запросов (триггеры, служебные таблицы FTS5) входит во
+    время внешнего.
+    """
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or TracedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def commit(self):
+        with timer('sql: COMMIT'):
+            super().commit()
+
+    def rollback(self):
+        with timer('sql: ROLLBACK'):
+            super().rollback()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Как у sqlite3.Connection, но через замеряемые commit/rollback
+        if exc_type is not None:
+            self.rollback()
+            return False
+        try:
+            self.commit()
+        except BaseException:
+            self.rollback()
+            raise
+        return False
+
+class TracedCursor(sqlite3.Cursor):
+    """Курсор ``TracedConnection``: копит время запроса до конца выборки."""
+
+    LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+    _name = None
+    _elapsed = 0.0
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._start(sql)
+        result = self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            self._finish()  # не SELECT: запрос выполнен целиком
+        return result
+
+    def executemany(self, sql, parameters):
+        self._finish()
+        self._start(sql)
+        try:
+            return self._timed(super().executemany, sql, parameters)
+        finally:
+            self._finish()
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        try:
+            return self._timed(super().fetchall)
+        finally:
+            self._finish()
+
+    def __next__(self):
+        try:
+            return self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _start(self, sql):
+        self._name = 'sql: ' + ' '.join(self.LITERALS.sub('?', sql).split())[:100]
+        self._elapsed = 0.0
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def _finish(self):
+        if self._name is not None:
+            registry.record(self._name, self._elapsed)
+            self._name = None
+
+def connect_sqlite(path, **kwargs):
+    """``sqlite3.connect``; если сбор метрик включён, соединение замеряет
+    свои запросы (``TracedConnection``)."""
+    if registry.enabled:
+        kwargs.setdefault('factory', TracedConnection)
+    return sqlite3.connect(path, **kwargs)
+
+def _percentile(samples, percent):
+    # Ближайший ранг по отсортированным замерам
+    index = max(0, min(len(samples) - 1, round(percent / 100 * len(samples)) - 1))
+    return samples[index]
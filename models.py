@@ -1,9 +1,12 @@
 import re
-from datetime import datetime
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
 
 class Client:
     """Класс клиента с ФИО, телефоном, email и валидацией."""
 
+    __slots__ = ('number', 'fio', 'phone', 'email')
     phone_pattern = re.compile(r'^\+7\d{10}$')
     email_pattern = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
 
@@ -16,27 +19,86 @@ class Client:
 
     def validate(self):
         """Проверка телефона и email, выбрасывает исключение при ошибке."""
-        if not Client.phone_pattern.match(self.phone):
+        if not Client.phone_pattern.fullmatch(self.phone):
             raise ValueError(
                 f"Неверный формат телефона: {self.phone}. Телефон должен начинаться с +7 и содержать 10 цифр после.")
-        if not Client.email_pattern.match(self.email):
+        if not Client.email_pattern.fullmatch(self.email):
             raise ValueError(f"Неверный формат email: {self.email}")
 
+    @classmethod
+    def validate_many(cls, records):
+        """Проверка телефонов и email сразу для многих клиентов, без исключений.
+
+        ``records`` — pandas.DataFrame со столбцами ``phone`` и ``email`` или
+        последовательность словарей с такими ключами. Для DataFrame проверка
+        выполняется векторно (``str.fullmatch``), без pandas — циклом по
+        скомпилированным выражениям. Значение должно совпасть с шаблоном целиком,
+        как и в ``validate``; pandas нужен только для DataFrame.
+
+        Возвращает ``(valid, errors)``: маску корректных строк (``pandas.Series``
+        для DataFrame, иначе список) и список ошибок ``{'row', 'field', 'value'}``
+        в порядке строк. Строки с ошибками можно отложить, не прерывая импорт.
+        """
+        fields = (('phone', cls.phone_pattern), ('email', cls.email_pattern))
+        # DataFrame может прийти, только если pandas уже импортирован
+        pd = sys.modules.get('pandas')
+        if pd is None or not isinstance(records, pd.DataFrame):
+            valid, errors = [], []
+            for row, record in enumerate(records):
+                ok = True
+                for field, pattern in fields:
+                    value = record.get(field)
+                    if not isinstance(value, str) or not pattern.fullmatch(value):
+                        errors.append({'row': row, 'field': field, 'value': value})
+                        ok = False
+                valid.append(ok)
+            return valid, errors
+
+        valid = pd.Series(True, index=records.index)
+        found = []
+        for order, (field, pattern) in enumerate(fields):
+            values = records[field]
+            if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+                # Не строки (None, числа) дают NA и считаются ошибкой
+                ok = values.str.fullmatch(pattern.pattern).fillna(False).astype(bool)
+            else:
+                ok = pd.Series(False, index=records.index)
+            valid &= ok
+            for position in (~ok).to_numpy().nonzero()[0]:
+                found.append((position, order, {'row': records.index[position], 'field': field,
+                                                 'value': values.iloc[position]}))
+        found.sort(key=lambda item: item[:2])
+        return valid, [error for _, _, error in found]
+
     def __repr__(self):
         return f"Client({self.number}, {self.fio})"
 
 class Product:
-    """Класс товара с названием и ценой."""
+    """Класс товара с названием и ценой.
+
+    ``id`` — код товара в справочнике базы (``products.product_id``), если
+    товар из неё загружен.
+    """
 
-    def __init__(self, name, price):
+    __slots__ = ('name', 'price', 'id')
+
+    def __init__(self, name, price, id=None):
         self.name = name
         self.price = float(price)
+        self.id = id
 
     def __repr__(self):
         return f"Product({self.name}, {self.price})"
 
 class Order:
-    """Класс заказа: номер, клиент, список товаров, дата и расчет стоимости."""
+    """Класс заказа: номер, клиент, список товаров, дата и расчет стоимости.
+
+    Стоимость считается один раз и кэшируется. Товары хранятся кортежем и
+    меняются только через присваивание ``products`` или ``add_product``,
+    которые сбрасывают кэш.
+    """
+
+    __slots__ = ('number', 'client', '_products', 'date', '_total_cost')
 
     def __init__(self, number, client, products, date=None):
         self.number = number
@@ -44,10 +106,145 @@ class Order:
         self.products = products
         self.date = date or datetime.now()
 
+    @property
+    def products(self):
+        return self._products
+
+    @products.setter
+    def products(self, products):
+        self._products = tuple(products)
+        self._total_cost = None
+
+    def add_product(self, product):
+        # Кортеж пересоздаётся целиком: много товаров лучше присвоить списком сразу
+        self._products += (product,)
+        self._total_cost = None
+
     @property
     def total_cost(self):
         """Суммарная стоимость товаров в заказе."""
-        return sum(p.price for p in self.products)
+        if self._total_cost is None:
+            self._total_cost = sum(p.price for p in self._products)
+        return self._total_cost
 
     def __repr__(self):
-        return f"Order({self.number}, Client={self.client.number}, Total={self.total_cost:.2f})"
\ No newline at end of file
+        return f"Order({self.number}, Client={self.client.number}, Total={self.total_cost:.2f})"
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def _microseconds(moment):
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - _EPOCH) // _MICROSECOND
+
+class LineItemTable:
+    """Строки заказов в параллельных типизированных массивах.
+
+    Для каждой строки хранятся позиция заказа в ``OrderBatch``, код товара,
+    количество и цена — 8 + 4 + 8 + 8 = 28 байт на строку вместо отдельного
+    объекта (код товара — ``'i'``, четыре байта на любой платформе).
+    """
+
+    __slots__ = ('order_index', 'product_id', 'quantity', 'price')
+
+    def __init__(self):
+        self.order_index = array('q')
+        self.product_id = array('i')
+        self.quantity = array('d')
+        self.price = array('d')
+
+    def __len__(self):
+        return len(self.order_index)
+
+    def append(self, order_index, product_id, quantity, price):
+        self.order_index.append(order_index)
+        self.product_id.append(product_id)
+        self.quantity.append(quantity)
+        self.price.append(price)
+
+class OrderBatch:
+    """Компактное хранилище большого числа заказов.
+
+    Даты (в микросекундах от 1970-01-01; даты с часовым поясом приводятся к
+    UTC и читаются обратно без пояса), коды клиентов и итоговые суммы
+    заказов лежат в массивах ``array``; клиенты и товары хранятся по одному
+    разу и адресуются кодами. Суммы считаются при добавлении заказа.
+    Преобразование в объекты и обратно — ``from_orders``/``to_orders``.
+    """
+
+    __slots__ = ('numbers', 'client_index', 'dates', 'totals', 'lines',
+                 'clients', 'products', '_client_codes', '_product_codes', '_line_start')
+
+    def __init__(self):
+        self.numbers = []
+        self.client_index = array('l')
+        self.dates = array('q')
+        self.totals = array('d')
+        self.lines = LineItemTable()
+        self.clients = []   # код клиента -> Client
+        self.products = []  # код товара -> название
+        self._client_codes = {}
+        self._product_codes = {}
+        self._line_start = array('q', [0])  # строки заказа i: [_line_start[i], _line_start[i + 1])
+
+    @classmethod
+    def from_orders(cls, orders):
+        batch = cls()
+        for order in orders:
+            batch.append(order)
+        return batch
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def append(self, order):
+        index = len(self.numbers)
+        self.numbers.append(order.number)
+        self.client_index.append(self._code(self._client_codes, self.clients, order.client, id(order.client)))
+        self.dates.append(_microseconds(order.date))
+        total = 0.0
+        for product in order.products:
+            product_id = self._code(self._product_codes, self.products, product.name, product.name)
+            self.lines.append(index, product_id, 1, product.price)
+            total += product.price
+        self.totals.append(total)
+        self._line_start.append(len(self.lines))
+
+    def __getitem__(self, index):
+        """Заказ ``index`` в виде объекта ``Order``."""
+        start, stop = self._line_start[index], self._line_start[index + 1]
+        products = [Product(self.products[self.lines.product_id[i]], self.lines.price[i])
+                    for i in range(start, stop)]
+        order = Order(self.numbers[index], self.clients[self.client_index[index]], products,
+                      _EPOCH + self.dates[index] * _MICROSECOND)
+        order._total_cost = self.totals[index]
+        return order
+
+    def to_orders(self):
+        return [self[i] for i in range(len(self))]
+
+    def total_cost(self, index):
+        return self.totals[index]
+
+    def totals_by_client(self):
+        """Сумма заказов по клиентам: ``{client: total}``."""
+        sums = [0.0] * len(self.clients)
+        for code, total in zip(self.client_index, self.totals):
+            sums[code] += total
+        return {client: total for client, total in zip(self.clients, sums)}
+
+    def orders_by_client(self):
+        """Число заказов по клиентам: ``{client: count}``."""
+        counts = [0] * len(self.clients)
+        for code in self.client_index:
+            counts[code] += 1
+        return {client: count for client, count in zip(self.clients, counts)}
+
+    @staticmethod
+    def _code(codes, values, value, key):
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(values)
+            values.append(value)
+        return code
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Сортировка и фильтрация списка заказов без пересортировки на каждый запрос.
+
+Для каждого набора ключей сортировки один раз строится перестановка
+(порядок позиций заказов), после чего она хранится и при добавлении
+заказа дополняется вставкой в нужное место. Для полей группировки (клиент)
+ведутся списки позиций по значению, так что выборка заказов одного клиента
+не перебирает все заказы.
+"""
+
+import bisect
+from collections import OrderedDict
+
+# Сколько последних результатов query() хранится между добавлениями заказов
+RESULT_CACHE_SIZE = 4
+
+class _SortKey:
+    """Составной ключ со своим направлением для каждой части (для bisect)."""
+
+    __slots__ = ('values', 'descending')
+
+    def __init__(self, values, descending):
+        self.values = values
+        self.descending = descending
+
+    def __lt__(self, other):
+        for value, other_value, descending in zip(self.values, other.values, self.descending):
+            if value != other_value:
+                return (value > other_value) if descending else (value < other_value)
+        return False
+
+class OrderIndex:
+    """Заказы в порядке добавления с кэшем сортировок и списками по группам.
+
+    ``keys`` — словарь ``имя -> функция(заказ)`` для сортировки и фильтров,
+    ``group`` — имена ключей, по которым ведутся списки позиций (например,
+    клиент). Значения ключей вычисляются один раз при добавлении заказа.
+    """
+
+    def __init__(self, keys, group=()):
+        self.keys = keys
+        self.items = []
+        self._values = {name: [] for name in keys}       # имя ключа -> значения по позициям
+        self._groups = {name: {} for name in group}      # имя ключа -> значение -> позиции
+        self._orders = {}  # кортеж ключей сортировки -> перестановка позиций
+        self._ranks = {}   # кортеж ключей сортировки -> место позиции в перестановке
+        # (сортировка, фильтры) -> (позиции, заказы) последних результатов query(), LRU
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item):
+        position = len(self.items)
+        self.items.append(item)
+        for name, key in self.keys.items():
+            self._values[name].append(key(item))
+        for name, groups in self._groups.items():
+            groups.setdefault(self._values[name][position], []).append(position)
+        # Готовые перестановки и результат текущего запроса дополняются вставкой,
+        # а не сортируются заново; при равных ключах новый заказ идёт последним.
+        # Остальные результаты сбрасываются, чтобы добавление не дорожало с их числом
+        for sort, order in self._orders.items():
+            bisect.insort_right(order, position, key=self._sort_key(sort))
+        self._ranks.clear()
+        if self._results:
+            (sort, filters), (positions, items) = self._results.popitem()
+            self._results.clear()
+            self._results[sort, filters] = (positions, items)
+            if self._matches(position, filters):
+                place = self._bisect(positions, position, sort) if sort else len(positions)
+                positions.insert(place, position)
+                items.insert(place, item)
+        return item
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def query(self, sort=(), filters=None):
+        """Заказы, прошедшие ``filters``, в порядке ``sort``.
+
+        ``sort`` — имена ключей по убыванию важности, ``-`` перед именем
+        означает обратный порядок. ``filters`` — словарь ``имя -> значение``
+        (равенство) или ``имя -> (от, до)`` (от включительно, до не
+        включительно, ``None`` — без границы). Хранятся ``RESULT_CACHE_SIZE``
+        последних результатов; при добавлении заказа остаётся только
+        последний запрошенный, и он дополняется на месте (см. ``place``).
+        """
+        return self._result(tuple(sort), dict(filters or {}))[1]
+
+    def place(self, sort=(), filters=None):
+        """Место последнего добавленного заказа в результате ``query(sort, filters)``
+        или ``None``, если он не проходит фильтры. Ищется двоичным поиском по
+        ключу сортировки, без перебора результата."""
+        if not self.items:
+            return None
+        position = len(self.items) - 1
+        sort = tuple(sort)
+        filters = dict(filters or {})
+        if not self._matches(position, tuple(filters.items())):
+            return None
+        positions = self._result(sort, filters)[0]
+        if not sort:
+            return len(positions) - 1
+        return self._bisect(positions, position, sort) - 1
+
+    def _bisect(self, positions, position, sort):
+        # Место справа от позиций с тем же ключом, как у insort_right
+        key = self._sort_key(sort)
+        return bisect.bisect_right(positions, key(position), key=key)
+
+    def _result(self, sort, filters):
+        for name in (*(s.lstrip('-') for s in sort), *filters):
+            if name not in self.keys:
+                raise ValueError(f"Неизвестный ключ заказов: {name}")
+        cache_key = (sort, tuple(sorted(filters.items())))
+        result = self._results.get(cache_key)
+        if result is None:
+            positions = self._positions(sort, filters)
+            result = self._results[cache_key] = (positions, [self.items[p] for p in positions])
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(cache_key)
+        return result
+
+    def _matches(self, position, filters):
+        # filters — пары (имя, условие), как в ключе кэша
+        for name, condition in filters:
+            value = self._values[name][position]
+            if not isinstance(condition, tuple):
+                if value != condition:
+                    return False
+                continue
+            low, high = condition
+            if (low is not None and value < low) or (high is not None and value >= high):
+                return False
+        return True
+
+    def _positions(self, sort, filters):
+        grouped = [name for name in filters if name in self._groups and not isinstance(filters[name], tuple)]
+        if grouped:
+            # Начинаем с самого короткого списка позиций группы
+            candidates = min((self._groups[name].get(filters[name], []) for name in grouped), key=len)
+            if sort and len(candidates) * 8 < len(self.items):
+                rank = self._rank(sort)
+                candidates = sorted(candidates, key=rank.__getitem__)
+            elif sort:
+                # Большая группа: дешевле пройти готовую перестановку с проверкой
+                candidates = self._order(sort)
+        elif sort:
+            candidates = self._order(sort)
+        else:
+            candidates = range(len(self.items))
+        # По одному проходу на фильтр: простые генераторы списков быстрее общей проверки
+        candidates = list(candidates)
+        for name, condition in filters.items():
+            values = self._values[name]
+            if not isinstance(condition, tuple):
+                candidates = [p for p in candidates if values[p] == condition]
+                continue
+            low, high = condition
+            if low is not None:
+                candidates = [p for p in candidates if values[p] >= low]
+            if high is not None:
+                candidates = [p for p in candidates if values[p] < high]
+        return candidates
+
+    def _order(self, sort):
+        order = self._orders.get(sort)
+        if order is None:
+            order = list(range(len(self.items)))
+            # Устойчивые сортировки от младшего ключа к старшему
+            for spec in reversed(sort):
+                values = self._values[spec.lstrip('-')]
+                order.sort(key=values.__getitem__, reverse=spec.startswith('-'))
+            self._orders[sort] = order
+        return order
+
+    def _rank(self, sort):
+        rank = self._ranks.get(sort)
+        if rank is None:
+            rank = [0] * len(self.items)
+            for place, position in enumerate(self._order(sort)):
+                rank[position] = place
+            self._ranks[sort] = rank
+        return rank
+
+    def _sort_key(self, sort):
+        columns = [self._values[spec.lstrip('-')] for spec in sort]
+        descending = [spec.startswith('-') for spec in sort]
+        return lambda position: _SortKey([values[position] for values in columns], descending)
@@ -0,0 +1,203 @@
+"""
+Параллельная агрегация истории заказов по частям.
+
+Заказы делятся на диапазоны по дате или по номеру клиента; каждый процесс
+из ``ProcessPoolExecutor`` открывает базу только для чтения, считает итоги
+по своему диапазону запросом к SQLite и возвращает частичный результат.
+Частичные результаты складываются в основном процессе. Диапазоны идут по
+индексированным столбцам (``idx_orders_date_number``,
+``idx_orders_client_number``), поэтому каждый процесс читает только свою
+часть индекса, а не всю таблицу.
+"""
+
+import heapq
+import json
+import os
+import random
+import sqlite3
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+from db import Database
+from metrics import timed
+from timeseries import bucket_start, check_bucket
+
+# Столбец разбиения -> выражение в запросах
+PARTITION_COLUMNS = {'date': 'o.date', 'client': 'o.client_number'}
+
+# Сколько случайных заказов берётся для оценки границ диапазонов
+SAMPLE_SIZE = 2048
+
+# Частичные отчёты: строки (ключ, значение), значения складываются
+REPORTS = {
+    # Число заказов с хотя бы одним товаром по клиентам
+    'client_orders': '''
+        SELECT o.client_number, COUNT(*) FROM orders o
+        WHERE {where} AND EXISTS (SELECT 1 FROM order_products op WHERE op.order_number = o.number)
+        GROUP BY o.client_number
+    ''',
+    # Сумма заказов по клиентам. CROSS JOIN закрепляет порядок: сначала заказы
+    # диапазона, затем их строки — иначе SQLite просматривает все order_products
+    'client_sales': '''
+        SELECT o.client_number, SUM(op.unit_price * op.quantity) FROM orders o
+        CROSS JOIN order_products op ON op.order_number = o.number
+        WHERE {where}
+        GROUP BY o.client_number
+    ''',
+    # Число заказов с хотя бы одним товаром по дням; заказы без даты, как и в
+    # order_rollups, не считаются
+    'daily_orders': '''
+        SELECT substr(o.date, 1, 10), COUNT(*) FROM orders o
+        WHERE {where} AND o.date IS NOT NULL AND EXISTS (SELECT 1 FROM order_products op WHERE op.order_number = o.number)
+        GROUP BY 1
+    ''',
+}
+
+# Разбиение по умолчанию: отчёты по клиентам идут по индексу клиентов и не
+# требуют сортировки для группировки, динамика — по индексу дат
+REPORT_PARTITIONS = {'client_orders': 'client', 'client_sales': 'client', 'daily_orders': 'date'}
+
+class PartitionedAggregator:
+    """Отчёты по базе ``db_path``, посчитанные ``workers`` процессами.
+
+    ``partition`` — ``'date'`` (диапазоны дат заказов), ``'client'``
+    (диапазоны номеров клиентов) или ``None`` — своё для каждого отчёта
+    (``REPORT_PARTITIONS``). Границы выбираются по случайной выборке
+    заказов так, чтобы в диапазонах было примерно поровну заказов. Пул
+    процессов создаётся при первом отчёте и закрывается ``close()``.
+    """
+
+    def __init__(self, db_path, workers=None, partition=None):
+        if db_path == ':memory:':
+            raise ValueError("Процессам нужна база в файле, а не :memory:")
+        if partition is not None and partition not in PARTITION_COLUMNS:
+            raise ValueError(f"Неизвестное разбиение: {partition!r} (ожидается date или client)")
+        self.db_path = db_path
+        self.workers = workers or _cpu_count()
+        self.partition = partition
+        # Схема приводится к актуальной версии до запуска процессов: они открывают базу только для чтения
+        Database(db_path).close()
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @timed('parallel.top_clients_by_orders')
+    def top_clients_by_orders(self, top=5):
+        """``[(number, fio, orders), ...]`` по убыванию, как ``Database.count_orders_by_client``."""
+        counts = self.run('client_orders')
+        return self._with_fio(heapq.nsmallest(top, counts.items(), key=_descending))
+
+    @timed('parallel.client_sales')
+    def client_sales(self, top=None):
+        """Сумма заказов по клиентам: ``[(number, fio, total), ...]`` по убыванию суммы."""
+        totals = self.run('client_sales')
+        if top is None:
+            best = sorted(totals.items(), key=_descending)
+        else:
+            best = heapq.nsmallest(top, totals.items(), key=_descending)
+        return self._with_fio(best)
+
+    @timed('parallel.order_dynamics')
+    def order_dynamics(self, bucket='day'):
+        """Число заказов по дням, неделям или месяцам: ``[('YYYY-MM-DD', orders), ...]``."""
+        check_bucket(bucket)
+        totals = Counter()
+        for day, orders in self.run('daily_orders').items():
+            totals[bucket_start(date.fromisoformat(day), bucket).date().isoformat()] += orders
+        return sorted(totals.items())
+
+    def run(self, report):
+        """Считает отчёт ``report`` (ключ ``REPORTS``) по частям и складывает итоги в ``Counter``."""
+        if report not in REPORTS:
+            raise ValueError(f"Неизвестный отчёт: {report!r}")
+        partition = self.partition or REPORT_PARTITIONS[report]
+        ranges = self.partitions(partition)
+        if len(ranges) == 1:
+            parts = [_aggregate_range(self.db_path, report, partition, *ranges[0])]
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers)
+            futures = [self._executor.submit(_aggregate_range, self.db_path, report, partition, lo, hi)
+                       for lo, hi in ranges]
+            parts = [future.result() for future in futures]
+        total = Counter()
+        for part in parts:
+            total.update(part)
+        return total
+
+    def partitions(self, partition='date'):
+        """Диапазоны ``[(lo, hi), ...]`` по столбцу разбиения: ``lo <= значение < hi``,
+        ``None`` — без ограничения с этой стороны."""
+        column = PARTITION_COLUMNS[partition]
+        with closing(_connect(self.db_path)) as conn:
+            low, high = conn.execute('SELECT MIN(rowid), MAX(rowid) FROM orders').fetchone()
+            if low is None or self.workers == 1:
+                return [(None, None)]
+            if high - low + 1 <= SAMPLE_SIZE:
+                sample = [row[0] for row in conn.execute(f'SELECT {column} FROM orders o')]
+            else:
+                rowids = random.Random(0).sample(range(low, high + 1), SAMPLE_SIZE)
+                sample = [row[0] for row in conn.execute(
+                    f'SELECT {column} FROM orders o WHERE rowid IN (SELECT value FROM json_each(?))',
+                    (json.dumps(rowids),))]
+        sample = sorted(value for value in sample if value is not None)
+        bounds = []
+        for i in range(1, self.workers):
+            value = sample[len(sample) * i // self.workers] if sample else None
+            if value is not None and (not bounds or value > bounds[-1]):
+                bounds.append(value)
+        edges = [None] + bounds + [None]
+        return list(zip(edges, edges[1:]))
+
+    def _with_fio(self, items):
+        if not items:
+            return []
+        numbers = [number for number, _ in items]
+        with closing(_connect(self.db_path)) as conn:
+            fio = dict(conn.execute(
+                'SELECT number, fio FROM clients WHERE number IN (SELECT value FROM json_each(?))',
+                (json.dumps(numbers, ensure_ascii=False),)))
+        return [(number, fio.get(number), value) for number, value in items]
+
+def _descending(item):
+    # По убыванию значения, при равенстве — по номеру клиента, как в
+    # Database.count_orders_by_client; заказы без клиента (None) идут первыми
+    number, value = item
+    return -value, number or ''
+
+def _aggregate_range(db_path, report, partition, lo, hi):
+    # Выполняется в процессе пула: своё соединение только для чтения
+    column = PARTITION_COLUMNS[partition]
+    where, params = ['1'], []
+    if lo is not None:
+        where.append(f'{column} >= ?')
+        params.append(lo)
+    if hi is not None:
+        where.append(f'{column} < ?')
+        params.append(hi)
+    # Заказы без даты или клиента попадают в первый диапазон
+    if lo is None and hi is not None:
+        where[-1] = f'({where[-1]} OR {column} IS NULL)'
+    with closing(_connect(db_path)) as conn:
+        return dict(conn.execute(REPORTS[report].format(where=' AND '.join(where)), params))
+
+def _connect(db_path):
+    # Только чтение: процессы не мешают писателям и не меняют схему
+    return sqlite3.connect(Path(db_path).resolve().as_uri() + '?mode=ro', uri=True)
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
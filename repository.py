@@ -0,0 +1,166 @@
+"""
+Хранилище клиентов и заказов в памяти с хэш-индексами.
+
+Поиск по номеру, email или телефону и выборка заказов клиента выполняются
+за O(1) вместо перебора всего списка; уникальность полей проверяется при
+добавлении и изменении. Используется обоими интерфейсами (``gui.py`` и
+``certification.py``).
+"""
+
+import bisect
+import operator
+
+EMPTY = (None, '')
+
+class Repository:
+    """Объекты в порядке добавления и индексы по их полям.
+
+    ``key`` — поле первичного ключа (пустым быть не может), ``unique`` —
+    поля с уникальными значениями (пустые ``None`` и ``''`` не учитываются),
+    ``index`` — поля, по которым нужна выборка всех объектов с данным значением, ``search`` — поля для поиска
+    подстроки (метод ``search``). По умолчанию поля читаются как
+    атрибуты; для словарей передаются ``getter=operator.getitem`` и
+    ``setter=operator.setitem`` (см. ``Repository.of_dicts``).
+    """
+
+    def __init__(self, key, unique=(), index=(), search=(), getter=getattr, setter=setattr):
+        self.key = key
+        self.getter = getter
+        self.setter = setter
+        self._items = {}  # значение ключа -> объект
+        self._unique = {field: {} for field in unique}
+        self._index = {field: {} for field in index}
+        self._search = search
+        self._text = {}   # значение ключа -> текст полей поиска в нижнем регистре
+        self._blob = None # склейка текстов для search(), см. _search_blob
+
+    @classmethod
+    def of_dicts(cls, key, unique=(), index=(), search=()):
+        return cls(key, unique, index, search, getter=operator.getitem, setter=operator.setitem)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __contains__(self, key_value):
+        """Есть ли объект с таким значением первичного ключа."""
+        return key_value in self._items
+
+    def get(self, key_value, default=None):
+        return self._items.get(key_value, default)
+
+    def find(self, field, value):
+        """Объект с данным значением уникального поля или ``None``."""
+        return self._unique[field].get(value)
+
+    def filter(self, field, value):
+        """Все объекты с данным значением индексированного поля."""
+        return list(self._index[field].get(value, {}).values())
+
+    def search(self, query, limit=None):
+        """Объекты, в полях поиска которых встречаются все слова запроса.
+
+        Сначала идут объекты, у которых с первого слова начинается одно из
+        полей, затем остальные; внутри — порядок добавления. Тексты полей
+        склеены в одну строку, и первое слово ищется в ней ``str.find``, так
+        что перебор объектов в Python идёт только по совпадениям.
+        """
+        words = query.casefold().split()
+        if not words:
+            return []
+        blob, keys, offsets = self._search_blob()
+        found = {}
+        for needle in ('\n' + words[0], words[0]):
+            pos = blob.find(needle)
+            while pos != -1 and (limit is None or len(found) < limit):
+                i = bisect.bisect_right(offsets, pos) - 1
+                key = keys[i]
+                if key not in found and all(word in self._text[key] for word in words[1:]):
+                    found[key] = None
+                pos = blob.find(needle, offsets[i + 1]) if i + 1 < len(keys) else -1
+        return [self._items[key] for key in found]
+
+    def _search_blob(self):
+        # Склейка пересобирается при первом поиске после изменения данных
+        if self._blob is None:
+            keys = list(self._text)
+            offsets, position = [], 0
+            for text in self._text.values():
+                offsets.append(position)
+                position += len(text) + 1
+            self._blob = ('\0'.join(self._text.values()), keys, offsets)
+        return self._blob
+
+    def add(self, item):
+        self._check(item, {field: self.getter(item, field) for field in (self.key, *self._unique)})
+        self._items[self.getter(item, self.key)] = item
+        self._index_item(item)
+        return item
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def update(self, item, **changes):
+        """Меняет поля объекта, сохраняя уникальность и согласованность индексов."""
+        checked = {field: value for field, value in changes.items()
+                   if field == self.key or field in self._unique}
+        self._check(item, checked)
+        self._unindex_item(item)
+        del self._items[self.getter(item, self.key)]
+        for field, value in changes.items():
+            self.setter(item, field, value)
+        self._items[self.getter(item, self.key)] = item
+        self._index_item(item)
+        return item
+
+    def remove(self, item):
+        self._unindex_item(item)
+        del self._items[self.getter(item, self.key)]
+
+    def clear(self):
+        self._items.clear()
+        for values in (*self._unique.values(), *self._index.values()):
+            values.clear()
+        self._text.clear()
+        self._blob = None
+
+    def _check(self, item, fields):
+        for field, value in fields.items():
+            if value in EMPTY:
+                if field == self.key:
+                    raise ValueError(f"Не задано значение ключевого поля {field}")
+                continue
+            values = self._items if field == self.key else self._unique[field]
+            other = values.get(value)
+            if other is not None and other is not item:
+                raise ValueError(f"Значение {value!r} поля {field} уже используется")
+
+    def _index_item(self, item):
+        for field, values in self._unique.items():
+            value = self.getter(item, field)
+            if value not in EMPTY:
+                values[value] = item
+        for field, values in self._index.items():
+            values.setdefault(self.getter(item, field), {})[id(item)] = item
+        if self._search:
+            self._blob = None
+            # Каждое поле с новой строки: так «\nслово» означает начало поля
+            self._text[self.getter(item, self.key)] = ''.join(
+                '\n' + str(self.getter(item, field) or '') for field in self._search).casefold()
+
+    def _unindex_item(self, item):
+        for field, values in self._unique.items():
+            value = self.getter(item, field)
+            if values.get(value) is item:
+                del values[value]
+        for field, values in self._index.items():
+            value = self.getter(item, field)
+            bucket = values.get(value, {})
+            bucket.pop(id(item), None)
+            if not bucket:
+                values.pop(value, None)
+        if self._text.pop(self.getter(item, self.key), None) is not None:
+            self._blob = None
@@ -0,0 +1,312 @@
+"""
+HTTP/JSON-сервис приёма клиентов и заказов поверх ``db.Database`` (asyncio, без tkinter).
+
+Запуск::
+
+    python service.py --db shop.db --port 8080
+
+Точки входа:
+
+* ``POST /clients`` — ``{"number", "fio", "phone", "email"}`` или список таких объектов;
+* ``POST /orders`` — ``{"number", "client_number", "date", "products": [{"name", "price"}]}``
+  или список; ``date`` в ISO 8601, по умолчанию — текущее время;
+* ``GET /clients?q=...&limit=20`` — поиск клиентов (``Database.search_clients``);
+* ``GET /orders?client_number=...&after=...&limit=50`` — страница заказов по номеру.
+
+``limit`` — от 1 до ``MAX_LIMIT``; больший урезается, меньший — ответ 400.
+
+Записи из всех соединений собираются в группы и фиксируются одной
+транзакцией (``Database.write_batch``); ответ 201 отправляется только после
+фиксации. Число обслуживаемых соединений и длина очереди записи
+ограничены: при заполненной очереди сервис сразу отвечает 503 с
+``Retry-After``, вместо того чтобы копить запросы в памяти.
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+from db import Database
+from models import Client, Product, Order
+
+MAX_BODY = 1 << 20
+# Наибольшее число строк в ответе на GET (больший limit урезается)
+MAX_LIMIT = 1000
+STATUS_TEXT = {
+    200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+# Для записи заказа из клиента нужен только номер
+ClientRef = namedtuple('ClientRef', 'number')
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class OrderService:
+    """Сервис поверх файла базы ``db_path``.
+
+    Вся работа с SQLite выполняется в одном потоке; запросы ждут её в
+    asyncio. ``batch_size`` — наибольшая группа записей в транзакции,
+    ``batch_delay_ms`` — сколько писатель ждёт попутные записи перед
+    фиксацией, ``max_pending`` — длина очереди записи, ``max_connections`` —
+    сколько соединений обслуживается одновременно (остальные ждут),
+    ``idle_timeout`` — сколько секунд соединение может ждать следующий
+    запрос, прежде чем будет закрыто и освободит место.
+    """
+
+    def __init__(self, db_path, batch_size=500, batch_delay_ms=2, max_pending=5000, max_connections=256,
+                 idle_timeout=30):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay_ms / 1000
+        self.max_pending = max_pending
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.db = None
+        self.server = None
+        self.batches = 0  # число выполненных транзакций записи
+        self._client_numbers = set()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.db = await self._run(lambda: Database(self.db_path, journal_mode='WAL', synchronous='NORMAL',
+                                                   check_same_thread=False))
+        self._client_numbers = await self._run(self.db.get_client_numbers)
+        self.queue = asyncio.Queue(self.max_pending)
+        self._connections = asyncio.Semaphore(self.max_connections)
+        self._writer = asyncio.create_task(self._write_loop())
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Перестаёт принимать соединения, дописывает очередь и закрывает базу."""
+        self.server.close()
+        await self.server.wait_closed()
+        await self.queue.join()
+        self._writer.cancel()
+        await self._run(self.db.close)
+        self.executor.shutdown()
+
+    def _run(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _write_loop(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Короткая пауза собирает записи параллельных запросов в одну транзакцию
+            if self.batch_delay and self.queue.qsize() < self.batch_size:
+                await asyncio.sleep(self.batch_delay)
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                errors = await self._run(self.db.write_batch, [(kind, item) for kind, item, _ in batch])
+            except Exception as e:
+                errors = [(item, e) for _, item, _ in batch]
+            self.batches += 1
+            failed = {id(item): error for item, error in errors}
+            for kind, item, future in batch:
+                error = failed.get(id(item))
+                # Номер клиента доступен заказам только после того, как клиент записан
+                if error is None and kind == 'client':
+                    self._client_numbers.add(item.number)
+                if not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(_write_error(error))
+                self.queue.task_done()
+
+    async def _handle(self, reader, writer):
+        async with self._connections:
+            try:
+                while True:
+                    try:
+                        request = await asyncio.wait_for(_read_request(reader), self.idle_timeout)
+                    except HttpError as e:
+                        _respond(writer, e.status, {'error': str(e)}, keep_alive=False)
+                        break
+                    except asyncio.TimeoutError:
+                        break
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    try:
+                        status, payload = await self._dispatch(method, target, body)
+                    except HttpError as e:
+                        status, payload = e.status, {'error': str(e)}
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    _respond(writer, status, payload, keep_alive)
+                    await writer.drain()
+                    if not keep_alive:
+                        break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                writer.close()
+
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.rstrip('/')
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if path == '/clients':
+            if method == 'POST':
+                return await self._create('client', self._parse_client, body)
+            if method == 'GET':
+                clients = await self._run(self.db.search_clients, query.get('q', ''), _limit(query, 20))
+                return 200, [_client_json(c) for c in clients]
+        elif path == '/orders':
+            if method == 'POST':
+                return await self._create('order', self._parse_order, body)
+            if method == 'GET':
+                filters = {'client_number': query.get('client_number')}
+                after = (query['after'],) if 'after' in query else None
+                orders, last_key = await self._run(self.db.get_orders_page, after, _limit(query, 50), filters)
+                return 200, {'orders': [_order_json(o) for o in orders], 'next': last_key[0] if last_key else None}
+        else:
+            raise HttpError(404, f"Неизвестный путь: {url.path}")
+        raise HttpError(405, f"Метод {method} не поддерживается для {url.path}")
+
+    async def _create(self, kind, parse, body):
+        try:
+            data = json.loads(body or b'null')
+        except ValueError as e:
+            raise HttpError(400, f"Некорректный JSON: {e}")
+        items = data if isinstance(data, list) else [data]
+        if self.queue.maxsize - self.queue.qsize() < len(items):
+            raise HttpError(503, "Очередь записи заполнена, повторите позже")
+        try:
+            objects = [parse(item) for item in items]
+        except (ValueError, TypeError, KeyError) as e:
+            raise HttpError(400, f"Некорректные данные: {e}")
+        loop = asyncio.get_running_loop()
+        futures = []
+        for obj in objects:
+            future = loop.create_future()
+            self.queue.put_nowait((kind, obj, future))
+            futures.append(future)
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            # Сбой записи важнее конфликтов: повторять такой запрос имеет смысл
+            status = max(error.status for error in errors)
+            return status, {'created': len(results) - len(errors), 'errors': [str(error) for error in errors]}
+        return 201, {'created': len(results)}
+
+    def _parse_client(self, data):
+        # Конструктор Client проверяет телефон и email (Client.validate)
+        return Client(str(data['number']), data['fio'], data['phone'], data['email'])
+
+    def _parse_order(self, data):
+        client_number = str(data['client_number'])
+        if client_number not in self._client_numbers:
+            raise ValueError(f"клиент {client_number} не найден")
+        products = [Product(p['name'], p['price']) for p in data.get('products', [])]
+        date = datetime.fromisoformat(data['date']) if data.get('date') else datetime.now()
+        return Order(str(data['number']), ClientRef(client_number), products, date)
+
+async def _read_request(reader):
+    """``(метод, путь, заголовки, тело)`` или ``None``, если клиент закрыл соединение."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise
+    except asyncio.LimitOverrunError:
+        raise HttpError(413, "Слишком длинные заголовки")
+    request_line, *header_lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = request_line.split(' ', 2)
+    except ValueError:
+        raise HttpError(400, "Некорректная строка запроса")
+    headers = {}
+    for line in header_lines:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HttpError(400, "Некорректный заголовок Content-Length")
+    if length < 0:
+        raise HttpError(400, "Некорректный заголовок Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, f"Тело запроса больше {MAX_BODY} байт")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, headers, body
+
+def _respond(writer, status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}"]
+    if status == 503:
+        head.append("Retry-After: 1")
+    if not keep_alive:
+        head.append("Connection: close")
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+
+def _write_error(error):
+    # Нарушение ограничений (повтор номера и т. п.) — конфликт, прочее — сбой записи
+    if isinstance(error, sqlite3.IntegrityError):
+        return HttpError(409, str(error))
+    return HttpError(500, f"Ошибка записи в базу: {error}")
+
+def _int(query, name, default):
+    try:
+        return int(query.get(name, default))
+    except ValueError:
+        raise HttpError(400, f"Параметр {name} должен быть числом")
+
+def _limit(query, default):
+    limit = _int(query, 'limit', default)
+    if limit < 1:
+        raise HttpError(400, "Параметр limit должен быть положительным")
+    return min(limit, MAX_LIMIT)
+
+def _client_json(client):
+    return {'number': client.number, 'fio': client.fio, 'phone': client.phone, 'email': client.email}
+
+def _order_json(order):
+    return {
+        'number': order.number,
+        'client_number': order.client.number if order.client else None,
+        'date': order.date.isoformat(),
+        'products': [{'name': p.name, 'price': p.price} for p in order.products],
+        'total': order.total_cost,
+    }
+
+async def serve(db_path, host, port):
+    service = OrderService(db_path)
+    server = await service.start(host, port)
+    print(f"Сервис слушает http://{host}:{service.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default='shop.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.db, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import unittest
+from datetime import datetime
+from collections import namedtuple
+from aggregates import OrderAggregates
+
+Client = namedtuple('Client', 'number fio')
+Product = namedtuple('Product', 'name price')
+
+class Order:
+    def __init__(self, number, client, products_qty, date):
+        self.number = number
+        self.client = client
+        self.products_qty = products_qty
+        self.date = date
+
+class TestOrderAggregates(unittest.TestCase):
+    def setUp(self):
+        self.sugar = Product("Сахар", 50)
+        self.salt = Product("Соль", 20)
+        self.clients = [Client(i, f"Клиент {i}") for i in range(6)]
+        self.agg = OrderAggregates(top=3)
+
+    def add(self, number, client, day, products_qty):
+        self.agg.add_order(Order(number, client, products_qty, datetime(2024, 5, day)))
+
+    def test_counts_and_top(self):
+        c = self.clients
+        for i, client in enumerate(c):
+            for n in range(i + 1):
+                self.add(100 * i + n, client, 1 + n % 2, {self.sugar: 1.0})
+        self.add(999, c[0], 1, {})  # заказ без товаров не учитывается
+        self.assertEqual([(cl.number, n) for cl, n in self.agg.top_clients()], [(5, 6), (4, 5), (3, 4)])
+        self.assertEqual(sum(n for _, n in self.agg.daily_series()), 21)
+        self.assertEqual(self.agg.product_totals(), [("Сахар", 21.0)])
+        # Клиент с малым числом заказов догоняет лидеров
+        for n in range(10):
+            self.add(1000 + n, c[1], 3, {self.salt: 0.5})
+        self.assertEqual(self.agg.top_clients()[0], (c[1], 12))
+
+    def test_daily_series_buckets(self):
+        c = self.clients
+        # Время заказа не создаёт отдельную «дату»
+        self.agg.add_order(Order(1, c[0], {self.salt: 1.0}, datetime(2024, 5, 1, 10, 15, 0, 5)))
+        self.agg.add_order(Order(2, c[1], {self.salt: 1.0}, datetime(2024, 5, 1, 18, 0)))
+        self.add(3, c[0], 6, {self.sugar: 1.0})
+        self.add(4, c[0], 31, {self.sugar: 1.0})
+        self.agg.add_order(Order(5, c[0], {self.sugar: 1.0}, datetime(2024, 6, 2)))
+        self.assertEqual(self.agg.daily_series()[0], (datetime(2024, 5, 1), 2))
+        self.assertEqual(self.agg.daily_series('week'),
+                         [(datetime(2024, 4, 29), 2), (datetime(2024, 5, 6), 1), (datetime(2024, 5, 27), 2)])
+        self.assertEqual(self.agg.daily_series('month'), [(datetime(2024, 5, 1), 4), (datetime(2024, 6, 1), 1)])
+
+    def test_remove_client(self):
+        c = self.clients
+        self.add(1, c[0], 1, {self.sugar: 2.5, self.salt: 1.0})
+        self.add(2, c[0], 2, {self.salt: 0.75})
+        self.add(3, c[1], 1, {self.salt: 1.2})
+        version = self.agg.version
+        self.agg.remove_client(c[0])
+        self.assertGreater(self.agg.version, version)
+        self.assertEqual(self.agg.top_clients(), [(c[1], 1)])
+        self.assertEqual(self.agg.daily_series(), [(datetime(2024, 5, 1), 1)])
+        [(name, qty)] = self.agg.product_totals()
+        self.assertEqual(name, "Соль")
+        self.assertAlmostEqual(qty, 1.2)
+
+    def test_snapshot_is_independent(self):
+        c = self.clients
+        self.add(1, c[0], 1, {self.salt: 1.0})
+        snapshot = self.agg.snapshot()
+        self.add(2, c[1], 2, {self.salt: 2.0})
+        self.agg.remove_client(c[0])
+        self.assertEqual(snapshot.top_clients(), [(c[0], 1)])
+        self.assertEqual(snapshot.daily_series(), [(datetime(2024, 5, 1), 1)])
+        self.assertEqual(snapshot.product_totals(), [("Соль", 1.0)])
+        self.assertEqual(self.agg.top_clients(), [(c[1], 1)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
+from datetime import datetime
 from db import Database
-from analysis import top_clients_by_orders
+from models import Client, Product, Order
+from analysis import (top_clients_by_orders, top_clients_by_orders_db, order_dynamics_db,
+                      orders_to_df, orders_df_from_db)
 
 class TestAnalysis(unittest.TestCase):
     def test_plot_top_clients_runs(self):
@@ -10,5 +13,47 @@ class TestAnalysis(unittest.TestCase):
         except Exception as e:
             self.fail(f"top_clients_by_orders вызвал исключение: {e}")
 
+    def test_db_aggregations_match_pandas(self):
+        db = Database(":memory:")
+        c1 = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+        c2 = Client("2", "Петров Петр", "+79000000002", "petrov@example.com")
+        db.insert_clients([c1, c2])
+        db.insert_orders([
+            Order("101", c1, [Product("Товар1", 100), Product("Товар2", 200)], datetime(2024, 5, 1)),
+            Order("102", c1, [Product("Товар1", 100)], datetime(2024, 5, 2)),
+            Order("103", c2, [Product("Товар2", 200)], datetime(2024, 5, 1)),
+            Order("104", c2, [], datetime(2024, 5, 3)),
+        ])
+        expected = top_clients_by_orders(db.get_orders())
+        result = top_clients_by_orders_db(db)
+        self.assertEqual(result.to_dict(), expected.to_dict())
+        daily = order_dynamics_db(db, plot=False)
+        self.assertEqual(daily.tolist(), [2, 1])
+        self.assertEqual(daily.index[0], datetime(2024, 5, 1))
+
+    def test_db_aggregations_empty(self):
+        db = Database(":memory:")
+        self.assertTrue(top_clients_by_orders_db(db).empty)
+        self.assertTrue(order_dynamics_db(db, plot=False).empty)
+
+    def test_orders_df_dtypes_and_db_builder(self):
+        db = Database(":memory:")
+        c1 = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+        db.insert_client(c1)
+        db.insert_orders([
+            Order("101", c1, [Product("Товар1", 100), Product("Товар2", 200.5)], datetime(2024, 5, 1)),
+            Order("102", c1, [Product("Товар1", 100)], datetime(2024, 5, 2, 10, 30, 0, 15)),
+        ])
+        df = orders_to_df(db.get_orders())
+        self.assertEqual(str(df['ClientFIO'].dtype), 'category')
+        self.assertEqual(str(df['ProductName'].dtype), 'category')
+        self.assertEqual(str(df['ProductPrice'].dtype), 'float32')
+        self.assertTrue(str(df['OrderDate'].dtype).startswith('datetime64'))
+        from_db = orders_df_from_db(db)
+        self.assertEqual(from_db['OrderNumber'].tolist(), df['OrderNumber'].tolist())
+        self.assertEqual(from_db['ProductPrice'].tolist(), df['ProductPrice'].tolist())
+        self.assertEqual(from_db['OrderDate'].tolist(), df['OrderDate'].tolist())
+        self.assertEqual(len(orders_df_from_db(Database(":memory:"))), 0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,78 @@
+import threading
+import time
+import unittest
+from background import BackgroundRunner, Debouncer
+
+class FakeWidget:
+    """Заменяет Tk-виджет: after() копит колбэки, run_pending() их вызывает."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, func, *args):
+        callback = lambda: func(*args)
+        self.pending.append(callback)
+        return callback
+
+    def after_cancel(self, callback):
+        if callback in self.pending:
+            self.pending.remove(callback)
+
+    def run_pending(self, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            func = self.pending.pop(0)
+            func()
+            time.sleep(0.005)
+
+class TestBackgroundRunner(unittest.TestCase):
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.runner = BackgroundRunner(self.widget)
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def test_result_delivered_on_polling_thread(self):
+        results = []
+        self.runner.submit('job', sum, [1, 2, 3],
+                           on_done=lambda r: results.append((r, threading.current_thread())))
+        self.widget.run_pending()
+        self.assertEqual(results, [(6, threading.current_thread())])
+        self.assertFalse(self.runner.is_running('job'))
+
+    def test_stale_job_is_dropped(self):
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def slow():
+            started.set()
+            release.wait(2)
+            return 'old'
+
+        self.runner.submit('analysis', slow, on_done=results.append)
+        started.wait(2)
+        self.runner.submit('analysis', lambda: 'new', on_done=results.append)
+        release.set()
+        self.widget.run_pending()
+        self.assertEqual(results, ['new'])
+
+    def test_error_callback(self):
+        errors = []
+        self.runner.submit('job', lambda: 1 / 0, on_error=errors.append)
+        self.widget.run_pending()
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+
+class TestDebouncer(unittest.TestCase):
+    def test_only_last_call_runs(self):
+        widget = FakeWidget()
+        calls = []
+        search = Debouncer(widget, 250, calls.append)
+        for query in ("И", "Ив", "Ива"):
+            search(query)
+        widget.run_pending()
+        self.assertEqual(calls, ["Ива"])
+
+if __name__ == '__main__':
+    unittest.main()
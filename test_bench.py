@@ -0,0 +1,32 @@
+import unittest
+import bench
+import datagen
+from models import Client
+
+class TestDatagen(unittest.TestCase):
+    def test_seeded_and_valid(self):
+        clients, orders = datagen.generate(20, 100, seed=3)
+        again = datagen.generate(20, 100, seed=3)[1]
+        self.assertEqual([(o.client.number, o.date, o.total_cost) for o in orders],
+                         [(o.client.number, o.date, o.total_cost) for o in again])
+        self.assertTrue(all(o.products for o in orders))
+        _, errors = Client.validate_many([{'phone': c.phone, 'email': c.email} for c in clients])
+        self.assertEqual(errors, [])
+        cert_clients, cert_orders = datagen.to_certification(clients, orders)
+        self.assertEqual(sum(p["qty"] for p in cert_orders[0]["products"]), len(orders[0].products))
+
+class TestBench(unittest.TestCase):
+    def test_suite_runs(self):
+        results = bench.run_suite(200)
+        self.assertEqual(set(results), {'insert_order', 'get_orders', 'insert_order_group_commit', 'orders_to_df', 'top_clients_by_orders',
+                                        'order_dynamics', 'export_json', 'import_json', 'export_csv', 'import_csv'})
+        self.assertTrue(all(seconds >= 0 for seconds in results.values()))
+
+    def test_compare(self):
+        baseline = {'10k': {'get_orders': 0.100, 'orders_to_df': 0.001}}
+        results = {'10k': {'get_orders': 0.200, 'orders_to_df': 0.004, 'import_csv': 1.0}}
+        # orders_to_df медленнее вчетверо, но разница в пределах шума
+        self.assertEqual(bench.compare(results, baseline), [('10k', 'get_orders', 0.100, 0.200)])
+
+if __name__ == '__main__':
+    unittest.main()
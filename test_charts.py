@@ -0,0 +1,60 @@
+import unittest
+from datetime import datetime, timedelta
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from charts import LineChart, BarChart
+
+class AggMixin:
+    """Рисует в памяти через Agg вместо холста Tk."""
+
+    def create_canvas(self, parent):
+        return FigureCanvasAgg(self.figure), None
+
+class AggLineChart(AggMixin, LineChart):
+    pass
+
+class AggBarChart(AggMixin, BarChart):
+    pass
+
+class TestCharts(unittest.TestCase):
+    def test_line_updates_in_place_and_skips_same_version(self):
+        chart = AggLineChart(None, "Динамика", "Дата", "Заказы")
+        line = chart.line
+        self.assertTrue(chart.update([(datetime(2024, 5, 1), 2), (datetime(2024, 5, 2), 1)], version=1))
+        self.assertFalse(chart.update([(datetime(2024, 5, 1), 5)], version=1))
+        self.assertEqual(list(chart.line.get_ydata()), [2, 1])
+        self.assertTrue(chart.update([(datetime(2024, 5, 1), 5)], version=2))
+        self.assertIs(chart.line, line)
+        self.assertEqual(list(chart.line.get_ydata()), [5])
+        self.assertEqual(chart.draw_count, 2)
+
+    def test_line_downsampled_to_axes_width(self):
+        chart = AggLineChart(None, "Динамика", "Дата", "Заказы")
+        start = datetime(2000, 1, 1)
+        chart.update([(start + timedelta(days=i), i % 7) for i in range(20000)], version=1)
+        self.assertLessEqual(len(chart.line.get_xdata()), chart.ax.bbox.width)
+
+    def test_line_blit_without_rescale(self):
+        chart = AggLineChart(None, "Динамика", "Дата", "Заказы", blit=True)
+        chart.update([(datetime(2024, 5, 1), 2), (datetime(2024, 5, 3), 4)], version=1)
+        chart.canvas.draw()
+        self.assertIsNotNone(chart._background)
+        chart.update([(datetime(2024, 5, 1), 2), (datetime(2024, 5, 3), 4)], version=2)
+        self.assertFalse(chart._limits_changed)
+        self.assertEqual(chart.draw_count, 1)
+
+    def test_bar_reuses_bars(self):
+        chart = AggBarChart(None, "Товары", "кг", "Товары")
+        chart.update([("Сахар", 2.5), ("Соль", 1.0)], version=1)
+        bars = chart.bars
+        chart.update([("Соль", 3.0), ("Сахар", 2.5)], version=2)
+        self.assertIs(chart.bars, bars)
+        self.assertEqual([b.get_width() for b in chart.bars], [2.5, 3.0])
+        self.assertEqual([t.get_text() for t in chart.ax.get_yticklabels()], ["Сахар", "Соль"])
+        chart.update([("Соль", 3.0)], version=3)
+        self.assertEqual(len(chart.bars), 1)
+        self.assertFalse(chart.empty_label.get_visible())
+        chart.update([], version=4)
+        self.assertTrue(chart.empty_label.get_visible())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from connections import ConnectionManager
+from models import Client, Product, Order
+
+class TestConnectionManager(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.manager = ConnectionManager(os.path.join(self.tmpdir, "shop.db"))
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_concurrent_reads_and_writes(self):
+        client = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+        self.manager.insert_client(client).result()
+        errors = []
+        counts = {}
+        done = threading.Event()
+
+        def analytics():
+            try:
+                db = self.manager.reader()
+                self.assertIs(self.manager.reader(), db)
+                seen = counts[threading.get_ident()] = []
+                while not done.is_set():
+                    seen.append(db.count_orders())
+                    db.count_orders_by_date()
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=analytics) for _ in range(3)]
+        for thread in readers:
+            thread.start()
+        futures = [self.manager.insert_order(Order(str(i), client, [Product("Соль", 20)], datetime(2024, 5, 1 + i % 5)))
+                   for i in range(200)]
+        for future in futures:
+            future.result(timeout=10)
+        done.set()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(errors, [])
+        # Каждый читатель видит только зафиксированные записи, число заказов не убывает
+        for seen in counts.values():
+            self.assertEqual(seen, sorted(seen))
+        self.assertEqual(self.manager.reader().count_orders(), 200)
+        mode = self.manager.reader().conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_write_error_goes_to_future(self):
+        client = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+        self.manager.insert_client(client).result()
+        with self.assertRaises(Exception):
+            self.manager.insert_client(client).result()
+        # Писатель продолжает работу после ошибки
+        self.assertIsNone(self.manager.submit(lambda db: None).result())
+        with self.assertRaises(Exception):
+            self.manager.reader().insert_client(Client("2", "Петров Петр", "+79000000002", "petrov@example.com"))
+
+    def test_submit_after_close(self):
+        self.manager.close()
+        with self.assertRaises(RuntimeError):
+            self.manager.submit(lambda db: None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,311 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from db import Database, SCHEMA_VERSION
+from models import Client, Product, Order
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        self.c1 = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+        self.c2 = Client("2", "Петров Петр", "+79000000002", "petrov@example.com")
+        self.db.insert_client(self.c1)
+        self.db.insert_client(self.c2)
+        self.db.insert_order(Order("101", self.c1, [Product("Сахар", 50), Product("Соль", 20)], datetime(2024, 5, 1)))
+        self.db.insert_order(Order("102", self.c2, [], datetime(2024, 5, 2)))
+        self.db.insert_order(Order("103", self.c1, [Product("Соль", 20)], datetime(2024, 5, 2)))
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_get_orders_builds_graph(self):
+        orders = self.db.get_orders()
+        self.assertEqual([o.number for o in orders], ["101", "102", "103"])
+        self.assertEqual([p.name for p in orders[0].products], ["Сахар", "Соль"])
+        self.assertEqual(orders[0].total_cost, 70)
+        self.assertEqual(orders[1].products, ())
+        self.assertIs(orders[0].client, orders[2].client)
+
+    def test_iter_orders_small_batches(self):
+        orders = list(self.db.iter_orders(batch_size=1))
+        self.assertEqual([len(o.products) for o in orders], [2, 0, 1])
+
+    def test_search_clients(self):
+        self.assertEqual([c.number for c in self.db.search_clients("иванов")], ["1"])
+        self.assertEqual([c.number for c in self.db.search_clients("example.com")], ["1", "2"])
+        self.assertEqual([c.number for c in self.db.search_clients("ив")], ["1"])
+        self.assertEqual([c.number for c in self.db.search_clients("петр 0002")], ["2"])
+        # Короткие слова рядом с длинными проверяются по вхождению, а не по началу ФИО
+        self.assertEqual([c.number for c in self.db.search_clients("ivanov ов")], ["1"])
+        self.assertEqual([c.number for c in self.db.search_clients("example.com 01")], ["1"])
+        self.assertEqual(self.db.search_clients("петров 01"), [])
+        # Триггеры обновляют индекс вместе с таблицей
+        self.db.conn.execute("UPDATE clients SET fio = 'Сидоров Сидор' WHERE number = '1'")
+        self.db.conn.execute("DELETE FROM clients WHERE number = '2'")
+        self.assertEqual(self.db.search_clients("иванов"), [])
+        self.assertEqual(self.db.search_clients("петров"), [])
+        self.assertEqual([c.number for c in self.db.search_clients("сидор")], ["1"])
+
+    def test_search_after_vacuum(self):
+        # Индекс поиска ссылается на явный INTEGER PRIMARY KEY: VACUUM его не меняет
+        primary = [row[1] for row in self.db.conn.execute('PRAGMA table_info(clients)') if row[5]]
+        self.assertEqual(primary, ['id'])
+        self.db.insert_client(Client("3", "Сидоров Сидор", "+79000000003", "sidorov@example.com"))
+        self.db.conn.execute("DELETE FROM clients WHERE number = '1'")
+        self.db.conn.commit()
+        self.db.conn.execute("VACUUM")
+        self.assertEqual([c.number for c in self.db.search_clients("сидоров")], ["3"])
+        self.assertEqual([c.number for c in self.db.search_clients("петров")], ["2"])
+
+    def test_product_catalog_and_price_history(self):
+        sugar, salt = Product("Сахар", 50), Product("Соль", 20)
+        self.db.insert_order(Order("104", self.c2, [sugar, sugar, salt, sugar, Product("Сахар", 55)], datetime(2024, 5, 3)))
+        catalog = self.db.get_products()
+        self.assertEqual([(p.name, p.price) for p in catalog], [("Сахар", 50), ("Соль", 20)])
+        # Строки заказа ссылаются на код товара; одинаковые товары подряд — одна
+        # строка с количеством, порядок товаров сохраняется
+        lines = self.db.conn.execute(
+            "SELECT product_id, unit_price, quantity FROM order_products WHERE order_number = '104'").fetchall()
+        self.assertEqual(lines, [(catalog[0].id, 50, 2), (catalog[1].id, 20, 1), (catalog[0].id, 50, 1),
+                                 (catalog[0].id, 55, 1)])
+        order = self.db.get_orders()[-1]
+        self.assertEqual([(p.name, p.price) for p in order.products],
+                         [("Сахар", 50), ("Сахар", 50), ("Соль", 20), ("Сахар", 50), ("Сахар", 55)])
+        self.assertEqual(order.total_cost, 225)
+        self.assertIs(order.products[0], order.products[1])
+
+        self.db.set_product_price("Сахар", 60, datetime(2024, 6, 1))
+        self.assertEqual(self.db.get_price_history(catalog[0].id),
+                         [("2024-05-01T00:00:00", "2024-06-01T00:00:00", 50), ("2024-06-01T00:00:00", None, 60)])
+        self.assertEqual(self.db.get_products()[0].price, 60)
+        self.assertEqual(self.db.get_products(at=datetime(2024, 5, 15))[0].price, 50)
+        self.assertEqual(self.db.get_products(at=datetime(2024, 4, 1)), [])
+        with self.assertRaises(ValueError):
+            self.db.set_product_price("Сахар", 70, datetime(2024, 5, 20))
+        # Цена в записанных заказах не меняется
+        self.assertEqual(self.db.get_orders()[0].total_cost, 70)
+
+    def test_order_rollups(self):
+        self.db.insert_orders([
+            Order("104", self.c2, [Product("Соль", 20)], datetime(2024, 5, 2, 18, 30, 15, 123456)),
+            Order("105", self.c2, [Product("Сахар", 50)], datetime(2024, 5, 6, 9)),
+        ])
+        # Заказ 102 без товаров не учитывается; время внутри дня не дробит день
+        self.assertEqual(self.db.count_orders_by_date(),
+                         [("2024-05-01", 1), ("2024-05-02", 2), ("2024-05-06", 1)])
+        self.assertEqual(self.db.count_orders_by_date('week'), [("2024-04-29", 3), ("2024-05-06", 1)])
+        self.assertEqual(self.db.count_orders_by_date('month'), [("2024-05-01", 4)])
+        self.assertEqual(self.db.count_orders_by_date(date_from=datetime(2024, 5, 2), date_to=datetime(2024, 5, 6)),
+                         [("2024-05-02", 2)])
+        with self.assertRaises(ValueError):
+            self.db.count_orders_by_date('year')
+
+class TestOrdersPage(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        clients = [Client(str(i), f"Клиент {i}", f"+7900000{i:04d}", f"c{i}@example.com") for i in range(3)]
+        self.db.insert_clients(clients)
+        self.db.insert_orders(
+            Order(f"{n:04d}", clients[n % 3], [Product("Сахар", n)], datetime(2024, 5, 1 + n % 10))
+            for n in range(50)
+        )
+
+    def tearDown(self):
+        self.db.close()
+
+    def collect(self, limit, **kwargs):
+        numbers, key = [], None
+        while True:
+            page, key = self.db.get_orders_page(key, limit, **kwargs)
+            if not page:
+                return numbers
+            self.assertLessEqual(len(page), limit)
+            numbers.extend(o.number for o in page)
+
+    def test_pages_cover_all_orders(self):
+        self.assertEqual(self.collect(7), [f"{n:04d}" for n in range(50)])
+        by_date = self.collect(6, order_by='-date')
+        self.assertEqual(len(by_date), 50)
+        self.assertEqual(by_date[:5], ["0049", "0039", "0029", "0019", "0009"])
+
+    def test_filters_and_seek(self):
+        filters = {'client_number': '1', 'date_from': datetime(2024, 5, 3)}
+        numbers = self.collect(4, filters=filters)
+        self.assertEqual(len(numbers), self.db.count_orders(filters))
+        self.assertTrue(all(int(n) % 3 == 1 and int(n) % 10 >= 2 for n in numbers))
+        key = self.db.seek_orders_key(20, order_by='date')
+        page, _ = self.db.get_orders_page(key, 5, order_by='date')
+        all_by_date = self.collect(50, order_by='date')
+        self.assertEqual([o.number for o in page], all_by_date[20:25])
+        self.assertEqual(page[0].total_cost, int(page[0].number))
+
+class TestBulkInsert(unittest.TestCase):
+    def test_insert_clients_and_orders(self):
+        db = Database(":memory:", journal_mode="WAL", synchronous="NORMAL")
+        clients = [Client(str(i), f"Клиент {i}", f"+7900000{i:04d}", f"c{i}@example.com") for i in range(25)]
+        stats = db.insert_clients(clients, chunk_size=10)
+        self.assertEqual(stats['rows'], 25)
+        self.assertGreater(stats['rows_per_sec'], 0)
+        orders = (Order(str(i), clients[i % 25], [Product("Сахар", 50)] * 2, datetime(2024, 5, 1)) for i in range(40))
+        stats = db.insert_orders(orders, chunk_size=16)
+        self.assertEqual(stats['rows'], 40)
+        loaded = db.get_orders()
+        self.assertEqual(len(loaded), 40)
+        self.assertEqual(loaded[-1].total_cost, 100)
+        db.close()
+
+    def test_invalid_pragmas(self):
+        with self.assertRaises(ValueError):
+            Database(":memory:", journal_mode="WAL; DROP TABLE clients")
+        with self.assertRaises(ValueError):
+            Database(":memory:", synchronous="SLOW")
+        Database(":memory:", journal_mode="wal", synchronous="extra").close()
+
+class TestGroupCommit(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "shop.db")
+        self.client = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def committed_orders(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+        finally:
+            conn.close()
+
+    def order(self, number):
+        return Order(str(number), self.client, [Product("Соль", 20)], datetime(2024, 5, 1))
+
+    def test_groups_by_size_and_close(self):
+        db = Database(self.path, journal_mode="WAL", group_size=10, group_delay_ms=60000)
+        db.insert_clients([self.client])
+        for i in range(25):
+            db.insert_order(self.order(i))
+        self.assertEqual(self.committed_orders(), 20)
+        db.close()
+        self.assertEqual(self.committed_orders(), 25)
+
+    def test_groups_by_delay(self):
+        db = Database(self.path, journal_mode="WAL", group_size=1000, group_delay_ms=20)
+        db.insert_clients([self.client])
+        db.insert_order(self.order(1))
+        deadline = time.monotonic() + 2
+        while self.committed_orders() < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.committed_orders(), 1)
+        db.close()
+
+    def test_bad_record_does_not_drop_group(self):
+        db = Database(self.path, group_size=5, group_delay_ms=60000)
+        db.insert_clients([self.client])
+        for number in (1, 2, 1, 3):
+            db.insert_order(self.order(number))
+        with self.assertRaises(ValueError):
+            db.flush()
+        self.assertEqual(self.committed_orders(), 3)
+        db.close()
+
+    def test_errors_reported_by_flush_only(self):
+        db = Database(self.path, group_size=2, group_delay_ms=60000)
+        db.insert_clients([self.client])
+        # Группа (1, 1) фиксируется при вставке второй записи; повтор номера
+        # не роняет ни эту, ни следующую вставку — о нём сообщает flush()
+        for number in (1, 1, 2, 3):
+            db.insert_order(self.order(number))
+        self.assertEqual([o.number for o in db.get_orders()], ["1", "2", "3"])
+        with self.assertRaises(ValueError):
+            db.flush()
+        db.flush()
+        db.close()
+
+    def test_crash_loses_only_unflushed_group(self):
+        # Процесс завершается без close(): сохраняются только зафиксированные группы,
+        # и каждый сохранённый заказ записан вместе с товарами
+        script = f"""
+import os, sys
+sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})
+from datetime import datetime
+from db import Database
+from models import Client, Product, Order
+client = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+db = Database({self.path!r}, journal_mode="WAL", synchronous="FULL", group_size=10, group_delay_ms=60000)
+db.insert_clients([client])
+for i in range(27):
+    db.insert_order(Order(str(i), client, [Product("Соль", 20), Product("Сахар", 50)], datetime(2024, 5, 1)))
+os._exit(1)
+"""
+        subprocess.run([sys.executable, "-c", script], check=False)
+        self.assertEqual(self.committed_orders(), 20)
+        db = Database(self.path)
+        self.assertTrue(all(order.total_cost == 70 for order in db.get_orders()))
+        db.close()
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "shop.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assertCanonical(self, db):
+        version = db.conn.execute('PRAGMA user_version').fetchone()[0]
+        self.assertEqual(version, SCHEMA_VERSION)
+        indexes = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        self.assertTrue({'idx_order_products_order', 'idx_orders_client_number', 'idx_orders_date_number'} <= indexes)
+
+    def test_shipped_shop_db_layout(self):
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), "shop.db"), self.path)
+        db = Database(self.path)
+        self.assertCanonical(db)
+        orders = db.get_orders()
+        self.assertEqual([o.number for o in orders], ["1", "2"])
+        self.assertEqual(orders[0].client.fio, "Роман")
+        self.assertEqual([c.fio for c in db.search_clients("Роман")], ["Роман"])
+        self.assertEqual(orders[0].total_cost, 1700)
+        self.assertEqual(len(orders[1].products), 2)
+        # Коды товаров поставляемой базы сохраняются
+        self.assertEqual([(p.id, p.name) for p in db.get_products()], [(1, "Кружка"), (2, "Футболка"), (3, "Блокнот")])
+        self.assertEqual(orders[0].products[0].id, 1)
+        db.close()
+
+    def test_old_create_tables_layout(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE clients (number TEXT PRIMARY KEY, fio TEXT, phone TEXT, email TEXT)')
+        conn.execute('CREATE TABLE orders (number TEXT PRIMARY KEY, client_number TEXT, date TEXT)')
+        conn.execute('CREATE TABLE order_products (order_number TEXT, product_name TEXT, product_price REAL)')
+        conn.execute("INSERT INTO clients VALUES ('1', 'Иванов Иван', '+79000000001', 'i@example.com')")
+        conn.execute("INSERT INTO orders VALUES ('7', '1', '2024-05-01T00:00:00')")
+        conn.executemany("INSERT INTO order_products VALUES ('7', ?, ?)",
+                         [('Соль', 20), ('Сахар', 50), ('Соль', 20), ('Соль', 20)])
+        conn.commit()
+        conn.close()
+        db = Database(self.path)
+        self.assertCanonical(db)
+        order = db.get_orders()[0]
+        self.assertEqual(order.total_cost, 110)
+        # Строки сворачиваются только подряд, порядок товаров сохраняется
+        self.assertEqual([p.name for p in order.products], ['Соль', 'Сахар', 'Соль', 'Соль'])
+        self.assertEqual(db.conn.execute('SELECT COUNT(*) FROM order_products').fetchone()[0], 3)
+        # Итоги по периодам заполнены по уже имеющимся заказам
+        self.assertEqual(db.count_orders_by_date('month'), [("2024-05-01", 1)])
+        salt = next(p for p in db.get_products() if p.name == 'Соль')
+        self.assertEqual(db.get_price_history(salt.id), [("2024-05-01T00:00:00", None, 20)])
+        db.close()
+        # Повторное открытие не применяет миграции заново
+        db = Database(self.path)
+        self.assertEqual(len(db.get_orders()), 1)
+        db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from datetime import datetime
+from db import Database
+from models import Client, Product, Order
+from graph import PurchaseGraph
+
+class TestPurchaseGraph(unittest.TestCase):
+    def setUp(self):
+        self.clients = [Client(str(i), f"Клиент {i}", f"+7900000000{i}", f"c{i}@example.com") for i in range(1, 5)]
+        sugar, salt, pepper = Product("Сахар", 50), Product("Соль", 20), Product("Перец", 30)
+        c1, c2, c3, c4 = self.clients
+        self.orders = [
+            Order("1", c1, [sugar, sugar, salt], datetime(2024, 5, 1)),
+            Order("2", c2, [sugar, pepper], datetime(2024, 5, 1)),
+            Order("3", c3, [salt, sugar], datetime(2024, 5, 2)),
+            Order("4", c1, [pepper], datetime(2024, 5, 3)),
+            Order("5", c4, [pepper], datetime(2024, 5, 3)),
+        ]
+
+    def test_incidence_and_cooccurrence(self):
+        graph = PurchaseGraph()
+        graph.add_orders(self.orders)
+        matrix = graph.incidence
+        self.assertEqual(matrix.shape, (4, 3))
+        self.assertEqual(matrix[0].toarray().tolist(), [[2, 1, 1]])
+        clients = graph.client_cooccurrence(["1", "2", "3"]).toarray().tolist()
+        self.assertEqual(clients, [[0, 2, 2], [2, 0, 1], [2, 1, 0]])
+        products = graph.product_cooccurrence(["Сахар", "Перец"]).toarray().tolist()
+        self.assertEqual(products, [[0, 2], [2, 0]])
+        self.assertEqual(graph.top_clients(2), ["1", "2"])
+        self.assertEqual(graph.top_products(1), ["Сахар"])
+
+    def test_from_db_and_incremental_updates(self):
+        db = Database(":memory:")
+        db.insert_clients(self.clients)
+        db.insert_orders(self.orders[:3])
+        graph = PurchaseGraph.from_db(db)
+        self.assertEqual(graph.incidence.sum(), 7)
+        # Новые заказы добавляют строки и столбцы без пересборки с нуля
+        graph.add_orders(self.orders[3:] + [Order("6", self.clients[3], [Product("Куркума", 50)])])
+        self.assertEqual(graph.incidence.shape, (4, 4))
+        db.insert_orders(self.orders[3:])
+        full = PurchaseGraph.from_db(db)
+        self.assertEqual(full.incidence.sum() + 1, graph.incidence.sum())
+        db.close()
+
+        edges = graph.client_graph(top=3)
+        self.assertEqual(set(edges.nodes), {"1", "2", "3"})
+        self.assertEqual(edges.nodes["1"]["label"], "Клиент 1")
+        self.assertEqual(edges["1"]["2"]["weight"], 2)
+        self.assertEqual(graph.client_graph(top=3, min_weight=2).number_of_edges(), 2)
+        self.assertEqual(graph.product_graph(top=4)["Сахар"]["Соль"]["weight"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
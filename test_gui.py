@@ -0,0 +1,37 @@
+import unittest
+from datetime import datetime
+from db import Database
+from models import Client, Product, Order
+from aggregates import OrderAggregates
+from gui import DEFAULT_CATALOG, Order as GuiOrder, load_catalog, prepare_analysis
+
+class TestLoadCatalog(unittest.TestCase):
+    def test_empty_database_uses_default_catalog(self):
+        db = Database(":memory:")
+        self.assertEqual([(p.name, p.price) for p in load_catalog(db)], DEFAULT_CATALOG)
+        db.close()
+
+    def test_products_from_database_keep_ids(self):
+        db = Database(":memory:")
+        client = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+        db.insert_client(client)
+        db.insert_order(Order("1", client, [Product("Соль", 20)]))
+        catalog = load_catalog(db)
+        self.assertEqual([(p.id, p.name) for p in catalog], [(db.get_products()[0].id, "Соль")])
+        db.close()
+
+class TestPrepareAnalysis(unittest.TestCase):
+    def test_computes_from_snapshot(self):
+        client = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+        salt = Product("Соль", 20)
+        aggregates = OrderAggregates()
+        for day in range(1, 29):
+            aggregates.add_order(GuiOrder(day, client, {salt: 1.0}, datetime(2024, 2, day)))
+        result = prepare_analysis(aggregates.snapshot(), 'week', 3)
+        # Ряд уже прорежен до ширины графика
+        self.assertEqual(len(result['dynamics']), 3)
+        self.assertEqual(result['products'], [("Соль", 28.0)])
+        self.assertIn("Иванов Иван: 28 заказов", result['top_clients'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+import metrics
+from db import Database
+from models import Client
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        metrics.enable()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.registry.reset()
+
+    def test_timed_and_percentiles(self):
+        @metrics.timed('test.square')
+        def square(x):
+            return x * x
+        self.assertEqual([square(i) for i in range(100)][-1], 99 * 99)
+        for i in range(1, 101):
+            metrics.registry.record('test.fixed', i / 1000)
+        summary = metrics.registry.summary()
+        self.assertEqual(summary['test.square']['count'], 100)
+        self.assertAlmostEqual(summary['test.fixed']['p50'], 0.050)
+        self.assertAlmostEqual(summary['test.fixed']['p95'], 0.095)
+        self.assertAlmostEqual(summary['test.fixed']['max'], 0.100)
+
+    def test_disabled_records_nothing(self):
+        metrics.disable()
+        with metrics.timer('test.block'):
+            pass
+        db = Database(":memory:")
+        db.get_clients()
+        self.assertNotIsInstance(db.conn, metrics.TracedConnection)
+        db.close()
+        self.assertEqual(metrics.registry.summary(), {})
+
+    def test_database_and_sql_metrics(self):
+        db = Database(":memory:")
+        db.insert_client(Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com"))
+        db.insert_client(Client("2", "Петров Петр", "+79000000002", "petrov@example.com"))
+        db.get_clients()
+        db.close()
+        summary = metrics.registry.summary()
+        self.assertEqual(summary['db.insert_client']['count'], 2)
+        # Значения параметров не дробят метрику запроса
+        inserts = [name for name in summary if name.startswith('sql: INSERT INTO clients (')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(summary[inserts[0]]['count'], 2)
+        self.assertIn('sql: SELECT number, fio, phone, email FROM clients', summary)
+        # Фиксация транзакций замеряется, хотя инструкций SQLite в ней почти нет
+        self.assertGreaterEqual(summary['sql: COMMIT']['count'], 2)
+        self.assertGreater(summary['sql: COMMIT']['total'], 0)
+        # Отложенной записи не было — пустой flush() при закрытии не считается
+        self.assertNotIn('db.flush', summary)
+
+    def test_dump(self):
+        metrics.registry.record('test.fixed', 0.5)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            json_path = os.path.join(tmpdir, 'metrics.json')
+            csv_path = os.path.join(tmpdir, 'metrics.csv')
+            metrics.registry.dump(json_path)
+            metrics.registry.dump(csv_path)
+            with open(json_path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['test.fixed']['count'], 1)
+            with open(csv_path, encoding='utf-8') as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows[1][:2], ['test.fixed', '1'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
-from models import Client, Product, Order
+from datetime import datetime, timedelta, timezone
+from models import Client, Product, Order, OrderBatch
 
 class TestModels(unittest.TestCase):
     def test_email_validation(self):
@@ -16,5 +17,93 @@ class TestModels(unittest.TestCase):
         order = Order(1, 1, [p1, p2])
         self.assertEqual(order.total_cost, 400)
 
+    def test_total_cost_cache_invalidation(self):
+        order = Order(1, 1, [Product("Test1", 100)])
+        self.assertEqual(order.total_cost, 100)
+        order.add_product(Product("Test2", 50))
+        self.assertEqual(order.total_cost, 150)
+        order.products = []
+        self.assertEqual(order.total_cost, 0)
+        # Список товаров нельзя изменить в обход кэша
+        with self.assertRaises(AttributeError):
+            order.products.append(Product("Test3", 10))
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Product("Test", 1).color = "red"
+
+class TestValidateMany(unittest.TestCase):
+    records = [
+        {'phone': '+79000000001', 'email': 'a@example.com'},
+        {'phone': '12345', 'email': 'b@example.com'},
+        {'phone': None, 'email': 'bademail'},
+    ]
+    expected_errors = [
+        {'row': 1, 'field': 'phone', 'value': '12345'},
+        {'row': 2, 'field': 'phone', 'value': None},
+        {'row': 2, 'field': 'email', 'value': 'bademail'},
+    ]
+
+    def test_records(self):
+        valid, errors = Client.validate_many(self.records)
+        self.assertEqual(valid, [True, False, False])
+        self.assertEqual(errors, self.expected_errors)
+
+    def test_dataframe(self):
+        import pandas as pd
+        valid, errors = Client.validate_many(pd.DataFrame(self.records))
+        self.assertEqual(valid.tolist(), [True, False, False])
+        self.assertEqual([(e['row'], e['field']) for e in errors],
+                         [(e['row'], e['field']) for e in self.expected_errors])
+
+    def test_same_anchoring_as_validate(self):
+        import pandas as pd
+        records = [{'phone': '+79000000001\n', 'email': 'a@example.com'},
+                   {'phone': 79000000001, 'email': 'a@example.com\n'}]
+        with self.assertRaises(ValueError):
+            Client(1, "Name", records[0]['phone'], records[0]['email'])
+        self.assertEqual(Client.validate_many(records)[0], [False, False])
+        valid, errors = Client.validate_many(pd.DataFrame(records))
+        self.assertEqual(valid.tolist(), [False, False])
+        self.assertEqual([(e['row'], e['field']) for e in errors], [(0, 'phone'), (1, 'phone'), (1, 'email')])
+        # Столбец без строк целиком ошибочен
+        self.assertEqual(Client.validate_many(pd.DataFrame({'phone': [1, 2], 'email': ['a@b.ru'] * 2}))[0].tolist(),
+                         [False, False])
+
+class TestOrderBatch(unittest.TestCase):
+    def setUp(self):
+        self.c1 = Client(1, "Иванов Иван", "+79000000001", "ivanov@example.com")
+        self.c2 = Client(2, "Петров Петр", "+79000000002", "petrov@example.com")
+        p1, p2 = Product("Товар1", 100), Product("Товар2", 250.5)
+        self.orders = [
+            Order("101", self.c1, [p1, p2], datetime(2024, 5, 1, 12, 30, 0, 123456)),
+            Order("102", self.c1, [p1], datetime(2024, 5, 2)),
+            Order("103", self.c2, [], datetime(2024, 5, 3)),
+        ]
+        self.batch = OrderBatch.from_orders(self.orders)
+
+    def test_roundtrip(self):
+        restored = self.batch.to_orders()
+        self.assertEqual(len(restored), 3)
+        for original, copy in zip(self.orders, restored):
+            self.assertEqual(copy.number, original.number)
+            self.assertIs(copy.client, original.client)
+            self.assertEqual(copy.date, original.date)
+            self.assertEqual([(p.name, p.price) for p in copy.products],
+                             [(p.name, p.price) for p in original.products])
+            self.assertEqual(copy.total_cost, original.total_cost)
+        self.assertEqual(len(self.batch.lines), 3)
+        self.assertEqual(self.batch.products, ["Товар1", "Товар2"])
+
+    def test_aware_dates(self):
+        moment = datetime(2024, 5, 1, 15, 0, tzinfo=timezone(timedelta(hours=3)))
+        batch = OrderBatch.from_orders([Order("104", self.c1, [], moment)])
+        self.assertEqual(batch[0].date, datetime(2024, 5, 1, 12, 0))
+
+    def test_aggregates(self):
+        self.assertEqual(self.batch.total_cost(0), 350.5)
+        self.assertEqual(self.batch.totals_by_client(), {self.c1: 450.5, self.c2: 0.0})
+        self.assertEqual(self.batch.orders_by_client(), {self.c1: 2, self.c2: 1})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+import random
+import unittest
+from order_index import OrderIndex, RESULT_CACHE_SIZE
+
+def make_index():
+    return OrderIndex({
+        "id": lambda o: o["id"],
+        "client_id": lambda o: o["client_id"],
+        "date": lambda o: o["date"],
+        "total": lambda o: o["total"],
+    }, group=("client_id",))
+
+def make_orders(count, seed=1):
+    rnd = random.Random(seed)
+    return [{"id": i, "client_id": rnd.randint(1, 5), "date": f"2024-05-{rnd.randint(1, 9):02d}",
+             "total": rnd.choice([10.0, 20.0, 30.0])} for i in range(1, count + 1)]
+
+class TestOrderIndex(unittest.TestCase):
+    def test_matches_plain_sort_after_inserts(self):
+        orders = make_orders(300)
+        index = make_index()
+        index.extend(orders[:200])
+        sort = ("client_id", "-total", "date")
+        index.query(sort)  # перестановка строится здесь и дальше только дополняется
+        index.extend(orders[200:])
+        expected = sorted(orders, key=lambda o: o["date"])
+        expected.sort(key=lambda o: o["total"], reverse=True)
+        expected.sort(key=lambda o: o["client_id"])
+        self.assertEqual([o["id"] for o in index.query(sort)], [o["id"] for o in expected])
+
+    def test_combined_filters(self):
+        orders = make_orders(100)
+        index = make_index()
+        index.extend(orders)
+        index.query(("-date",))
+        index.add({"id": 101, "client_id": 3, "date": "2024-05-05", "total": 99.0})
+        result = index.query(("-date", "id"), {"client_id": 3, "date": ("2024-05-03", "2024-05-07")})
+        expected = [o for o in orders + [index.items[-1]]
+                    if o["client_id"] == 3 and "2024-05-03" <= o["date"] < "2024-05-07"]
+        expected.sort(key=lambda o: (o["date"], -o["id"]), reverse=True)
+        self.assertEqual([o["id"] for o in result], [o["id"] for o in expected])
+        # Без сортировки — порядок добавления; исходный список не меняется
+        self.assertEqual([o["id"] for o in index.query(filters={"client_id": 3})],
+                         [o["id"] for o in orders + [index.items[-1]] if o["client_id"] == 3])
+        self.assertEqual([o["id"] for o in index.items], list(range(1, 102)))
+
+    def test_cached_query_updated_on_add(self):
+        orders = make_orders(200)
+        index = make_index()
+        index.extend(orders[:100])
+        queries = [((), {}), (("-total", "date"), {}), (("date",), {"client_id": 2}),
+                   (("client_id",), {"date": ("2024-05-03", None)})]
+        for sort, filters in queries:
+            index.query(sort, filters)
+        for order in orders[100:]:
+            index.add(order)
+            for sort, filters in queries:
+                fresh = make_index()
+                fresh.extend(index.items)
+                expected = fresh.query(sort, filters)
+                self.assertEqual(index.query(sort, filters), expected)
+                place = index.place(sort, filters)
+                if order in expected:
+                    self.assertIs(expected[place], order)
+                else:
+                    self.assertIsNone(place)
+
+    def test_result_cache_is_bounded(self):
+        index = make_index()
+        index.extend(make_orders(50))
+        for day in range(1, 10):
+            index.query(("date",), {"date": (f"2024-05-0{day}", None)})
+        self.assertLessEqual(len(index._results), RESULT_CACHE_SIZE)
+        current = ("-total",), {"client_id": 1}
+        index.query(*current)
+        index.add({"id": 51, "client_id": 1, "date": "2024-05-09", "total": 1000.0})
+        # Дополняется только текущий запрос, остальные сброшены
+        self.assertEqual(len(index._results), 1)
+        self.assertEqual(index.place(*current), 0)
+
+    def test_unknown_key(self):
+        with self.assertRaises(ValueError):
+            make_index().query(("price",))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from datagen import generate
+from db import Database
+from parallel import PartitionedAggregator
+from analysis import order_dynamics_db, order_dynamics_parallel, top_clients_by_orders_parallel
+
+class TestPartitionedAggregator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.tmpdir, "shop.db")
+        clients, cls.orders = generate(300, 5000, seed=1)
+        db = Database(cls.path)
+        db.insert_clients(clients)
+        db.insert_orders(cls.orders)
+        cls.by_client = db.count_orders_by_client()
+        cls.client_orders = {number: count for number, _, count in cls.by_client}
+        cls.weekly = db.count_orders_by_date('week')
+        db.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_partial_results_merge_to_totals(self):
+        sales = Counter()
+        for order in self.orders:
+            sales[order.client.number] += order.total_cost
+        for partition in (None, 'date', 'client'):
+            with self.subTest(partition=partition), PartitionedAggregator(self.path, workers=3, partition=partition) as agg:
+                self.assertEqual(len(agg.partitions(partition or 'date')), 3)
+                self.assertEqual(dict(agg.run('client_orders')), self.client_orders)
+                self.assertEqual(agg.order_dynamics('week'), self.weekly)
+                # Тот же порядок, что у базы, в том числе при равном числе заказов
+                top = agg.top_clients_by_orders(top=20)
+                self.assertEqual(top, self.by_client[:20])
+                self.assertEqual(top[0][1], next(o.client.fio for o in self.orders if o.client.number == top[0][0]))
+                totals = agg.client_sales()
+                self.assertEqual(len(totals), len(sales))
+                for number, _, total in totals:
+                    self.assertAlmostEqual(total, sales[number], places=4)
+
+    def test_analysis_wrappers(self):
+        db = Database(self.path)
+        expected = order_dynamics_db(db, plot=False, bucket='month')
+        db.close()
+        with PartitionedAggregator(self.path, workers=2) as agg:
+            self.assertTrue(order_dynamics_parallel(agg, plot=False, bucket='month').equals(expected))
+            self.assertEqual(len(top_clients_by_orders_parallel(agg, top=3)), 3)
+
+    def test_orders_without_date(self):
+        path = os.path.join(self.tmpdir, "nodate.db")
+        clients, orders = generate(10, 50, seed=2)
+        db = Database(path)
+        db.insert_clients(clients)
+        db.insert_orders(orders)
+        expected = db.count_orders_by_date()
+        with db.conn:
+            db.conn.execute("INSERT INTO orders (number, client_number, date) VALUES ('x', '1', NULL)")
+            db.conn.execute("INSERT INTO order_products (order_number, product_id, unit_price) VALUES ('x', 1, 10)")
+        db.close()
+        with PartitionedAggregator(path, workers=2, partition='date') as agg:
+            self.assertEqual(agg.order_dynamics(), expected)
+
+    def test_single_worker_and_errors(self):
+        with PartitionedAggregator(self.path, workers=1) as agg:
+            self.assertEqual(agg.partitions(), [(None, None)])
+            self.assertEqual(dict(agg.run('client_orders')), self.client_orders)
+            with self.assertRaises(ValueError):
+                agg.run('unknown')
+        with self.assertRaises(ValueError):
+            PartitionedAggregator(":memory:")
+        with self.assertRaises(ValueError):
+            PartitionedAggregator(self.path, partition='hash')
+
+if __name__ == '__main__':
+    unittest.main()
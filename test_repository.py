@@ -0,0 +1,73 @@
+import unittest
+from repository import Repository
+
+class Client:
+    def __init__(self, number, fio, phone=None, email=None):
+        self.number = number
+        self.fio = fio
+        self.phone = phone
+        self.email = email
+
+class TestRepository(unittest.TestCase):
+    def setUp(self):
+        self.clients = Repository('number', unique=('email', 'phone'))
+        self.c1 = self.clients.add(Client(1, "Иванов Иван", "+79000000001", "ivanov@example.com"))
+        self.c2 = self.clients.add(Client(2, "Петров Петр"))
+
+    def test_lookup_and_uniqueness(self):
+        self.assertIs(self.clients.get(1), self.c1)
+        self.assertIs(self.clients.find('email', "ivanov@example.com"), self.c1)
+        self.assertIn(2, self.clients)
+        with self.assertRaises(ValueError):
+            self.clients.add(Client(1, "Дубль"))
+        with self.assertRaises(ValueError):
+            self.clients.add(Client(3, "Дубль", phone="+79000000001"))
+        # Пустые значения уникальных полей не конфликтуют
+        self.clients.add(Client(3, "Сидоров Сидор"))
+        self.assertEqual(len(self.clients), 3)
+        # Пустой первичный ключ не принимается и не подменяет существующую запись
+        for number in (None, ''):
+            with self.assertRaises(ValueError):
+                self.clients.add(Client(number, "Без номера"))
+        with self.assertRaises(ValueError):
+            self.clients.update(self.c2, number='')
+        self.assertIs(self.clients.get(2), self.c2)
+
+    def test_update_keeps_indexes(self):
+        with self.assertRaises(ValueError):
+            self.clients.update(self.c2, number=1)
+        self.assertEqual(self.c2.number, 2)
+        self.clients.update(self.c1, number=10, email="new@example.com")
+        self.assertIsNone(self.clients.get(1))
+        self.assertIs(self.clients.get(10), self.c1)
+        self.assertIsNone(self.clients.find('email', "ivanov@example.com"))
+        self.assertIs(self.clients.find('email', "new@example.com"), self.c1)
+        self.clients.remove(self.c1)
+        self.clients.add(Client(1, "Новый", email="ivanov@example.com"))
+
+    def test_dict_items_and_multi_index(self):
+        orders = Repository.of_dicts("id", index=("client_id",))
+        orders.extend({"id": i, "client_id": i % 2, "products": []} for i in range(1, 6))
+        self.assertEqual([o["id"] for o in orders.filter("client_id", 1)], [1, 3, 5])
+        orders.remove(orders.get(3))
+        orders.update(orders.get(2), client_id=1)
+        self.assertEqual([o["id"] for o in orders.filter("client_id", 1)], [1, 5, 2])
+        self.assertEqual(orders.filter("client_id", 7), [])
+
+    def test_search(self):
+        clients = Repository('number', search=('fio', 'phone', 'email'))
+        ivanov = clients.add(Client(1, "Иванов Иван", "+79000000001", "ivanov@example.com"))
+        petrov = clients.add(Client(2, "Петров Иван", "+79000000002"))
+        self.assertEqual(clients.search("иван"), [ivanov, petrov])
+        # Совпадение с началом поля выше, чем в середине
+        self.assertEqual(clients.search("ИВАН", limit=1), [ivanov])
+        self.assertEqual(clients.search("петров 0002"), [petrov])
+        self.assertEqual(clients.search("example"), [ivanov])
+        clients.update(petrov, fio="Сидоров Сидор")
+        self.assertEqual(clients.search("иван"), [ivanov])
+        clients.remove(ivanov)
+        self.assertEqual(clients.search("иван"), [])
+        self.assertEqual(clients.search("   "), [])
+
+if __name__ == '__main__':
+    unittest.main()
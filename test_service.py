@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from urllib.parse import quote
+import service
+from service import OrderService
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(data)
+
+class TestOrderService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.service = OrderService(os.path.join(self.tmpdir, "shop.db"), batch_delay_ms=5)
+        await self.service.start(port=0)
+        self.port = self.service.port
+
+    async def asyncTearDown(self):
+        await self.service.close()
+        shutil.rmtree(self.tmpdir)
+
+    async def test_create_and_query(self):
+        client = {"number": "1", "fio": "Иванов Иван", "phone": "+79000000001", "email": "ivanov@example.com"}
+        self.assertEqual(await request(self.port, "POST", "/clients", client), (201, {"created": 1}))
+        # Проверка телефона из models.Client
+        status, _ = await request(self.port, "POST", "/clients", dict(client, number="2", phone="123"))
+        self.assertEqual(status, 400)
+        status, body = await request(self.port, "POST", "/clients", client)
+        self.assertEqual((status, body["created"]), (409, 0))
+
+        orders = [request(self.port, "POST", "/orders", {
+            "number": str(i), "client_number": "1", "date": "2024-05-01T10:00:00",
+            "products": [{"name": "Соль", "price": 20}, {"name": "Сахар", "price": 50}],
+        }) for i in range(100, 150)]
+        self.assertEqual({status for status, _ in await asyncio.gather(*orders)}, {201})
+        # Параллельные заказы записаны группами, а не транзакцией на каждый
+        self.assertLess(self.service.batches, 50)
+        status, _ = await request(self.port, "POST", "/orders", {"number": "999", "client_number": "7"})
+        self.assertEqual(status, 400)
+
+        status, page = await request(self.port, "GET", "/orders?client_number=1&limit=30")
+        self.assertEqual((status, len(page["orders"]), page["orders"][0]["total"]), (200, 30, 70))
+        status, page = await request(self.port, "GET", f"/orders?client_number=1&after={page['next']}")
+        self.assertEqual(len(page["orders"]), 20)
+        status, found = await request(self.port, "GET", "/clients?q=" + quote("иванов"))
+        self.assertEqual([c["number"] for c in found], ["1"])
+        self.assertEqual((await request(self.port, "GET", "/products"))[0], 404)
+
+    async def test_failed_clients_not_registered(self):
+        client = {"number": "1", "fio": "Иванов Иван", "phone": "+79000000001", "email": "ivanov@example.com"}
+        await request(self.port, "POST", "/clients", client)
+        # Второй элемент ошибочен: первый не записан и заказы на него не принимаются
+        status, _ = await request(self.port, "POST", "/clients", [dict(client, number="2"), {"number": "3"}])
+        self.assertEqual(status, 400)
+        # Повтор номера отклонён базой
+        status, _ = await request(self.port, "POST", "/clients", dict(client, number="1", fio="Дубль"))
+        self.assertEqual(status, 409)
+        for number in ("1", "2"):
+            order = {"number": "10" + number, "client_number": number, "products": []}
+            expected = 201 if number == "1" else 400
+            self.assertEqual((await request(self.port, "POST", "/orders", order))[0], expected)
+
+    async def test_write_failure_and_bad_length(self):
+        client = {"number": "1", "fio": "Иванов Иван", "phone": "+79000000001", "email": "ivanov@example.com"}
+        # Сбой записи всей группы — ошибка сервера, а не конфликт
+        error = sqlite3.OperationalError("disk I/O error")
+        with mock.patch.object(self.service.db, "write_batch", side_effect=error):
+            status, body = await request(self.port, "POST", "/clients", client)
+        self.assertEqual((status, body["created"]), (500, 0))
+        self.assertNotIn("1", self.service._client_numbers)
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(b"POST /clients HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        self.assertEqual(int(response.split()[1]), 400)
+
+    async def test_limit_checked(self):
+        for path in ("/orders?limit=-1", "/clients?q=ivanov&limit=0"):
+            self.assertEqual((await request(self.port, "GET", path))[0], 400)
+        with mock.patch.object(self.service.db, "get_orders_page", return_value=([], None)) as page:
+            await request(self.port, "GET", "/orders?limit=1000000")
+        self.assertEqual(page.call_args.args[1], service.MAX_LIMIT)
+
+    async def test_idle_connection_closed(self):
+        self.service.idle_timeout = 0.05
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        # Молчащее соединение закрывается сервером, не занимая место навсегда
+        self.assertEqual(await asyncio.wait_for(reader.read(), 5), b'')
+        writer.close()
+
+    async def test_backpressure(self):
+        # Больше записей, чем помещается в очередь: отказ сразу, без ожидания
+        clients = [{"number": str(i)} for i in range(self.service.max_pending + 1)]
+        status, _ = await request(self.port, "POST", "/clients", clients)
+        self.assertEqual(status, 503)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+import unittest
+from bench_startup import parse_importtime, total_ms
+
+# Тяжёлые библиотеки, которые нужны только аналитике
+HEAVY_MODULES = {'pandas', 'numpy', 'matplotlib', 'scipy', 'networkx', 'PIL'}
+
+class TestStartup(unittest.TestCase):
+    def test_gui_import_is_light(self):
+        # Проверяем состав модулей, а не время: оно зависит от загрузки машины
+        result = subprocess.run(
+            [sys.executable, '-c', 'import sys, gui; print("\\n".join(sys.modules))'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        loaded = {name.split('.')[0] for name in result.stdout.split()}
+        self.assertIn('gui', loaded)
+        self.assertEqual(loaded & HEAVY_MODULES, set())
+
+    def test_parse_importtime(self):
+        report = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |     _io\n"
+            "import time:       200 |        300 |   io\n"
+            "import time:       500 |        800 | gui\n"
+        )
+        rows = parse_importtime(report)
+        self.assertEqual(rows[-1], ('gui', 500, 800, 0))
+        self.assertEqual(rows[0][3], 2)
+        self.assertEqual(total_ms(rows), 0.8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import math
+import unittest
+from datetime import date, datetime, timedelta
+from timeseries import bucket_start, lttb
+
+class TestTimeseries(unittest.TestCase):
+    def test_bucket_start(self):
+        moment = datetime(2024, 5, 5, 23, 59, 59, 999999)  # воскресенье
+        self.assertEqual(bucket_start(moment), datetime(2024, 5, 5))
+        self.assertEqual(bucket_start(moment, 'week'), datetime(2024, 4, 29))
+        self.assertEqual(bucket_start(date(2024, 5, 6), 'week'), datetime(2024, 5, 6))
+        self.assertEqual(bucket_start(moment, 'month'), datetime(2024, 5, 1))
+        with self.assertRaises(ValueError):
+            bucket_start(moment, 'quarter')
+
+    def test_lttb_keeps_shape(self):
+        start = datetime(2020, 1, 1)
+        points = [(start + timedelta(days=i), math.sin(i / 50)) for i in range(5000)]
+        points[1234] = (points[1234][0], 10.0)  # одиночный выброс
+        sampled = lttb(points, 300)
+        self.assertEqual(len(sampled), 300)
+        self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+        self.assertEqual(sampled, sorted(sampled))
+        self.assertIn(points[1234], sampled)
+        # Короткий ряд не меняется
+        self.assertEqual(lttb(points[:10], 300), points[:10])
+        self.assertEqual(lttb([(1, 2), (2, 3), (3, 1)], 2), [(1, 2), (2, 3), (3, 1)])
+
+if __name__ == '__main__':
+    unittest.main()
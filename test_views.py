@@ -0,0 +1,110 @@
+import unittest
+from datetime import datetime
+from db import Database
+from models import Client, Product, Order
+from views import ListViewModel, PagedSource
+
+class RecordingSink:
+    """Запоминает строки как список и ведёт журнал операций."""
+
+    def __init__(self):
+        self.rows = []
+        self.log = []
+
+    def insert_row(self, index, key, row):
+        self.rows.insert(index, row)
+        self.log.append(('insert', index))
+
+    def update_row(self, index, key, row):
+        self.rows[index] = row
+        self.log.append(('update', index))
+
+    def delete_row(self, index, key):
+        del self.rows[index]
+        self.log.append(('delete', index))
+
+    def clear_rows(self):
+        self.rows = []
+        self.log.append(('clear',))
+
+class TestListViewModel(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+
+        def format_row(item):
+            self.calls += 1
+            return f"{item['id']}: {item['name']}"
+
+        self.sink = RecordingSink()
+        self.view = ListViewModel(format_row, self.sink)
+        self.items = [{'id': i, 'name': f"Клиент {i}"} for i in range(3)]
+        self.view.reset((item['id'], item) for item in self.items)
+
+    def test_append_touches_one_row(self):
+        self.sink.log.clear()
+        self.calls = 0
+        self.view.append(3, {'id': 3, 'name': "Новый"})
+        self.assertEqual(self.sink.log, [('insert', 3)])
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.view.row(3), "3: Новый")
+
+    def test_update_and_remove(self):
+        self.sink.log.clear()
+        self.items[1]['name'] = "Изменён"
+        self.view.update(1, self.items[1])
+        self.view.update(2, self.items[2])  # текст не изменился — виджет не трогаем
+        self.view.remove(0)
+        self.assertEqual(self.sink.log, [('update', 1), ('delete', 0)])
+        self.assertEqual(self.sink.rows, ["1: Изменён", "2: Клиент 2"])
+        self.assertEqual(len(self.view), 2)
+        self.assertNotIn(0, self.view)
+
+    def test_positions_after_inserts_and_removals(self):
+        for key in range(3, 10):
+            self.view.append(key, {'id': key, 'name': f"Клиент {key}"})
+        self.view.insert(2, 'x', {'id': 'x', 'name': "Вставлен"})
+        self.view.remove(5)
+        self.assertEqual([self.view.index(key) for key in self.view.keys], list(range(len(self.view))))
+        self.sink.log.clear()
+        self.view.remove_many([1, 7, 'x', 42])
+        self.assertEqual(self.sink.log, [('delete', 7), ('delete', 2), ('delete', 1)])
+        self.assertEqual(self.view.keys, [0, 2, 3, 4, 6, 8, 9])
+        self.assertEqual(self.sink.rows, [self.view.row(key) for key in self.view.keys])
+        self.assertEqual([self.view.index(key) for key in self.view.keys], list(range(7)))
+        with self.assertRaises(KeyError):
+            self.view.index(7)
+
+    def test_duplicate_key(self):
+        with self.assertRaises(KeyError):
+            self.view.append(1, self.items[1])
+
+class TestPagedSource(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        client = Client("1", "Иванов Иван", "+79000000001", "ivanov@example.com")
+        self.db.insert_client(client)
+        self.db.insert_orders(Order(f"{n:05d}", client, [Product("Сахар", 50)], datetime(2024, 5, 1)) for n in range(1000))
+        self.pages = []
+        fetch = self.db.get_orders_page
+
+        def counting_fetch(after_key, limit, *args):
+            self.pages.append(after_key)
+            return fetch(after_key, limit, *args)
+
+        self.db.get_orders_page = counting_fetch
+        self.source = PagedSource.for_orders(self.db, lambda o: o.number, page_size=50, max_pages=4)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_window_and_bounded_cache(self):
+        self.assertEqual(len(self.source), 1000)
+        self.assertEqual(self.source.window(45, 55), [f"{n:05d}" for n in range(45, 55)])
+        self.assertEqual(self.pages, [None, ("00049",)])  # вторая страница — по ключу первой
+        self.assertEqual(self.source.window(990, 1010), [f"{n:05d}" for n in range(990, 1000)])
+        self.assertEqual(self.source.window(500, 501), ["00500"])
+        self.assertLessEqual(len(self.source._pages), 4)
+        self.assertEqual(self.source.window(0, 3), ["00000", "00001", "00002"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Временные ряды для графиков динамики: интервалы группировки и прореживание.
+
+Заказы группируются по дням, неделям (с понедельника) или месяцам; началом
+интервала служит полночь его первого дня. Перед выводом длинный ряд
+прореживается алгоритмом LTTB (Largest-Triangle-Three-Buckets) до числа
+точек не больше ширины графика в пикселях: форма линии, пики и провалы
+сохраняются, а время отрисовки не растёт с длиной истории.
+"""
+
+from datetime import date, datetime, timedelta
+
+BUCKETS = ('day', 'week', 'month')
+
+def check_bucket(bucket):
+    if bucket not in BUCKETS:
+        raise ValueError(f"Неизвестный интервал группировки: {bucket!r} (ожидается один из {', '.join(BUCKETS)})")
+    return bucket
+
+def bucket_start(value, bucket='day'):
+    """Начало интервала ``bucket``, которому принадлежит дата ``value``, как ``datetime``."""
+    check_bucket(bucket)
+    day = datetime(value.year, value.month, value.day)
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def lttb(points, threshold):
+    """Прореживает ряд ``[(x, y), ...]`` (по возрастанию x) до ``threshold`` точек.
+
+    Первая и последняя точки сохраняются; из каждой группы остальных
+    выбирается точка, образующая наибольший треугольник с предыдущей
+    выбранной точкой и средним следующей группы. ``x`` — число, ``date``
+    или ``datetime``. Короткие ряды возвращаются без изменений.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    xs = [_as_number(x) for x, _ in points]
+    ys = [y for _, y in points]
+    every = (n - 2) / (threshold - 2)
+    sampled = [points[0]]
+    a = 0
+    for i in range(threshold - 2):
+        # Среднее следующей группы — третья вершина треугольника
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+        ax, ay = xs[a], ys[a]
+        best, best_area = next_start - 1, -1.0
+        for j in range(int(i * every) + 1, next_start):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+def _as_number(x):
+    if isinstance(x, datetime):
+        return x.timestamp()
+    if isinstance(x, date):
+        return x.toordinal()
+    return x
@@ -0,0 +1,332 @@
+"""
+Модели представления для списков tkinter.
+
+Вместо полной очистки и перезаполнения виджета после каждого изменения
+модель применяет к нему только разницу: вставку, обновление или удаление
+одной строки. Текст каждой строки форматируется один раз и кэшируется.
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from tkinter import ttk
+
+class ListViewModel:
+    """Упорядоченные строки списка с кэшем отформатированного текста.
+
+    ``format_row(item)`` возвращает текст строки (для Listbox) или кортеж
+    значений (для Treeview); ``sink`` переносит изменения в виджет — обычно
+    это ``VirtualList``, показывающий модель.
+
+    Позиция строки по ключу берётся из словаря ``ключ -> позиция``. Вставка
+    или удаление в середине сдвигают позиции за собой, поэтому словарь
+    пересчитывается лениво, с первой сдвинутой позиции и только при
+    следующем поиске: серия ``update`` — O(1) на строку, ``remove_many`` —
+    один проход по списку.
+    """
+
+    def __init__(self, format_row, sink):
+        self.format_row = format_row
+        self.sink = sink
+        self.keys = []
+        self.rows = {}        # ключ -> отформатированная строка
+        self._positions = {}  # ключ -> позиция в keys (верна для позиций до _stale_from)
+        self._stale_from = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def row(self, key):
+        return self.rows[key]
+
+    def window(self, start, stop):
+        """Строки с позиции ``start`` по ``stop`` (для ``VirtualList``)."""
+        return [self.rows[key] for key in self.keys[start:stop]]
+
+    def reset(self, items):
+        """Полностью перестраивает список по парам ``(ключ, объект)``."""
+        self.sink.clear_rows()
+        self.keys = []
+        self.rows = {}
+        self._positions = {}
+        self._stale_from = 0
+        for key, item in items:
+            self.append(key, item)
+
+    def append(self, key, item):
+        """Добавляет строку в конец: O(1), остальные строки не трогаются."""
+        self.insert(len(self.keys), key, item)
+
+    def insert(self, index, key, item):
+        if key in self.rows:
+            raise KeyError(f"Строка {key!r} уже есть в списке")
+        row = self.format_row(item)
+        self.keys.insert(index, key)
+        self.rows[key] = row
+        if index == len(self.keys) - 1 and self._stale_from == index:
+            self._positions[key] = index
+            self._stale_from += 1
+        else:
+            self._stale_from = min(self._stale_from, index)
+        self.sink.insert_row(index, key, row)
+
+    def update(self, key, item):
+        """Переформатирует одну строку; если текст не изменился, виджет не трогается."""
+        row = self.format_row(item)
+        if self.rows[key] == row:
+            return
+        self.rows[key] = row
+        self.sink.update_row(self.index(key), key, row)
+
+    def remove(self, key):
+        index = self.index(key)
+        del self.keys[index]
+        del self.rows[key]
+        del self._positions[key]
+        self._stale_from = min(self._stale_from, index)
+        self.sink.delete_row(index, key)
+
+    def remove_many(self, keys):
+        """Удаляет несколько строк за один проход по списку."""
+        removed = {key for key in keys if key in self.rows}
+        if not removed:
+            return
+        found = [(index, key) for index, key in enumerate(self.keys) if key in removed]
+        self.keys = [key for key in self.keys if key not in removed]
+        for key in removed:
+            del self.rows[key]
+            self._positions.pop(key, None)
+        self._stale_from = min(self._stale_from, found[0][0])
+        # С конца: позиции ещё не удалённых строк в виджете не сдвигаются
+        for index, key in reversed(found):
+            self.sink.delete_row(index, key)
+
+    def index(self, key):
+        """Позиция строки ``key``; KeyError, если её нет."""
+        if key not in self.rows:
+            raise KeyError(key)
+        position = self._positions.get(key)
+        if position is None or position >= self._stale_from:
+            for position in range(self._stale_from, len(self.keys)):
+                self._positions[self.keys[position]] = position
+            self._stale_from = len(self.keys)
+            position = self._positions[key]
+        return position
+
+class PagedSource:
+    """Строки из базы данных, загружаемые страницами по ключу (keyset).
+
+    ``fetch_page(after_key, limit)`` возвращает ``(объекты, last_key)``,
+    ``seek_key(position)`` — ключ строки перед позицией (для прыжка к
+    произвольной странице), ``count()`` — общее число строк. В памяти
+    держится не больше ``max_pages`` страниц.
+    """
+
+    def __init__(self, fetch_page, seek_key, count, format_row, page_size=100, max_pages=20):
+        self.fetch_page = fetch_page
+        self.seek_key = seek_key
+        self.count = count
+        self.format_row = format_row
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.invalidate()
+
+    @classmethod
+    def for_orders(cls, db, format_row, filters=None, order_by='number', **kwargs):
+        """Источник заказов ``db.Database`` через ``get_orders_page``."""
+        return cls(
+            lambda after_key, limit: db.get_orders_page(after_key, limit, filters, order_by),
+            lambda position: db.seek_orders_key(position, filters, order_by),
+            lambda: db.count_orders(filters),
+            format_row, **kwargs,
+        )
+
+    def invalidate(self):
+        """Сбрасывает кэш после изменения данных или фильтров."""
+        self._len = None
+        self._pages = OrderedDict()  # номер страницы -> строки
+        self._last_keys = {}         # номер страницы -> ключ её последней строки
+
+    def __len__(self):
+        if self._len is None:
+            self._len = self.count()
+        return self._len
+
+    def window(self, start, stop):
+        stop = min(stop, len(self))
+        rows = []
+        for page in range(start // self.page_size, (stop - 1) // self.page_size + 1 if stop > start else 0):
+            page_rows = self._page(page)
+            offset = page * self.page_size
+            rows.extend(page_rows[max(start - offset, 0):stop - offset])
+        return rows
+
+    def _page(self, page):
+        if page in self._pages:
+            self._pages.move_to_end(page)
+            return self._pages[page]
+        if page == 0:
+            after_key = None
+        elif page - 1 in self._last_keys:
+            after_key = self._last_keys[page - 1]
+        else:
+            after_key = self.seek_key(page * self.page_size)
+        items, last_key = self.fetch_page(after_key, self.page_size)
+        self._last_keys[page] = last_key
+        rows = self._pages[page] = [self.format_row(item) for item in items]
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return rows
+
+class VirtualList(ttk.Frame, metaclass=ABCMeta):
+    """Список, в котором существуют только видимые строки.
+
+    Данные берутся из ``source`` (``len(source)`` и ``source.window(start, stop)``):
+    это может быть ``ListViewModel`` или ``PagedSource``. Виджет также служит
+    приёмником изменений для ``ListViewModel`` и перерисовывает видимое окно,
+    только если изменение в него попало. Подклассы задают сам виджет:
+    ``create_view``, ``render`` и ``row_height``.
+    """
+
+    def __init__(self, parent, height=10, margin=20, **kwargs):
+        super().__init__(parent)
+        self.source = None
+        self.first = 0
+        self.visible = height
+        self.margin = margin
+        self._refresh_pending = False
+        self.view = self.create_view(height, **kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.view.pack(side='left', fill='both', expand=True)
+        self.view.bind('<Configure>', self.on_configure)
+        self.view.bind('<MouseWheel>', lambda e: self.scroll_by(-1 if e.delta > 0 else 1))
+        self.view.bind('<Button-4>', lambda e: self.scroll_by(-1))
+        self.view.bind('<Button-5>', lambda e: self.scroll_by(1))
+
+    def set_source(self, source):
+        self.source = source
+        self.first = 0
+        self.refresh()
+
+    # Приёмник изменений для ListViewModel
+    def insert_row(self, index, key, row):
+        self._changed(index)
+
+    def update_row(self, index, key, row):
+        self._changed(index)
+
+    def delete_row(self, index, key):
+        self._changed(index)
+
+    def clear_rows(self):
+        self.first = 0
+        self.schedule_refresh()
+
+    def _changed(self, index):
+        if index < self.first + self.visible:
+            self.schedule_refresh()
+        else:
+            self.update_scrollbar()
+
+    def schedule_refresh(self):
+        # Пачка изменений подряд приводит к одной перерисовке
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self.refresh)
+
+    def refresh(self):
+        self._refresh_pending = False
+        if self.source is None:
+            return
+        total = len(self.source)
+        self.first = max(0, min(self.first, total - self.visible))
+        start = max(0, self.first - self.margin)
+        # Запрашиваем окно с запасом: постраничный источник подгрузит соседние строки заранее
+        rows = self.source.window(start, self.first + self.visible + self.margin)
+        self.render(rows[self.first - start:self.first - start + self.visible])
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = len(self.source) if self.source is not None else 0
+        if total <= self.visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / total, (self.first + self.visible) / total)
+
+    def scroll_to(self, first):
+        self.first = first
+        self.refresh()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.first + rows)
+
+    def on_scrollbar(self, command, value, unit=None):
+        if command == 'moveto':
+            self.scroll_to(int(float(value) * len(self.source)))
+        elif unit == 'pages':
+            self.scroll_by(int(value) * self.visible)
+        else:
+            self.scroll_by(int(value))
+
+    def on_configure(self, event):
+        visible = max(1, event.height // self.row_height())
+        if visible != self.visible:
+            self.visible = visible
+            self.schedule_refresh()
+
+    @abstractmethod
+    def create_view(self, height, **kwargs):
+        """Создаёт виджет строк высотой ``height`` строк."""
+
+    @abstractmethod
+    def render(self, rows):
+        """Показывает строки видимого окна."""
+
+    @abstractmethod
+    def row_height(self):
+        """Высота строки в пикселях."""
+
+class VirtualListbox(VirtualList):
+    """Виртуальный ``tk.Listbox``; строки источника — готовый текст."""
+
+    def create_view(self, height, **kwargs):
+        return tk.Listbox(self, height=height, **kwargs)
+
+    def render(self, rows):
+        self.view.delete(0, tk.END)
+        if rows:
+            self.view.insert(tk.END, *rows)
+
+    def row_height(self):
+        return tkfont.Font(font=self.view.cget('font')).metrics('linespace') + 1
+
+    def curselection(self):
+        """Абсолютные индексы выбранных строк (с учётом прокрутки)."""
+        return tuple(self.first + index for index in self.view.curselection())
+
+class VirtualTreeview(VirtualList):
+    """Виртуальный ``ttk.Treeview``; строки источника — кортежи значений."""
+
+    def create_view(self, height, **kwargs):
+        return ttk.Treeview(self, height=height, **kwargs)
+
+    def render(self, rows):
+        self.view.delete(*self.view.get_children())
+        for row in rows:
+            self.view.insert("", "end", values=row)
+
+    def row_height(self):
+        return int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+
+    def on_configure(self, event):
+        # Строка заголовков занимает примерно одну строку таблицы
+        event.height -= self.row_height()
+        super().on_configure(event)
+
+    def heading(self, column, **kwargs):
+        return self.view.heading(column, **kwargs)